@@ -0,0 +1,107 @@
+# src/game/actions.py
+
+from collections import namedtuple
+
+from cache import LRUCache
+from card import DECK_CARDS
+
+# Action kinds; the first three double as the values of the player's action buttons
+ATTACK = 'Attack'
+HEAL = 'Heal'
+DEFENSE = 'Defense'
+COMBO = 'Combo'
+JESTER = 'Jester'
+
+
+# A move for the side whose turn it is. Combo actions carry the Spades card in
+# `card` and the card it is combined with in `combo_card`; Jester actions carry no card.
+Action = namedtuple('Action', ['kind', 'card', 'combo_card'], defaults=[None, None])
+
+# The outcome of an applied action. `amount` is the damage dealt or health restored and
+# `target` names the top card it landed on.
+Event = namedtuple('Event', ['actor', 'kind', 'amount', 'card', 'combo_card', 'target'])
+
+
+# A legal action with the damage it deals before defense and the health it restores
+Move = namedtuple('Move', ['action', 'damage', 'heal'])
+
+# Every legal move for one hand, grouped by what the move does. `doubles` are Clubs
+# attacks, `combos` Spades pairs and `jester` the hand refresh (None without Jesters).
+# `by_card` maps a card code to that card's single-card moves, `all` lists every move
+# and `actions` the bare Actions of `all`, in the order GameState.legal_actions returns them.
+HandActions = namedtuple('HandActions', ['attacks', 'doubles', 'heals', 'defenses', 'combos',
+                                         'jester', 'by_card', 'all', 'actions'])
+
+# Lookup tables indexed by card code: single-card attack damage (Clubs double), heal
+# amount (Hearts only) and the damage of a Spades card combined with any other card
+ATTACK_DAMAGE = tuple(card.attack_value * 2 if card.suit == 'Clubs' else card.attack_value
+                      for card in DECK_CARDS)
+HEAL_AMOUNT = tuple(card.attack_value if card.suit == 'Hearts' else 0 for card in DECK_CARDS)
+COMBO_DAMAGE = tuple(tuple(card.attack_value + other.attack_value for other in DECK_CARDS)
+                     for card in DECK_CARDS)
+
+HAND_CACHE_SIZE = 4096  # Distinct hands remembered by hand_actions
+
+_hand_cache = LRUCache(max_size=HAND_CACHE_SIZE)
+
+
+def damage_of(action):
+    """Damage an attack or combo deals before defense: Clubs double, Spades combos add up."""
+    if action.combo_card is not None:
+        return COMBO_DAMAGE[action.card.code][action.combo_card.code]
+    return ATTACK_DAMAGE[action.card.code]
+
+
+def hand_actions(hand, jesters=0):
+    """
+    Return the HandActions for a hand and whether Jesters are left. Results are
+    memoized on the set of cards held, so the order of the hand does not matter and
+    moves are listed by card code.
+    """
+    codes = tuple(sorted(card.code for card in hand))
+    key = (codes, jesters > 0)
+    table = _hand_cache.get(key)
+    if table is None:
+        table = _build_hand_actions(codes, jesters > 0)
+        _hand_cache.put(key, table)
+    return table
+
+
+def legal_actions(hand, jesters=0):
+    """Every legal Action for a hand, as a tuple shared between calls."""
+    return hand_actions(hand, jesters).actions
+
+
+def _build_hand_actions(codes, has_jester):
+    cards = [DECK_CARDS[code] for code in codes]
+    attacks, doubles, heals, defenses, combos = [], [], [], [], []
+    by_card = {}
+    moves = []
+    for card in cards:
+        code = card.code
+        attack = Move(Action(ATTACK, card), ATTACK_DAMAGE[code], 0)
+        single = [attack]
+        (doubles if card.suit == 'Clubs' else attacks).append(attack)
+        moves.append(attack)
+        if card.suit == 'Hearts':
+            heal = Move(Action(HEAL, card), 0, HEAL_AMOUNT[code])
+            heals.append(heal)
+            single.append(heal)
+            moves.append(heal)
+        elif card.suit == 'Diamonds':
+            defense = Move(Action(DEFENSE, card), 0, 0)
+            defenses.append(defense)
+            single.append(defense)
+            moves.append(defense)
+        elif card.suit == 'Spades':
+            for other in cards:
+                if other.code != code:
+                    combo = Move(Action(COMBO, card, other), COMBO_DAMAGE[code][other.code], 0)
+                    combos.append(combo)
+                    moves.append(combo)
+        by_card[code] = tuple(single)
+    jester = Move(Action(JESTER), 0, 0) if has_jester else None
+    if jester is not None:
+        moves.append(jester)
+    return HandActions(tuple(attacks), tuple(doubles), tuple(heals), tuple(defenses), tuple(combos),
+                       jester, by_card, tuple(moves), tuple(move.action for move in moves))
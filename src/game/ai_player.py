@@ -1,17 +1,52 @@
 # src/game/ai_player.py
 
+import json
+import os
 import random
-from card import Card
+import threading
+import time
+from collections import namedtuple
+from actions import Action, ATTACK, HEAL, DEFENSE, COMBO, JESTER, ATTACK_DAMAGE, HEAL_AMOUNT, COMBO_DAMAGE
+from mcts import MCTS
+from expectimax import Expectimax, EVAL_WEIGHTS, SEARCH_DEPTH
+from tablebase import covers, get_tablebase
+from policy import get_policy
 
 MAX_HAND_SIZE = 5 # maximum hand size
+BACKGROUND_NICENESS = 10  # Scheduling priority drop for AI decisions made in the background
+
+# The constants of the scripted Medium and Hard behaviors, as one vector that tune.py can search
+Weights = namedtuple('Weights', [
+    'heal',  # Hard: score per point of health a Hearts card restores
+    'double_attack',  # Hard: score per point of the player's health for a Clubs attack
+    'combo_attack',  # Hard: the same for a Spades combo
+    'defense_threshold',  # Hard: defends below this fraction of its top card's health
+    'defense_penalty',  # Hard: defense score factor while the player is defending
+    'jester_cutoff',  # Hard: plays a Jester when the hand's average value is below this
+    'low_health',  # Medium: heals or defends below this fraction of its top card's health
+    'finishing_health',  # Medium: attacks hardest below this fraction of the player's health
+])
+DEFAULT_WEIGHTS = Weights(heal=2, double_attack=3, combo_attack=4, defense_threshold=0.6,
+                          defense_penalty=0.5, jester_cutoff=4, low_health=0.3, finishing_health=0.3)
+
+# Weights tuned by tune.py --save. Where the file sets them, every AIPlayer uses them
+# in place of DEFAULT_WEIGHTS and the expectimax search's EVAL_WEIGHTS.
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'assets', 'ai_weights.json')
 
 
 class AIPlayer:
-    def __init__(self, name, assets_path, difficulty='Easy'):
+    def __init__(self, name, assets_path=None, difficulty='Easy', rng=None,
+                 search_time=0.5, search_iterations=None, search_workers=1, lookahead_depth=SEARCH_DEPTH,
+                 weights=None, eval_weights=None):
         self.name = name
         self.hand = []
         self.assets_path = assets_path
         self.difficulty = difficulty
+        self.rng = rng or random.Random()
+        # Unless given, the weights come from the weights file, or are the defaults
+        tuned_weights, tuned_eval_weights = get_weights()
+        self.weights = weights if weights is not None else tuned_weights
 
         # Top cards (e.g., Jack, Queen, King)
         self.top_cards = [
@@ -27,6 +62,35 @@ class AIPlayer:
         # Jesters
         self.jesters = 2
 
+        # Search budget per move for the Expert difficulty
+        self.search_time = search_time
+        self.search_iterations = search_iterations
+        self.search_workers = search_workers
+        self.search = None
+        # Hard's expectimax search, built on first use; eval_weights overrides some of
+        # its expectimax.EVAL_WEIGHTS
+        self.lookahead_depth = lookahead_depth
+        self.eval_weights = eval_weights if eval_weights is not None else tuned_eval_weights
+        self.lookahead = None
+        # Whichever of the two made the last decision, for its statistics
+        self.last_search = None
+
+        # An Event-like object that stops both searches early once set
+        self.cancel_event = None
+
+        # The Learned difficulty reads its policy table now, so no decision waits for it
+        if difficulty == 'Learned':
+            get_policy()
+
+    def __getstate__(self):
+        # The search tree and its worker pool stay in this process
+        state = self.__dict__.copy()
+        state['search'] = None
+        state['lookahead'] = None
+        state['last_search'] = None
+        state['cancel_event'] = None
+        return state
+
     def draw_cards(self, deck, num_cards):
         """Draw a specified number of cards from the deck without exceeding MAX_HAND_SIZE"""
         available_space = MAX_HAND_SIZE - len(self.hand)
@@ -51,18 +115,42 @@ class AIPlayer:
             current_top_card['health'] = 0
             self.current_top_card_index += 1
 
+    def top_card(self):
+        """Return the current top card, or None once all top cards are defeated."""
+        if self.is_defeated():
+            return None
+        return self.top_cards[self.current_top_card_index]
+
     def is_defeated(self):
         """Check if all top cards are defeated."""
         return self.current_top_card_index >= len(self.top_cards)
 
-    def decide_action(self, player_top_card, player_defense_active):
+    def card_action(self, card):
+        """The action the AI takes when it plays a single card."""
+        if card.suit == 'Hearts':
+            return Action(HEAL, card)
+        elif card.suit == 'Diamonds':
+            return Action(DEFENSE, card)
+        return Action(ATTACK, card)
+
+    def decide_action(self, player_top_card, player_defense_active, state=None):
         """
         Decides the best action based on the AI's behavior level.
+        The hand is left untouched; the returned Action is applied by the game engine.
+        Hard and Expert need the full game state to search; without it, both fall back
+        to Hard's one-move scoring. Learned falls back to Medium the same way.
         """
+        self.last_search = None
         if self.hand:  # Ensure the hand is not empty
-            if self.difficulty == 'Hard':
+            if self.difficulty == 'Expert' and state is not None:
+                return self.expert_behavior(state)
+            elif self.difficulty == 'Hard' and state is not None and player_top_card:
+                return self.lookahead_behavior(state)
+            elif self.difficulty == 'Learned' and state is not None:
+                return self.learned_behavior(state, player_top_card)
+            elif self.difficulty in ('Hard', 'Expert'):
                 return self.hard_behavior(player_top_card, player_defense_active)
-            elif self.difficulty == 'Medium':
+            elif self.difficulty in ('Medium', 'Learned'):
                 return self.medium_behavior(player_top_card)
             else:
                 return self.easy_behavior()
@@ -75,11 +163,10 @@ class AIPlayer:
         """
         attack_cards = [card for card in self.hand if card.suit != 'Diamonds']
         if attack_cards:
-            selected_card = random.choice(attack_cards)
+            selected_card = self.rng.choice(attack_cards)
         else:
-            selected_card = random.choice(self.hand)
-        self.hand.remove(selected_card)
-        return selected_card
+            selected_card = self.rng.choice(self.hand)
+        return self.card_action(selected_card)
 
     def medium_behavior(self, player_top_card):
         """
@@ -95,7 +182,7 @@ class AIPlayer:
         player_health_ratio = player_top_card['health'] / player_top_card['max_health']
 
         # Heal or defend if health is low
-        if own_health_ratio < 0.3:
+        if own_health_ratio < self.weights.low_health:
             heal_cards = [card for card in self.hand if card.suit == 'Hearts']
             defense_cards = [card for card in self.hand if card.suit == 'Diamonds']
             if heal_cards:
@@ -103,17 +190,15 @@ class AIPlayer:
             elif defense_cards:
                 selected_card = max(defense_cards, key=lambda c: c.get_attack_value())
             else:
-                selected_card = random.choice(self.hand)  # Fallback
-            self.hand.remove(selected_card)
-            return selected_card
+                selected_card = self.rng.choice(self.hand)  # Fallback
+            return self.card_action(selected_card)
 
         # Attack with strong cards if player's health is low
-        if player_health_ratio < 0.3:
+        if player_health_ratio < self.weights.finishing_health:
             attack_cards = [card for card in self.hand if card.suit != 'Hearts']
             if attack_cards:
                 selected_card = max(attack_cards, key=lambda c: c.get_attack_value())
-                self.hand.remove(selected_card)
-                return selected_card
+                return self.card_action(selected_card)
 
         # Use moderate attacks or fallback to weak attacks
         attack_cards = sorted(
@@ -122,14 +207,12 @@ class AIPlayer:
         )
         if attack_cards:
             moderate_attacks = [card for card in attack_cards if 4 <= card.get_attack_value() <= 7]
-            selected_card = random.choice(moderate_attacks) if moderate_attacks else attack_cards[0]
-            self.hand.remove(selected_card)
-            return selected_card
+            selected_card = self.rng.choice(moderate_attacks) if moderate_attacks else attack_cards[0]
+            return self.card_action(selected_card)
 
         # Fallback to any card
-        selected_card = random.choice(self.hand)
-        self.hand.remove(selected_card)
-        return selected_card
+        selected_card = self.rng.choice(self.hand)
+        return self.card_action(selected_card)
 
     def hard_behavior(self, player_top_card, player_defense_active):
         """
@@ -147,85 +230,224 @@ class AIPlayer:
 
         # Joker Logic: Refresh hand if all cards are low value
         average_card_value = sum(card.get_attack_value() for card in self.hand) / len(self.hand)
-        if average_card_value < 4 and self.jesters > 0:
-            self.jesters -= 1
-            return "Use Jester"
+        if average_card_value < self.weights.jester_cutoff and self.jesters > 0:
+            return Action(JESTER)
 
         best_action = None
         best_score = float('-inf')
 
-        # Evaluate all possible actions
+        # Evaluate all possible actions. Cards are scored in hand order, so ties go to
+        # the card held first.
+        weights = self.weights
         for card in self.hand:
+            code = card.code
             if card.suit == 'Hearts':  # Healing
                 if own_health < max_health:
-                    heal_amount = min(max_health - own_health, card.get_attack_value())
-                    score = heal_amount * 2
+                    score = min(max_health - own_health, HEAL_AMOUNT[code]) * weights.heal
                     if score > best_score:
                         best_score = score
-                        best_action = card
+                        best_action = Action(HEAL, card)
 
             elif card.suit == 'Diamonds':  # Defense
                 # Activate defense only if not already active
-                if not self.defense_active and own_health < max_health * 0.6:
+                if not self.defense_active and own_health < max_health * weights.defense_threshold:
                     score = max_health - own_health
                     if player_defense_active:
-                        score *= 0.5  # Decrease priority if the player is defending
+                        score *= weights.defense_penalty  # Decrease priority if the player is defending
                     if score > best_score:
                         best_score = score
-                        best_action = card
+                        best_action = Action(DEFENSE, card)
 
             elif card.suit == 'Clubs':  # Double damage attack
-                attack_value = card.get_attack_value() * 2
-                overkill_penalty = max(0, attack_value - player_health)
-                score = (player_health * 3) - overkill_penalty
+                overkill_penalty = max(0, ATTACK_DAMAGE[code] - player_health)
+                score = (player_health * weights.double_attack) - overkill_penalty
                 if score > best_score:
                     best_score = score
-                    best_action = card
+                    best_action = Action(ATTACK, card)
 
-            elif card.suit == 'Spades':  # Combined attack
+            else:  # Spades: combined attack
                 for combo_card in self.hand:
                     if combo_card == card:
                         continue
-                    combined_value = card.get_attack_value() + combo_card.get_attack_value()
+                    combined_value = COMBO_DAMAGE[code][combo_card.code]
                     overkill_penalty = max(0, combined_value - player_health)
-                    score = (player_health * 4) - overkill_penalty
+                    score = (player_health * weights.combo_attack) - overkill_penalty
                     if combo_card.suit == 'Clubs':
-                        double_damage_value = combo_card.get_attack_value() * 2
+                        # Playing the Clubs card alone might hit harder than the combo
+                        double_damage_value = ATTACK_DAMAGE[combo_card.code]
                         if double_damage_value > combined_value:
                             score -= double_damage_value
                     if score > best_score:
                         best_score = score
-                        best_action = (card, combo_card)
-
-            else:  # Basic attack
-                attack_value = card.get_attack_value()
-                overkill_penalty = max(0, attack_value - player_health)
-                score = (player_health * 2) - overkill_penalty
-                if score > best_score:
-                    best_score = score
-                    best_action = card
+                        best_action = Action(COMBO, card, combo_card)
 
         # Execute best action
         if best_action:
-            if isinstance(best_action, tuple):  # Spades combo
-                spade, combo_card = best_action
-                self.hand.remove(spade)
-                self.hand.remove(combo_card)
-                return spade, combo_card
-            elif best_action.suit == 'Diamonds':
-                # Activate defense when playing a Diamonds card
-                self.defense_active = True
-            self.hand.remove(best_action)
             return best_action
 
         # Fallback to any card
-        selected_card = random.choice(self.hand)
-        self.hand.remove(selected_card)
-        return selected_card
-
+        selected_card = self.rng.choice(self.hand)
+        return self.card_action(selected_card)
 
+    def lookahead_behavior(self, state):
+        """
+        Hard AI behavior with a game state: expectimax over its next turns and draws,
+        or the solved endgame once both sides are on their King.
+        """
+        if covers(state):
+            tablebase = get_tablebase()
+            if tablebase is not None and tablebase.covers(state):
+                return tablebase.choose(state)
+        if self.lookahead is None:
+            self.lookahead = Expectimax(depth=self.lookahead_depth, weights=self.eval_weights, rng=self.rng,
+                                        cancel_event=self.cancel_event)
+        self.last_search = self.lookahead
+        return self.lookahead.choose(state)
+
+    def learned_behavior(self, state, player_top_card):
+        """
+        Learned AI behavior: the move its self-play policy table holds for the abstracted
+        position, or Medium's choice for positions the table never learned.
+        """
+        policy = get_policy()
+        action = policy.choose(state) if policy is not None else None
+        if action is None:
+            return self.medium_behavior(player_top_card)
+        return action
 
+    def expert_behavior(self, state):
+        """
+        Expert AI behavior: information-set Monte Carlo Tree Search within a per-move
+        time or iteration budget. It only sees its own hand and the public cards.
+        """
+        if self.search is None:
+            self.search = MCTS(iterations=self.search_iterations, time_limit=self.search_time,
+                               rng=self.rng, workers=self.search_workers,
+                               cancel_event=self.cancel_event)
+        self.last_search = self.search
+        return self.search.choose(state)
+
+    def search_stats(self):
+        """The statistics of the search behind the last decision, or an empty dict if none ran."""
+        return dict(self.last_search.stats) if self.last_search is not None else {}
+
+    def close(self):
+        """Release the search's worker processes, if any."""
+        if self.search is not None:
+            self.search.close()
 
     def get_hand_description(self):
         """Return a formatted string of the AI's current hand."""
         return ', '.join([f"{card.suit} {card.rank}" for card in self.hand])
+
+
+def load_weights(path=WEIGHTS_PATH):
+    """
+    Read a weights file: returns (Weights, evaluation weights), the latter as a dict of
+    the EVAL_WEIGHTS it overrides. Anything the file does not set keeps its default, and
+    a missing or damaged file gives the defaults.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        weights = DEFAULT_WEIGHTS._replace(**{name: float(value) for name, value in data.get('weights', {}).items()
+                                              if name in Weights._fields})
+        eval_weights = {name: float(value) for name, value in data.get('eval_weights', {}).items()
+                        if name in EVAL_WEIGHTS}
+    except (OSError, ValueError, TypeError, AttributeError):
+        return DEFAULT_WEIGHTS, {}
+    return weights, eval_weights
+
+
+def save_weights(weights, eval_weights, path=WEIGHTS_PATH):
+    """
+    Write weights and evaluation weights for load_weights. The file is written beside
+    path and then moved into place.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump({'weights': weights._asdict(), 'eval_weights': eval_weights}, f, indent=2)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+_weights = None
+_weights_lock = threading.Lock()
+
+
+def get_weights():
+    """Return the process-wide (Weights, evaluation weights), reading the weights file on first use."""
+    global _weights
+    if _weights is None:
+        with _weights_lock:
+            if _weights is None:
+                _weights = load_weights()
+    return _weights
+
+
+# Set in background decision processes by init_background_decisions
+_background_cancel_event = None
+# The searches of the AI last decided for in this process, as (settings, match,
+# search, lookahead), kept so that its next decision can build on them
+_background_searches = None
+
+
+def init_background_decisions(cancel_event):
+    """
+    Process pool initializer: share the event the game sets to cancel a decision, and
+    lower the process's priority so that drawing the game always comes first.
+    """
+    global _background_cancel_event
+    _background_cancel_event = cancel_event
+    if hasattr(os, 'nice'):
+        os.nice(BACKGROUND_NICENESS)
+
+
+def decide_in_background(state, seed, match=None):
+    """
+    Process pool entry point: decide the action of the AI whose turn it is in state,
+    and return it with the seconds spent deciding and the statistics of the search
+    that decided it (see AIPlayer.search_stats). The state arrives as a pickled copy,
+    but the AI's searches live on in this process: Expert keeps its search tree within
+    a match and its worker pool across matches, until the difficulty or search budget
+    changes or close_background_decisions() is called. match identifies the match being played;
+    seed keeps the AI's choices tied to the game's own random stream.
+    """
+    global _background_searches
+    side = state.current
+    side.rng = random.Random(seed)
+    side.cancel_event = _background_cancel_event
+    settings = (side.difficulty, side.search_time, side.search_iterations, side.search_workers,
+                side.lookahead_depth, side.eval_weights)
+    if _background_searches is not None:
+        previous_settings, previous_match, search, lookahead = _background_searches
+        if settings != previous_settings:
+            close_background_decisions()
+        else:
+            if search is not None:
+                if match != previous_match:
+                    search.clear()  # A tree from another match's deal is no use
+                search.rng = side.rng
+            if lookahead is not None:
+                lookahead.rng = side.rng
+            side.search, side.lookahead = search, lookahead
+    start_time = time.perf_counter()
+    try:
+        action = state.decide_current()
+        return action, time.perf_counter() - start_time, side.search_stats()
+    finally:
+        _background_searches = (settings, match, side.search, side.lookahead)
+
+
+def close_background_decisions():
+    """Process pool entry point: release the searches kept by decide_in_background."""
+    global _background_searches
+    if _background_searches is not None:
+        search = _background_searches[2]
+        if search is not None:
+            search.close()
+        _background_searches = None
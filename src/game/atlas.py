@@ -0,0 +1,222 @@
+# src/game/atlas.py
+
+import hashlib
+import os
+import threading
+import pygame
+from cache import LRUCache
+from constants import (
+    BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR,
+    MINI_CARD_WIDTH, MINI_CARD_HEIGHT, MINI_SCALE_FACTOR,
+)
+from sprite_cache import SpriteCache, pixel_format, write_cache
+
+# Row of each suit in the spritesheets
+SUIT_ROWS = {
+    'Hearts': 0,
+    'Diamonds': 1,
+    'Spades': 2,
+    'Clubs': 3,
+    'Jester': 4,
+    'Back': 5,
+}
+
+# Column of each value in the spritesheets
+VALUE_COLUMNS = {
+    'Ace': 0,
+    '2': 1,
+    '3': 2,
+    '4': 3,
+    '5': 4,
+    '6': 5,
+    '7': 6,
+    '8': 7,
+    '9': 8,
+    '10': 9,
+    'Jack': 10,
+    'Queen': 11,
+    'King': 12,
+    'Black Jester': 0,
+    'Red Jester': 1,
+    'Back': 0,
+}
+
+# Every sprite the game uses is baked into SPRITE_CACHE_FILE in the assets directory:
+# each card of each sheet at the size it is drawn, and the unscaled images
+BAKED_SHEETS = (
+    ('bigcards.png', BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR),
+    ('minicards.png', MINI_CARD_WIDTH, MINI_CARD_HEIGHT, MINI_SCALE_FACTOR),
+)
+BAKED_IMAGES = ('background.png',)
+BAKED_CARDS = (
+    [(suit, value) for suit in ('Hearts', 'Diamonds', 'Spades', 'Clubs')
+     for value in ('Ace', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King')]
+    + [('Jester', 'Black Jester'), ('Jester', 'Red Jester'), ('Back', 'Back')]
+)
+SPRITE_CACHE_FILE = 'sprite_cache.bin'
+SPRITE_CACHE_VERSION = 1  # Bump when the baked contents change in a way the digest cannot see
+
+
+def card_sprite_name(filename, card_width, card_height, scale_factor, suit, value):
+    return f"{filename}:{card_width}x{card_height}x{scale_factor}:{suit}:{value}"
+
+
+def source_digest(assets_path, pixel_format):
+    """Digest of everything the baked sprites depend on: the source images, sizes and format."""
+    digest = hashlib.sha1(f"{SPRITE_CACHE_VERSION}:{pixel_format}".encode())
+    for filename, card_width, card_height, scale_factor in BAKED_SHEETS:
+        digest.update(f"{filename}:{card_width}x{card_height}x{scale_factor}".encode())
+    for filename in sorted({sheet[0] for sheet in BAKED_SHEETS} | set(BAKED_IMAGES)):
+        with open(os.path.join(assets_path, filename), 'rb') as f:
+            digest.update(filename.encode())
+            digest.update(f.read())
+    return digest.digest()
+
+
+class SpriteAtlas:
+    """
+    Decodes each spritesheet once and hands out shared, pre-scaled card sprites.
+    The returned surfaces are shared between callers and must not be drawn on.
+
+    With `use_baked`, sprites come from the assets directory's baked sprite cache,
+    which is built on first use and rebuilt whenever its sources change, so a normal
+    start decodes and scales nothing. Sprites the cache does not have are sliced
+    from the spritesheets as before.
+
+    Sprites may be loaded from another thread, e.g. by the asset preloader. Loading,
+    slicing and baking happen outside the lock, which is only taken to look up and
+    publish finished surfaces, so one thread's bake never stalls another's lookups.
+    While the baked cache is being built, other threads slice from the spritesheets.
+    """
+
+    def __init__(self, max_sprites=512, use_baked=True):
+        self.sheets = {}
+        self.sprites = LRUCache(max_sprites)
+        self.sheet_loads = 0
+        self.use_baked = use_baked
+        self.baked = {}  # Assets path -> SpriteCache, or None where it is unavailable
+        self.baking = set()  # Assets paths whose baked cache a thread is building
+        self.lock = threading.RLock()
+
+    def get_sheet(self, image_path):
+        """Return the decoded spritesheet at image_path, loading it on first use."""
+        with self.lock:
+            sheet = self.sheets.get(image_path)
+        if sheet is None:
+            loaded = pygame.image.load(image_path).convert_alpha()
+            with self.lock:
+                sheet = self.sheets.setdefault(image_path, loaded)
+                if sheet is loaded:
+                    self.sheet_loads += 1
+        return sheet
+
+    def get_card(self, assets_path, filename, card_width, card_height, scale_factor, suit, value):
+        """Return the scaled sprite for a suit and value, slicing it only on a cache miss."""
+        image_path = os.path.join(assets_path, filename)
+        key = (image_path, card_width, card_height, scale_factor, suit, value)
+        with self.lock:
+            sprite = self.sprites.get(key)
+        if sprite is None:
+            baked = self.baked_sprites(assets_path)
+            if baked is not None:
+                sprite = baked.get(card_sprite_name(filename, card_width, card_height, scale_factor, suit, value))
+            if sprite is None:
+                sprite = self.slice_card(image_path, card_width, card_height, scale_factor, suit, value)
+            with self.lock:
+                self.sprites.put(key, sprite)
+        return sprite
+
+    def get_image(self, assets_path, filename):
+        """Return a whole image from the assets directory, from the baked cache if it has it."""
+        baked = self.baked_sprites(assets_path)
+        image = baked.get(filename) if baked is not None else None
+        if image is None:
+            image = pygame.image.load(os.path.join(assets_path, filename))
+        return image
+
+    def baked_sprites(self, assets_path):
+        """
+        Return the baked sprite cache for assets_path, building it if needed, or None.
+        Returns None without waiting while another thread builds it.
+        """
+        if not self.use_baked:
+            return None
+        with self.lock:
+            if assets_path in self.baked:
+                return self.baked[assets_path]
+            if assets_path in self.baking:
+                return None
+            self.baking.add(assets_path)
+        try:
+            baked = self.open_baked(assets_path)
+            with self.lock:
+                self.baked[assets_path] = baked
+        finally:
+            with self.lock:
+                self.baking.discard(assets_path)
+        return baked
+
+    def open_baked(self, assets_path):
+        display = pygame.display.get_surface()
+        if display is None or display.get_bitsize() != 32:
+            return None  # Without a 32-bit display there is no format to bake for
+        path = os.path.join(assets_path, SPRITE_CACHE_FILE)
+        try:
+            layout = pixel_format(display)
+            digest = source_digest(assets_path, layout)
+            baked = SpriteCache.open(path, digest, layout)
+            if baked is None:
+                write_cache(path, digest, layout, self.bake(assets_path))
+                baked = SpriteCache.open(path, digest, layout)
+        except OSError:
+            baked = None  # E.g. a read-only install: fall back to the spritesheets
+        return baked
+
+    def bake(self, assets_path):
+        """Yield (name, Surface) for every sprite the baked cache holds."""
+        for filename, card_width, card_height, scale_factor in BAKED_SHEETS:
+            image_path = os.path.join(assets_path, filename)
+            for suit, value in BAKED_CARDS:
+                yield (card_sprite_name(filename, card_width, card_height, scale_factor, suit, value),
+                       self.slice_card(image_path, card_width, card_height, scale_factor, suit, value))
+        for filename in BAKED_IMAGES:
+            yield filename, pygame.image.load(os.path.join(assets_path, filename)).convert_alpha()
+
+    def slice_card(self, image_path, card_width, card_height, scale_factor, suit, value):
+        """Cut a single card out of a spritesheet and scale it."""
+        suit_index = SUIT_ROWS.get(suit)
+        value_index = VALUE_COLUMNS.get(value)
+
+        if suit_index is None or value_index is None:
+            raise ValueError(f"Invalid suit or value: {suit}, {value}")
+
+        rect = pygame.Rect(value_index * card_width, suit_index * card_height, card_width, card_height)
+        card_image = self.get_sheet(image_path).subsurface(rect)
+
+        return pygame.transform.scale(
+            card_image, (card_width * scale_factor, card_height * scale_factor)
+        )
+
+    def clear(self):
+        """Forget every loaded sheet and sprite, e.g. after the display mode changes."""
+        self.sheets.clear()
+        self.sprites.clear()
+        self.baked.clear()
+        self.sheet_loads = 0
+
+    def stats(self):
+        """Return cache statistics for the sprite cache plus the number of sheet decodes."""
+        stats = self.sprites.stats()
+        stats['sheet_loads'] = self.sheet_loads
+        return stats
+
+
+_atlas = None
+
+
+def get_atlas():
+    """Return the process-wide sprite atlas."""
+    global _atlas
+    if _atlas is None:
+        _atlas = SpriteAtlas()
+    return _atlas
@@ -0,0 +1,331 @@
+# src/game/batch.py
+
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from engine import MAX_HAND_SIZE
+
+# Cards are coded 0-39 as in card.CARD_CODES (suit * 10 + value - 1); 40 marks an empty slot
+NUM_CARDS = 40
+EMPTY = NUM_CARDS
+HEARTS, DIAMONDS, SPADES, CLUBS = 0, 1, 2, 3
+SUIT_OF = np.append(np.arange(NUM_CARDS) // 10, -1).astype(np.int8)
+ATTACK_OF = np.append(np.arange(NUM_CARDS) % 10 + 1, 0).astype(np.int16)
+
+POLICIES = {'Easy': 0, 'Medium': 1}
+TOP_HEALTH = (15, 25, 40)  # Jack, Queen, King, as in Player.top_cards
+NO_WINNER = -1
+
+# Card selection modes. Easy always uses EASY; Medium picks one per game from its health ratios.
+EASY, LOW, FINISH, NORMAL = 0, 1, 2, 3
+
+
+def build_priority_tables():
+    """
+    Fold every branch of the Easy and Medium behaviors into a per-mode, per-card priority.
+    The card with the highest priority is played; random_tie marks groups in which the
+    behavior picks at random rather than the first card in hand order.
+    """
+    priority = np.full((4, NUM_CARDS + 1), -1000, dtype=np.int16)
+    random_tie = np.zeros((4, NUM_CARDS + 1), dtype=bool)
+    for code in range(NUM_CARDS):
+        suit, attack = SUIT_OF[code], ATTACK_OF[code]
+        # Easy: a random card that is not a Diamond, else any card
+        priority[EASY, code] = 0 if suit == DIAMONDS else 1
+        random_tie[EASY, code] = True
+        # Low health: the strongest Heart, else the strongest Diamond, else a random card
+        if suit == HEARTS:
+            priority[LOW, code] = 100 + attack
+        elif suit == DIAMONDS:
+            priority[LOW, code] = 50 + attack
+        else:
+            priority[LOW, code] = 0
+            random_tie[LOW, code] = True
+        # Opponent low: the strongest card that is not a Heart, else a random card
+        if suit == HEARTS:
+            priority[FINISH, code] = 0
+            random_tie[FINISH, code] = True
+        else:
+            priority[FINISH, code] = 100 + attack
+        # Otherwise: a random moderate attack, else the weakest attack, else a random card
+        if suit == HEARTS:
+            priority[NORMAL, code] = 0
+            random_tie[NORMAL, code] = True
+        elif 4 <= attack <= 7:
+            priority[NORMAL, code] = 200
+            random_tie[NORMAL, code] = True
+        else:
+            priority[NORMAL, code] = 100 + (11 - attack)
+    return priority, random_tie
+
+
+def build_key_tables():
+    """
+    Pack the priority tables into int32 selection keys, indexed by mode and card code
+    (and hand slot for KEY_BASE):
+
+        bits 19-30  priority, offset to stay positive
+        bits 3-18   random bits, only kept for cards in a random-tie group
+        bits 0-2    7 - hand slot, so the first card wins any remaining tie
+
+    The largest key in a hand is the card to play, and its low bits give its slot.
+    """
+    priority, random_tie = build_priority_tables()
+    slots = np.arange(MAX_HAND_SIZE, dtype=np.int32)
+    base = ((priority.astype(np.int32) + 1024) << 19)[:, :, None] | (7 - slots)
+    random_mask = np.where(random_tie, 0xFFFF << 3, 0).astype(np.int32)
+    return base.astype(np.int32).ravel(), random_mask.ravel()
+
+
+KEY_BASE, KEY_RANDOM_MASK = build_key_tables()
+SLOTS = np.arange(MAX_HAND_SIZE, dtype=np.int32)[:, None]
+
+
+class BatchGames:
+    """
+    Many independent AI-vs-AI games stored as NumPy arrays with the game index last.
+
+    Every call to step() plays one turn in every unfinished game at once, using
+    vectorized versions of AIPlayer's Easy and Medium behaviors. The rules match
+    engine.GameState. Each game starts with side 0 and plays one turn per step,
+    so every unfinished game has the same side to move. Hands are kept in draw
+    order so ties break the same way as in the object engine.
+
+    A side's top cards are stored as `level` (0 Jack, 1 Queen, 2 King, 3 all
+    defeated) plus the `hp` of the current card. Earlier cards are at zero and
+    later ones at full health; top_card_health() expands this into the
+    Jack/Queen/King stacks. Easy and Medium never use Jesters, so `jesters`
+    only records the counts.
+    """
+
+    def __init__(self, num_games, policies=('Easy', 'Medium'), top_health=TOP_HEALTH, seed=None):
+        self.num_games = num_games
+        self.rng = np.random.default_rng(seed)
+        self.policies = [POLICIES[name] for name in policies]
+        # A trailing entry for defeated sides keeps lookups by level in range
+        self.max_health = np.array(list(top_health) + [1], dtype=np.int16)
+        self.levels = len(top_health)
+
+        # Results, indexed by game id
+        self.winner = np.full(num_games, NO_WINNER, dtype=np.int8)
+        self.turns = np.zeros(num_games, dtype=np.int32)
+        self.steps = 0
+
+        # Live games; game_ids maps each column back to its game id
+        self.game_ids = np.arange(num_games)
+        self.columns = np.arange(num_games)
+        self.done = np.zeros(num_games, dtype=bool)
+
+        # Deck order: the deck of column k is order[:deck_len[k], k], drawn from the end
+        self.order = np.argsort(self.rng.random((NUM_CARDS, num_games), dtype=np.float32), axis=0).astype(np.int8)
+        self.deck_len = np.full(num_games, NUM_CARDS, dtype=np.intp)
+        self.discard = np.zeros((NUM_CARDS, num_games), dtype=bool)
+
+        # Per side (0 moves first), then per hand slot or per game
+        self.hands = np.full((2, MAX_HAND_SIZE, num_games), EMPTY, dtype=np.int8)
+        self.level = np.zeros((2, num_games), dtype=np.int8)
+        self.hp = np.full((2, num_games), top_health[0], dtype=np.int16)
+        self.defense = np.zeros((2, num_games), dtype=bool)
+        self.jesters = np.full((2, num_games), 2, dtype=np.int8)
+
+        for side in (0, 1):
+            for _ in range(MAX_HAND_SIZE):
+                self.refill(side)
+
+    @property
+    def turn(self):
+        """The side to move in every unfinished game."""
+        return self.steps % 2
+
+    def top_card_health(self):
+        """Health of each live game's Jack, Queen and King, shaped (side, card, game)."""
+        cards = np.arange(self.levels)[None, :, None]
+        level = self.level[:, None, :]
+        full = self.max_health[:self.levels][None, :, None]
+        return np.where(cards < level, 0, np.where(cards == level, self.hp[:, None, :], full))
+
+    def draw(self, needs):
+        """
+        Draw one card in every live game where needs is set, reshuffling the discard pile
+        into empty decks. Returns EMPTY where nothing was drawn.
+        """
+        empty = np.flatnonzero(needs & (self.deck_len == 0))
+        if empty.size:
+            # Sorting random keys puts the discarded card codes first, in a random order
+            discarded = self.discard[:, empty]
+            keys = np.where(discarded, self.rng.random(discarded.shape, dtype=np.float32), 2.0)
+            self.order[:, empty] = np.argsort(keys, axis=0)
+            self.deck_len[empty] = discarded.sum(axis=0)
+            self.discard[:, empty] = False
+
+        drawing = needs & (self.deck_len > 0)
+        self.deck_len -= drawing
+        cards = np.take(self.order, self.deck_len * self.columns.size + self.columns)
+        return np.where(drawing, cards, np.int8(EMPTY))
+
+    def refill(self, side):
+        """Draw one card into the first empty hand slot of side in every live game."""
+        hand = self.hands[side]
+        count = np.count_nonzero(hand != EMPTY, axis=0)
+        needs = count < MAX_HAND_SIZE
+        cards = self.draw(needs)
+        slots = count * self.columns.size + self.columns
+        if not needs.all():
+            slots, cards = slots[needs], cards[needs]
+        np.put(hand, slots, cards)
+
+    def choose(self, own, opp):
+        """Pick the hand slot the side to move plays in every live game."""
+        if self.policies[own] == POLICIES['Easy']:
+            mode = np.int32(EASY)
+        else:
+            own_low = self.hp[own] < 0.3 * self.max_health[self.level[own]]
+            opp_low = self.hp[opp] < 0.3 * self.max_health[self.level[opp]]
+            mode = np.where(own_low, LOW, np.where(opp_low, FINISH, NORMAL)).astype(np.int32)
+
+        cell = mode * (NUM_CARDS + 1) + self.hands[own]
+        key = np.take(KEY_BASE, cell * MAX_HAND_SIZE + SLOTS)
+        bits = self.rng.bit_generator.random_raw((cell.size + 3) // 4).view(np.uint16)[:cell.size]
+        key |= np.left_shift(bits.reshape(cell.shape), 3, dtype=np.int32) & np.take(KEY_RANDOM_MASK, cell)
+        return 7 - (key.max(axis=0) & 7)
+
+    def step(self):
+        """Play one turn in every unfinished game. Returns the number of turns played."""
+        live = self.game_ids.size - np.count_nonzero(self.done)
+        if not live:
+            return 0
+        own = self.turn
+        opp = 1 - own
+        columns = self.columns
+
+        slot = self.choose(own, opp)
+        hand = self.hands[own]
+        cards = hand[slot, columns]
+        suits = SUIT_OF[cards]
+        values = ATTACK_OF[cards]
+
+        # Hearts heal the side's own top card
+        healed = np.minimum(self.hp[own] + values, self.max_health[self.level[own]])
+        np.copyto(self.hp[own], healed, where=suits == HEARTS)
+
+        # Diamonds activate defense
+        self.defense[own] |= suits == DIAMONDS
+
+        # Spades attack, Clubs attack for double damage; an active defense halves the hit
+        attacking = suits >= SPADES
+        damage = np.where(suits == CLUBS, values * 2, values) * attacking
+        damage = np.where(self.defense[opp] & attacking, damage // 2, damage)
+        self.defense[opp] &= ~attacking
+        hp = self.hp[opp] - damage
+        beaten = hp <= 0
+        self.level[opp] = np.minimum(self.level[opp] + beaten, self.levels)
+        self.hp[opp] = np.where(beaten, self.max_health[self.level[opp]], hp)
+
+        # Remove the played card, keeping the rest of the hand in order, and discard it
+        for j in range(MAX_HAND_SIZE - 1):
+            hand[j] = np.where(slot <= j, hand[j + 1], hand[j])
+        hand[-1] = EMPTY
+        self.discard[cards, columns] = True
+
+        self.steps += 1
+        won = beaten & (self.level[opp] == self.levels) & ~self.done
+        if won.any():
+            finished = self.game_ids[won]
+            self.winner[finished] = own
+            self.turns[finished] = self.steps
+            self.done |= won
+
+        # Refill the next side's hand, then drop finished games once they are the majority
+        self.refill(opp)
+        if np.count_nonzero(self.done) * 2 > self.game_ids.size:
+            self.compact()
+        return live
+
+    def compact(self):
+        """Drop the columns of finished games from the live arrays."""
+        keep = ~self.done
+        self.game_ids = self.game_ids[keep]
+        self.columns = np.arange(self.game_ids.size)
+        self.done = self.done[keep]
+        self.order = self.order[:, keep]
+        self.deck_len = self.deck_len[keep]
+        self.discard = self.discard[:, keep]
+        self.hands = self.hands[:, :, keep]
+        self.level = self.level[:, keep]
+        self.hp = self.hp[:, keep]
+        self.defense = self.defense[:, keep]
+        self.jesters = self.jesters[:, keep]
+
+    def run(self, max_turns=1000):
+        """Play every game to the end or to max_turns turns. Returns the total turns played."""
+        total = 0
+        while self.steps < max_turns:
+            played = self.step()
+            if not played:
+                break
+            total += played
+        unfinished = self.game_ids[~self.done]
+        self.turns[unfinished] = self.steps
+        return total
+
+
+def play_shard(args):
+    """Worker entry point: play one BatchGames shard and return (winner, turns, total turns)."""
+    num_games, policies, top_health, seed, max_turns = args
+    games = BatchGames(num_games, policies, top_health, seed)
+    total = games.run(max_turns)
+    return games.winner, games.turns, total
+
+
+def run_batches(num_games, policies=('Easy', 'Medium'), top_health=TOP_HEALTH, seed=None,
+                max_turns=1000, workers=None, shard_size=50000):
+    """
+    Play num_games games in shards of shard_size across a process pool.
+    Returns (winner, turns, total turns) with results concatenated in game order.
+    """
+    workers = workers or os.cpu_count() or 1
+    sizes = [min(shard_size, num_games - start) for start in range(0, num_games, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    shards = [(size, policies, top_health, shard_seed, max_turns) for size, shard_seed in zip(sizes, seeds)]
+
+    if workers == 1:
+        results = [play_shard(shard) for shard in shards]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(play_shard, shards)
+    winner = np.concatenate([result[0] for result in results])
+    turns = np.concatenate([result[1] for result in results])
+    return winner, turns, sum(result[2] for result in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many Easy/Medium AI games at once with NumPy.")
+    parser.add_argument('-n', '--games', type=int, default=1000000, help="number of concurrent games")
+    parser.add_argument('--policies', nargs=2, default=['Easy', 'Medium'], choices=sorted(POLICIES),
+                        help="behavior of the side moving first and of the second side")
+    parser.add_argument('--top-health', nargs=3, type=int, default=list(TOP_HEALTH),
+                        metavar=('JACK', 'QUEEN', 'KING'), help="starting health of the top cards")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-turns', type=int, default=1000)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    winner, game_turns, turns = run_batches(args.games, args.policies, args.top_health, args.seed,
+                                            args.max_turns, args.workers)
+    elapsed = time.perf_counter() - start_time
+
+    first, second = args.policies
+    print(f"{args.games} games, {turns} turns in {elapsed:.2f}s ({turns / elapsed:,.0f} turns/sec)")
+    print(f"First ({first}) win rate: {np.mean(winner == 0):.2%}")
+    print(f"Second ({second}) win rate: {np.mean(winner == 1):.2%}")
+    print(f"Unfinished: {np.mean(winner == NO_WINNER):.2%}")
+    print(f"Average turns: {game_turns.mean():.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+# src/game/benchmark.py
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# Rendering is benchmarked without a window; this must be set before pygame starts
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from atlas import SpriteAtlas
+from card import DECK_CARDS
+from constants import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR,
+)
+from deck import Deck
+from expectimax import SEARCH_DEPTH
+from game import Game
+from simulate import new_ai_game, EXPERT_ITERATIONS
+from snapshot import snapshot, restore, from_snapshot
+from utils import get_card
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+REPEAT = 7  # Timed runs of each benchmark
+# A benchmark regresses when its fastest run is this fraction slower than the baseline's.
+# The fastest run is the one least disturbed by other work on the machine.
+DEFAULT_THRESHOLD = 0.25
+
+
+class Benchmark:
+    """
+    A named measurement. `setup` is a generator function: it prepares what is measured,
+    yields a function that performs `ops` operations, and cleans up when resumed.
+    Unless `warmup` is false, one untimed run comes first so that caches and lazy
+    loading are not timed.
+    """
+
+    __slots__ = ('name', 'setup', 'ops', 'repeat', 'threshold', 'warmup')
+
+    def __init__(self, name, setup, ops, repeat, threshold, warmup):
+        self.name = name
+        self.setup = setup
+        self.ops = ops
+        self.repeat = repeat
+        self.threshold = threshold
+        self.warmup = warmup
+
+    def run(self):
+        """Time the benchmark and return its result as a dictionary, in microseconds per op."""
+        fixture = self.setup()
+        operation = next(fixture)
+        try:
+            if self.warmup:
+                operation()
+            times = []
+            for _ in range(self.repeat):
+                start = time.perf_counter()
+                operation()
+                times.append((time.perf_counter() - start) / self.ops)
+        finally:
+            next(fixture, None)
+        median = statistics.median(times)
+        return {
+            'ops': self.ops,
+            'repeat': self.repeat,
+            'median_us': 1e6 * median,
+            'min_us': 1e6 * min(times),
+            'ops_per_sec': 1 / median if median else 0.0,
+        }
+
+
+BENCHMARKS = []
+
+
+def benchmark(name, ops, repeat=REPEAT, threshold=DEFAULT_THRESHOLD, warmup=True):
+    """Register a generator function as a benchmark of `ops` operations per run."""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, setup, ops, repeat, threshold, warmup))
+        return setup
+    return register
+
+
+@benchmark('deck.construct', ops=2000)
+def deck_construct():
+    rng = random.Random(0)
+
+    def operation():
+        for _ in range(2000):
+            Deck(rng=rng)
+    yield operation
+
+
+@benchmark('deck.draw_reshuffle', ops=20000)
+def deck_draw_reshuffle():
+    # Each op draws a hand and discards it, so the deck reshuffles every eighth op
+    deck = Deck(rng=random.Random(0))
+
+    def operation():
+        for _ in range(20000):
+            for card in deck.draw(5):
+                deck.discard(card)
+    yield operation
+
+
+def sample_positions(count):
+    """Positions from Easy-vs-Medium games, for the state copying benchmarks."""
+    positions = []
+    seed = 0
+    while len(positions) < count:
+        state = new_ai_game('Easy', 'Medium', f"positions:{seed}")
+        while not state.is_over() and len(positions) < count:
+            positions.append(state.clone())
+            state.apply(state.decide_current())
+        seed += 1
+    return positions
+
+
+@benchmark('state.clone', ops=20000)
+def state_clone():
+    positions = sample_positions(200)
+
+    def operation():
+        for i in range(20000):
+            positions[i % 200].clone()
+    yield operation
+
+
+@benchmark('state.snapshot', ops=20000)
+def state_snapshot():
+    positions = sample_positions(200)
+
+    def operation():
+        for i in range(20000):
+            snapshot(positions[i % 200])
+    yield operation
+
+
+@benchmark('state.restore', ops=20000)
+def state_restore():
+    snapshots = [snapshot(state) for state in sample_positions(200)]
+    target = from_snapshot(snapshots[0])
+
+    def operation():
+        for i in range(20000):
+            restore(target, snapshots[i % 200])
+    yield operation
+
+
+def position_moves(count):
+    """(position, action) pairs covering every legal action of sample positions."""
+    moves = []
+    for state in sample_positions(count):
+        moves.extend((state, action) for action in state.legal_actions())
+    return moves
+
+
+@benchmark('state.clone_apply', ops=20000)
+def state_clone_apply():
+    # Trying a move by copying the position, the way the searches do today
+    moves = position_moves(200)
+
+    def operation():
+        for i in range(20000):
+            state, action = moves[i % len(moves)]
+            state.clone().apply(action)
+    yield operation
+
+
+@benchmark('state.do_undo', ops=20000)
+def state_do_undo():
+    # Trying a move in place and taking it back
+    moves = position_moves(200)
+
+    def operation():
+        for i in range(20000):
+            state, action = moves[i % len(moves)]
+            state.undo(state.do(action))
+    yield operation
+
+
+@benchmark('sprites.get_card', ops=20000)
+def sprites_get_card():
+    cards = [(card.suit, card.value) for card in DECK_CARDS]
+
+    def operation():
+        for i in range(20000):
+            suit, value = cards[i % len(cards)]
+            get_card(ASSETS_PATH, 'bigcards.png', BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR,
+                     suit, value)
+    yield operation
+
+
+@benchmark('sprites.extract', ops=400)
+def sprites_extract():
+    # Slicing and scaling without the atlas cache, as on a cold start
+    atlas = SpriteAtlas()
+    image_path = os.path.join(ASSETS_PATH, 'bigcards.png')
+    cards = [(card.suit, card.value) for card in DECK_CARDS]
+
+    def operation():
+        for i in range(400):
+            suit, value = cards[i % len(cards)]
+            atlas.slice_card(image_path, BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR, suit, value)
+    yield operation
+
+
+def decision_states(difficulty, count):
+    """Mid-game positions with an AI of the given difficulty to move, reached by random play."""
+    states = []
+    seed = 0
+    while len(states) < count:
+        state = new_ai_game(difficulty, 'Easy', f"bench:{seed}", expert_iterations=EXPERT_ITERATIONS,
+                            hard_depth=SEARCH_DEPTH)
+        rng = random.Random(seed)
+        # An even number of moves leaves the first side, difficulty, to move
+        for _ in range(2 * (seed % 6)):
+            if state.is_over():
+                break
+            state.apply(rng.choice(state.legal_actions()))
+        if not state.is_over():
+            states.append(state)
+        seed += 1
+    return states
+
+
+def decision_benchmark(difficulty, count, repeat=REPEAT, threshold=DEFAULT_THRESHOLD, warmup=True):
+    @benchmark(f'ai.decide.{difficulty}', ops=count, repeat=repeat, threshold=threshold, warmup=warmup)
+    def decide():
+        states = decision_states(difficulty, count)
+
+        def operation():
+            for state in states:
+                state.decide_current()
+        try:
+            yield operation
+        finally:
+            for state in states:
+                state.player.close()
+                state.ai_player.close()
+    return decide
+
+
+decision_benchmark('Easy', 500)
+decision_benchmark('Medium', 500)
+decision_benchmark('Learned', 500)
+# The searching difficulties take long enough to skip the warm-up, and are noisier
+# as their work varies more from position to position
+decision_benchmark('Hard', 6, repeat=2, threshold=0.5, warmup=False)
+decision_benchmark('Expert', 6, repeat=3, threshold=0.5, warmup=False)
+
+
+def new_game(screen):
+    game = Game(screen, 'Medium')
+    game.start_game()
+    return game
+
+
+@benchmark('render.full_frame', ops=100)
+def render_full_frame():
+    game = new_game(pygame.display.get_surface())
+
+    def operation():
+        for _ in range(100):
+            game.renderer.invalidate()
+            game.render()
+    try:
+        yield operation
+    finally:
+        game.stop_ai()
+
+
+@benchmark('render.idle_frame', ops=2000)
+def render_idle_frame():
+    # A frame in which nothing changed: only the layer signatures are checked
+    game = new_game(pygame.display.get_surface())
+    game.render()
+
+    def operation():
+        for _ in range(2000):
+            game.render()
+    try:
+        yield operation
+    finally:
+        game.stop_ai()
+
+
+def run_benchmarks(selected=None):
+    """Run the benchmarks whose names contain any of the selected substrings, or all."""
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    results = {}
+    try:
+        for bench in BENCHMARKS:
+            if selected and not any(pattern in bench.name for pattern in selected):
+                continue
+            results[bench.name] = bench.run()
+            result = results[bench.name]
+            print(f"{bench.name:<22}{result['min_us']:12.2f} us/op (median {result['median_us']:.2f})", flush=True)
+    finally:
+        pygame.quit()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=None):
+    """
+    Compare the fastest runs in results against a baseline. Returns (name, baseline_us,
+    current_us, status) rows, where status is 'regression', 'improvement', 'ok' or 'new'.
+    """
+    thresholds = {bench.name: bench.threshold for bench in BENCHMARKS}
+    rows = []
+    for name, result in results['results'].items():
+        current = result['min_us']
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            rows.append((name, None, current, 'new'))
+            continue
+        allowed = 1 + (threshold if threshold is not None else thresholds.get(name, DEFAULT_THRESHOLD))
+        ratio = current / previous['min_us'] if previous['min_us'] else 1.0
+        if ratio > allowed:
+            status = 'regression'
+        elif ratio < 1 / allowed:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, previous['min_us'], current, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine, AI and rendering, and check for regressions.")
+    parser.add_argument('-k', '--select', action='append', metavar='TEXT',
+                        help="only run benchmarks whose name contains TEXT (may be repeated)")
+    parser.add_argument('-o', '--output', metavar='PATH', help="save the results as JSON to PATH")
+    parser.add_argument('--baseline', default=BASELINE_PATH, metavar='PATH', help="baseline results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="allowed slowdown as a fraction, overriding each benchmark's own")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.select)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {'meta': results['meta'], 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline['results'] = json.load(f).get('results', {})
+        baseline['results'].update(results['results'])
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'benchmark':<22}{'baseline us':>14}{'current us':>14}{'change':>9}  status")
+    for name, previous, current, status in rows:
+        if previous is None:
+            print(f"{name:<22}{'-':>14}{current:14.2f}{'-':>9}  {status}")
+        else:
+            print(f"{name:<22}{previous:14.2f}{current:14.2f}{current / previous - 1:+9.1%}  {status}")
+    regressions = [row for row in rows if row[3] == 'regression']
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 # src/game/button.py
 
 import pygame
+from text_cache import render_text
 
 
 class Button:
@@ -31,7 +32,7 @@ class Button:
                 pygame.draw.rect(screen, (0, 0, 0), self.rect, 2)
 
             if self.text and self.font:
-                text_surface = self.font.render(self.text, True, (0, 0, 0))
+                text_surface = render_text(self.font, self.text, (0, 0, 0))
                 text_rect = text_surface.get_rect(center=self.rect.center)
                 screen.blit(text_surface, text_rect)
 
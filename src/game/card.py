@@ -1,40 +1,61 @@
 # src/game/card.py
 
-from utils import get_card
+SUITS = ('Hearts', 'Diamonds', 'Spades', 'Clubs')
+VALUES = ('Ace', '2', '3', '4', '5', '6', '7', '8', '9', '10')
+
+# Small integer code for every card; the 40 playable cards take codes 0-39
+CARD_CODES = {}
+for _suit in SUITS:
+    for _value in VALUES:
+        CARD_CODES[(_suit, _value)] = len(CARD_CODES)
+for _value in ('Jack', 'Queen', 'King'):
+    for _suit in SUITS:
+        CARD_CODES[(_suit, _value)] = len(CARD_CODES)
+CARD_CODES[('Jester', 'Black Jester')] = len(CARD_CODES)
+CARD_CODES[('Jester', 'Red Jester')] = len(CARD_CODES)
+
+
+def attack_value_of(value):
+    # Define attack values based on card value
+    if value in ['Jack', 'Queen', 'King']:
+        return 10  # Face cards shouldn't be in hand
+    elif value == 'Ace':
+        return 1
+    elif value in ['Black Jester', 'Red Jester']:
+        return 0  # Adjust based on game rules
+    else:
+        return int(value)
 
 
 class Card:
-    def __init__(self, suit, value, assets_path):
+    """
+    An immutable playing card. Cards hold no images: sprites are looked up by suit and
+    value in sprites.CardSprites when a card is drawn, so a card costs a few bytes.
+    """
+
+    __slots__ = ('suit', 'value', 'code', 'attack_value')
+
+    def __init__(self, suit, value):
+        code = CARD_CODES.get((suit, value))
+        if code is None:
+            raise ValueError(f"Invalid suit or value: {suit}, {value}")
         self.suit = suit
         self.value = value
-
-        # Load big image
-        self.big_card_width = 48
-        self.big_card_height = 64
-        self.big_scale_factor = 3
-        self.big_image = get_card(
-            assets_path, 'bigcards.png',
-            self.big_card_width, self.big_card_height,
-            self.big_scale_factor, suit, value
-        )
-
-        # Load mini image
-        self.mini_card_width = 15
-        self.mini_card_height = 22
-        self.mini_scale_factor = 4
-        self.mini_image = get_card(
-            assets_path, 'minicards.png',
-            self.mini_card_width, self.mini_card_height,
-            self.mini_scale_factor, suit, value
-        )
+        self.code = code
+        self.attack_value = attack_value_of(value)
 
     def get_attack_value(self):
-        # Define attack values based on card value
-        if self.value in ['Jack', 'Queen', 'King']:
-            return 10  # Face cards shouldn't be in hand
-        elif self.value == 'Ace':
-            return 1
-        elif self.value in ['Black Jester', 'Red Jester']:
-            return 0  # Adjust based on game rules
-        else:
-            return int(self.value)
+        return self.attack_value
+
+    def __eq__(self, other):
+        return isinstance(other, Card) and self.code == other.code
+
+    def __hash__(self):
+        return self.code
+
+    def __repr__(self):
+        return f"Card({self.suit!r}, {self.value!r})"
+
+
+# Shared instances of the 40 playable cards; every deck holds references to these
+DECK_CARDS = tuple(Card(suit, value) for suit in SUITS for value in VALUES)
@@ -7,7 +7,7 @@ BIG_CARD_HEIGHT = 64
 MINI_CARD_WIDTH = 15
 MINI_CARD_HEIGHT = 22
 BIG_SCALE_FACTOR = 3
-MINI_SCALE_FACTOR = 6
+MINI_SCALE_FACTOR = 4
 CARD_SPACING = 10
 MAX_HAND_LIMIT = 5
 FPS = 60
@@ -1,30 +1,26 @@
 # src/game/deck.py
 
 import random
-from card import Card
+from card import DECK_CARDS
 
 
 class Deck:
-    def __init__(self, assets_path):
-        self.cards = []
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
         self.discard_pile = []
 
-        suits = ['Hearts', 'Diamonds', 'Spades', 'Clubs']
-        values = ['Ace', '2', '3', '4', '5', '6', '7',
-                  '8', '9', '10']  # Excludes 'Jack', 'Queen', 'King' as they represent the Top cards
-
-        for suit in suits:
-            for value in values:
-                self.cards.append(Card(suit, value, assets_path))
+        # Ace to 10 of each suit; Jack, Queen and King are excluded as they represent the Top cards.
+        # Cards are immutable, so every deck shares the same 40 Card objects.
+        self.cards = list(DECK_CARDS)
 
         # Allow Jesters to be included in the deck
-        # self.cards.append(Card('Jester', 'Black Jester', assets_path))
-        # self.cards.append(Card('Jester', 'Red Jester', assets_path))
+        # self.cards.append(Card('Jester', 'Black Jester'))
+        # self.cards.append(Card('Jester', 'Red Jester'))
 
         self.shuffle()
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
 
     def draw(self, num_cards=1):
         drawn_cards = []
@@ -0,0 +1,256 @@
+# src/game/engine.py
+
+from actions import Event, ATTACK, HEAL, DEFENSE, COMBO, JESTER, damage_of, legal_actions
+
+MAX_HAND_SIZE = 5  # Define the maximum hand size
+
+PLAYER = 'Player'
+AI = 'AI'
+
+
+class GameState:
+    """
+    The rules of the game, free of any rendering.
+
+    Holds the deck and both sides and applies one action at a time for the side whose
+    turn it is. The sides are Player or AIPlayer objects; only their hands, top cards,
+    defense flags and jesters are used here. Nothing in this module imports pygame, so
+    matches can be played headless at full speed.
+    """
+
+    def __init__(self, deck, player, ai_player, current_turn=PLAYER):
+        self.deck = deck
+        self.player = player
+        self.ai_player = ai_player
+        self.current_turn = current_turn
+        self.winner = None
+        self.history = []  # Every applied action, in order
+
+    def deal(self):
+        """Deal both sides their starting hands."""
+        self.player.draw_cards(self.deck, MAX_HAND_SIZE)
+        self.ai_player.draw_cards(self.deck, MAX_HAND_SIZE)
+
+    def side(self, name):
+        """Return the side with the given turn name."""
+        return self.player if name == PLAYER else self.ai_player
+
+    @property
+    def current(self):
+        """The side whose turn it is."""
+        return self.side(self.current_turn)
+
+    @property
+    def opponent(self):
+        """The side waiting for its turn."""
+        return self.side(self.other_turn())
+
+    def other_turn(self):
+        return AI if self.current_turn == PLAYER else PLAYER
+
+    def is_over(self):
+        return self.winner is not None
+
+    def decide_current(self):
+        """Ask the side to move, which must be an AIPlayer, to choose its action."""
+        opponent = self.opponent
+        return self.current.decide_action(opponent.top_card(), opponent.defense_active, state=self)
+
+    def clone(self, rng=None):
+        """
+        Copy the state for search. Cards are immutable and shared; hands, piles and top
+        cards are copied. The copy's deck shuffles with rng if given, and its history
+        starts empty.
+        """
+        deck = object.__new__(type(self.deck))
+        deck.__dict__.update(self.deck.__dict__)
+        deck.cards = list(self.deck.cards)
+        deck.discard_pile = list(self.deck.discard_pile)
+        if rng is not None:
+            deck.rng = rng
+
+        twin = object.__new__(GameState)
+        twin.deck = deck
+        twin.player = clone_side(self.player)
+        twin.ai_player = clone_side(self.ai_player)
+        twin.current_turn = self.current_turn
+        twin.winner = self.winner
+        twin.history = []
+        return twin
+
+    def legal_actions(self):
+        """Every action available to the side whose turn it is, as a shared tuple."""
+        if self.is_over():
+            return ()
+        side = self.current
+        return legal_actions(side.hand, side.jesters)
+
+    def apply(self, action):
+        """
+        Perform an action for the side whose turn it is, then pass the turn.
+        Returns an Event describing what happened.
+        """
+        if self.is_over():
+            raise ValueError("The game is already over.")
+
+        side = self.current
+        opponent = self.opponent
+        actor = self.current_turn
+
+        if action.kind == JESTER:
+            if side.jesters <= 0:
+                raise ValueError("No Jesters left.")
+            for card in side.hand:
+                self.deck.discard(card)
+            side.hand.clear()
+            side.draw_cards(self.deck, MAX_HAND_SIZE)
+            side.jesters -= 1
+            event = Event(actor, JESTER, 0, None, None, None)
+        else:
+            played = self.check_cards(side, action)
+            for card in played:
+                side.hand.remove(card)
+
+            if action.kind in (ATTACK, COMBO):
+                target = opponent.top_card()['name']
+                damage = self.apply_defense(opponent, damage_of(action))
+                opponent.receive_damage(damage)
+                event = Event(actor, action.kind, damage, action.card, action.combo_card, target)
+            elif action.kind == HEAL:
+                top_card = side.top_card()
+                heal_amount = action.card.get_attack_value()
+                top_card['health'] = min(top_card['health'] + heal_amount, top_card['max_health'])
+                event = Event(actor, HEAL, heal_amount, action.card, None, top_card['name'])
+            else:
+                side.defense_active = True
+                event = Event(actor, DEFENSE, 0, action.card, None, None)
+
+            for card in played:
+                self.deck.discard(card)
+
+        self.history.append(action)
+        self.end_turn()
+        return event
+
+    def check_cards(self, side, action):
+        """
+        Return the cards a card-playing action takes from side's hand, or raise
+        ValueError if the action is not legal for that hand, before anything changes.
+        """
+        kind, card, combo_card = action
+        if card is None:
+            raise ValueError(f"A {kind} action needs a card.")
+        if kind == COMBO:
+            if card.suit != 'Spades' or combo_card is None or combo_card == card:
+                raise ValueError("A combo needs a Spades card and a second card.")
+            played = (card, combo_card)
+        elif kind in (ATTACK, HEAL, DEFENSE):
+            if combo_card is not None:
+                raise ValueError(f"A {kind} action plays a single card.")
+            if kind == HEAL and card.suit != 'Hearts':
+                raise ValueError("Only Hearts can heal.")
+            if kind == DEFENSE and card.suit != 'Diamonds':
+                raise ValueError("Only Diamonds can defend.")
+            played = (card,)
+        else:
+            raise ValueError(f"Unknown action: {kind}")
+        for card in played:
+            if card not in side.hand:
+                raise ValueError(f"{card.value} of {card.suit} is not in {side.name}'s hand.")
+        return played
+
+    def do(self, action):
+        """
+        Apply an action in place, as apply() does, and return a token that undo() takes
+        to revert it exactly, including any reshuffle of the deck. Actions must be undone
+        in the reverse order they were done.
+        """
+        deck = self.deck
+        player, ai_player = self.player, self.ai_player
+        side, opponent = (player, ai_player) if self.current_turn == PLAYER else (ai_player, player)
+        # Cards this move can draw: a Jester's new hand, then the refill of the next side
+        draws = MAX_HAND_SIZE - len(opponent.hand)
+        if action.kind == JESTER:
+            draws += MAX_HAND_SIZE
+        deck_size = len(deck.cards)
+        if draws > deck_size:
+            # The deck may be reshuffled, so both piles and the shuffle's generator are kept
+            reshuffle = (list(deck.cards), list(deck.discard_pile), deck.rng.getstate())
+            drawable = None
+        else:
+            reshuffle = None
+            drawable = deck.cards[deck_size - draws:]
+        # Only the current top card of either side can lose or regain health in one move
+        player_index = player.current_top_card_index
+        ai_index = ai_player.current_top_card_index
+        token = (self.current_turn, self.winner, list(side.hand), len(opponent.hand),
+                 player_index, player.top_cards[player_index]['health'] if player_index < len(player.top_cards) else None,
+                 player.defense_active, player.jesters,
+                 ai_index, ai_player.top_cards[ai_index]['health'] if ai_index < len(ai_player.top_cards) else None,
+                 ai_player.defense_active, ai_player.jesters,
+                 deck_size, drawable, len(deck.discard_pile), reshuffle)
+        self.apply(action)
+        return token
+
+    def undo(self, token):
+        """Revert the action that returned token from do()."""
+        (current_turn, winner, hand, waiting_hand_size,
+         player_index, player_health, player_defense, player_jesters,
+         ai_index, ai_health, ai_defense, ai_jesters,
+         deck_size, drawable, discard_size, reshuffle) = token
+        player, ai_player = self.player, self.ai_player
+        self.current_turn = current_turn
+        self.winner = winner
+        if current_turn == PLAYER:
+            player.hand[:] = hand
+            del ai_player.hand[waiting_hand_size:]
+        else:
+            ai_player.hand[:] = hand
+            del player.hand[waiting_hand_size:]
+
+        player.current_top_card_index = player_index
+        if player_health is not None:
+            player.top_cards[player_index]['health'] = player_health
+        player.defense_active = player_defense
+        player.jesters = player_jesters
+        ai_player.current_top_card_index = ai_index
+        if ai_health is not None:
+            ai_player.top_cards[ai_index]['health'] = ai_health
+        ai_player.defense_active = ai_defense
+        ai_player.jesters = ai_jesters
+
+        deck = self.deck
+        if reshuffle is None:
+            # Drawing only took cards off the top of the deck, and discarding added to the pile
+            del deck.cards[deck_size - len(drawable):]
+            deck.cards.extend(drawable)
+            del deck.discard_pile[discard_size:]
+        else:
+            deck.cards, deck.discard_pile, rng_state = reshuffle
+            deck.rng.setstate(rng_state)
+        self.history.pop()
+
+    def apply_defense(self, defender, damage):
+        """An active defense halves the next attack against it and is then used up."""
+        if defender.defense_active:
+            damage = damage // 2
+            defender.defense_active = False
+        return damage
+
+    def end_turn(self):
+        """Record a winner or pass the turn and refill the next side's hand."""
+        if self.opponent.is_defeated():
+            self.winner = self.current_turn
+            return
+        self.current_turn = self.other_turn()
+        side = self.current
+        side.draw_cards(self.deck, MAX_HAND_SIZE - len(side.hand))
+
+
+def clone_side(side):
+    """Copy a Player or AIPlayer's game state, sharing everything else with the original."""
+    twin = object.__new__(type(side))
+    twin.__dict__.update(side.__dict__)
+    twin.hand = list(side.hand)
+    twin.top_cards = [dict(top_card) for top_card in side.top_cards]
+    return twin
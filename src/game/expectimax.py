@@ -0,0 +1,336 @@
+# src/game/expectimax.py
+
+import random
+import time
+
+from actions import ATTACK, HEAL, DEFENSE, COMBO, JESTER, ATTACK_DAMAGE, hand_actions
+from card import DECK_CARDS
+
+SEARCH_DEPTH = 3  # Own turns searched ahead; draws between them are chance nodes
+CHANCE_SAMPLES = 8  # Unseen cards considered for single draws, and samples of larger draws
+TABLE_BITS = 16  # The transposition table holds 2**TABLE_BITS entries
+MAX_HAND_SIZE = 5
+WIN_SCORE = 1000.0
+
+# Leaf evaluation: remaining health difference plus small bonuses for held resources
+EVAL_WEIGHTS = {
+    'health': 1.0,
+    'own_defense': 3.0,
+    'opponent_defense': -3.0,
+    'jester': 2.0,
+}
+
+CANCEL_CHECK_INTERVAL = 256  # Nodes between checks for a cancelled search
+
+_zobrist_rng = random.Random(0x5EED)
+
+
+def _zobrist_keys(count):
+    return [_zobrist_rng.getrandbits(64) for _ in range(count)]
+
+
+# Zobrist keys, one per (feature, value); a position's key is the XOR of its features
+MAX_TOP_CARDS = 4
+MAX_HEALTH = 64
+Z_OWN_TOP = _zobrist_keys(MAX_TOP_CARDS * MAX_HEALTH)
+Z_OPPONENT_TOP = _zobrist_keys(MAX_TOP_CARDS * MAX_HEALTH)
+Z_OWN_DEFENSE, Z_OPPONENT_DEFENSE = _zobrist_keys(2)
+Z_JESTERS = _zobrist_keys(8)
+Z_CARDS = _zobrist_keys(len(DECK_CARDS))
+
+
+class SearchCancelled(Exception):
+    """Raised inside a search once its cancel_event is set."""
+
+
+class Position:
+    """
+    The searching side's view of the game: both top-card positions, the defense flags,
+    its jesters and its hand. The hand is kept sorted by card code so that every order
+    of drawing the same cards gives the same position.
+    """
+
+    __slots__ = ('own_index', 'own_health', 'opponent_index', 'opponent_health',
+                 'own_defense', 'opponent_defense', 'jesters', 'hand')
+
+    def __init__(self, own_index, own_health, opponent_index, opponent_health,
+                 own_defense, opponent_defense, jesters, hand):
+        self.own_index = own_index
+        self.own_health = own_health
+        self.opponent_index = opponent_index
+        self.opponent_health = opponent_health
+        self.own_defense = own_defense
+        self.opponent_defense = opponent_defense
+        self.jesters = jesters
+        self.hand = hand
+
+    def zobrist(self):
+        # The depth is not part of the key, so a value searched deeper also answers
+        # shallower probes of the same position
+        key = (Z_OWN_TOP[self.own_index * MAX_HEALTH + self.own_health]
+               ^ Z_OPPONENT_TOP[self.opponent_index * MAX_HEALTH + self.opponent_health]
+               ^ Z_JESTERS[self.jesters])
+        if self.own_defense:
+            key ^= Z_OWN_DEFENSE
+        if self.opponent_defense:
+            key ^= Z_OPPONENT_DEFENSE
+        for card in self.hand:
+            key ^= Z_CARDS[card.code]
+        return key
+
+
+class TranspositionTable:
+    """
+    A fixed-size table of searched values, indexed by the low bits of the Zobrist key.
+    Entries are only trusted within the search that stored them. A slot keeps the
+    entry searched deepest, whether the new entry is for the same position or another
+    one sharing the slot; entries from earlier searches are always replaced.
+    """
+
+    def __init__(self, bits=TABLE_BITS):
+        size = 1 << bits
+        self.mask = size - 1
+        self.keys = [0] * size
+        self.depths = [-1] * size
+        self.values = [0.0] * size
+        self.ages = [-1] * size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.replacements = 0
+
+    def __len__(self):
+        return sum(1 for age in self.ages if age == self.age)
+
+    def new_search(self):
+        """Start a new search: older entries become stale and the counters reset."""
+        self.age += 1
+        self.hits = 0
+        self.misses = 0
+        self.replacements = 0
+
+    def probe(self, key, depth):
+        """Return the stored value for key if it was searched at least depth deep, else None."""
+        slot = key & self.mask
+        if self.ages[slot] == self.age and self.keys[slot] == key and self.depths[slot] >= depth:
+            self.hits += 1
+            return self.values[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value):
+        slot = key & self.mask
+        if self.ages[slot] == self.age:
+            if self.depths[slot] > depth:
+                return
+            if self.keys[slot] != key:
+                self.replacements += 1
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.values[slot] = value
+        self.ages[slot] = self.age
+
+    def stats(self):
+        """Return a dictionary describing the table's size and efficiency."""
+        probes = self.hits + self.misses
+        return {
+            'size': len(self),
+            'max_size': self.mask + 1,
+            'hits': self.hits,
+            'misses': self.misses,
+            'replacements': self.replacements,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
+
+
+class Expectimax:
+    """
+    Depth-limited expectimax for the side to move, over its own turns and the draws
+    that follow them.
+
+    The search only uses what the side can see. Cards are drawn from the unseen cards,
+    which are those not in its hand or the discard pile. Each search picks
+    `chance_samples` of them once, and every single-card draw is averaged over that
+    same set. Larger draws, after a combo or a Jester, are averaged over
+    `chance_samples` random samples of all unseen cards. The opponent is modelled as
+    attacking once per turn for the average damage of an unseen attack card.
+
+    Positions are cached in a Zobrist-keyed transposition table. Because every
+    single-card draw comes from the same small set, playing A then B and playing B
+    then A lead to the same hand and health totals, so the table finds them.
+    """
+
+    def __init__(self, depth=SEARCH_DEPTH, table_bits=TABLE_BITS, chance_samples=CHANCE_SAMPLES,
+                 weights=None, rng=None, cancel_event=None):
+        self.depth = depth
+        self.chance_samples = chance_samples
+        self.weights = dict(EVAL_WEIGHTS, **(weights or {}))
+        self.rng = rng or random.Random()
+        self.table = TranspositionTable(table_bits)
+        self.nodes = 0
+        self.cancel_event = cancel_event  # Once set, the search stops and returns early
+        self.stats = {}
+
+        # Per-search context
+        self.own_max = ()
+        self.opponent_max = ()
+        self.threat = 0
+        self.unseen = ()
+        self.chance_cards = ()
+
+    def choose(self, state):
+        """
+        Search from the side to move in state and return its best action. If the search
+        is cancelled, the best action among those fully searched is returned, or None.
+        """
+        side = state.current
+        opponent = state.opponent
+        self.own_max = tuple(top_card['max_health'] for top_card in side.top_cards)
+        self.opponent_max = tuple(top_card['max_health'] for top_card in opponent.top_cards)
+
+        seen = set(side.hand)
+        seen.update(state.deck.discard_pile)
+        unseen = tuple(card for card in DECK_CARDS if card not in seen)
+        if not unseen:
+            unseen = tuple(state.deck.discard_pile)
+        attacks = [ATTACK_DAMAGE[card.code] for card in unseen if card.suit in ('Spades', 'Clubs')]
+        self.threat = round(sum(attacks) / len(attacks)) if attacks else 0
+        self.unseen = unseen
+        if len(unseen) > self.chance_samples:
+            self.chance_cards = tuple(self.rng.sample(unseen, self.chance_samples))
+        else:
+            self.chance_cards = unseen
+
+        root = Position(
+            side.current_top_card_index, side.top_card()['health'],
+            opponent.current_top_card_index, opponent.top_card()['health'],
+            side.defense_active, opponent.defense_active, side.jesters,
+            tuple(sorted(side.hand, key=lambda card: card.code)),
+        )
+
+        self.table.new_search()
+        self.nodes = 0
+        start_time = time.perf_counter()
+        best_action, best_value = None, float('-inf')
+        try:
+            for move in hand_actions(root.hand, root.jesters).all:
+                value = self.chance_value(root, move, self.depth)
+                if value > best_value:
+                    best_action, best_value = move.action, value
+        except SearchCancelled:
+            pass
+        elapsed = time.perf_counter() - start_time
+
+        self.stats = dict(self.table.stats(), nodes=self.nodes, elapsed=elapsed, value=best_value)
+        return best_action
+
+    def max_value(self, position, depth):
+        """Value of the searching side's best action in position."""
+        self.nodes += 1
+        if (self.nodes % CANCEL_CHECK_INTERVAL == 0 and self.cancel_event is not None
+                and self.cancel_event.is_set()):
+            raise SearchCancelled()
+        key = position.zobrist()
+        value = self.table.probe(key, depth)
+        if value is not None:
+            return value
+        value = float('-inf')
+        # At the horizon the hand left over is not scored, so actions with the same
+        # kind and amount are worth the same and only the first is played out
+        outcomes = set() if depth <= 1 else None
+        for move in hand_actions(position.hand, position.jesters).all:
+            if outcomes is not None:
+                outcome = (move.action.kind, move.damage, move.heal)
+                if outcome in outcomes:
+                    continue
+                outcomes.add(outcome)
+            value = max(value, self.chance_value(position, move, depth))
+        self.table.store(key, depth, value)
+        return value
+
+    def chance_value(self, position, move, depth):
+        """Expected value of playing a move: the opponent's reply, then the refill draw."""
+        after = self.play(position, move)
+        if after.opponent_index >= len(self.opponent_max):
+            return WIN_SCORE
+        self.opponent_turn(after)
+        if after.own_index >= len(self.own_max):
+            return -WIN_SCORE
+        if depth <= 1:
+            return self.evaluate(after)
+
+        hand = after.hand
+        held = {card.code for card in hand}
+        needed = MAX_HAND_SIZE - len(hand)
+        if needed == 1:
+            draws = [(card,) for card in self.chance_cards if card.code not in held]
+        else:
+            pool = [card for card in self.unseen if card.code not in held]
+            needed = min(needed, len(pool))
+            draws = [self.rng.sample(pool, needed) for _ in range(self.chance_samples)] if needed else []
+        if not draws:
+            return self.max_value(after, depth - 1)
+
+        total = 0.0
+        for drawn in draws:
+            child = Position(after.own_index, after.own_health, after.opponent_index,
+                             after.opponent_health, after.own_defense, after.opponent_defense,
+                             after.jesters, tuple(sorted(hand + tuple(drawn), key=lambda card: card.code)))
+            total += self.max_value(child, depth - 1)
+        return total / len(draws)
+
+    def play(self, position, move):
+        """The position after the searching side plays a move, before any draw."""
+        after = Position(position.own_index, position.own_health, position.opponent_index,
+                         position.opponent_health, position.own_defense, position.opponent_defense,
+                         position.jesters, position.hand)
+        action = move.action
+        if action.kind == JESTER:
+            after.hand = ()
+            after.jesters -= 1
+            return after
+
+        played = (action.card.code, action.combo_card.code if action.combo_card else None)
+        after.hand = tuple(card for card in position.hand if card.code not in played)
+        if action.kind in (ATTACK, COMBO):
+            damage = move.damage
+            if after.opponent_defense:
+                damage //= 2
+                after.opponent_defense = False
+            after.opponent_index, after.opponent_health = self.hit(
+                after.opponent_index, after.opponent_health, damage, self.opponent_max)
+        elif action.kind == HEAL:
+            after.own_health = min(after.own_health + move.heal,
+                                   self.own_max[after.own_index])
+        elif action.kind == DEFENSE:
+            after.own_defense = True
+        return after
+
+    def opponent_turn(self, position):
+        """Apply the opponent model's expected attack to position in place."""
+        damage = self.threat
+        if position.own_defense:
+            damage //= 2
+            position.own_defense = False
+        position.own_index, position.own_health = self.hit(
+            position.own_index, position.own_health, damage, self.own_max)
+
+    def hit(self, index, health, damage, maxima):
+        """Damage a top card; like receive_damage, excess damage does not carry over."""
+        health -= damage
+        if health > 0:
+            return index, health
+        index += 1
+        return index, (maxima[index] if index < len(maxima) else 0)
+
+    def evaluate(self, position):
+        """Score a position for the searching side."""
+        weights = self.weights
+        own = position.own_health + sum(self.own_max[position.own_index + 1:])
+        other = position.opponent_health + sum(self.opponent_max[position.opponent_index + 1:])
+        score = weights['health'] * (own - other) + weights['jester'] * position.jesters
+        if position.own_defense:
+            score += weights['own_defense']
+        if position.opponent_defense:
+            score += weights['opponent_defense']
+        return score
@@ -3,107 +3,97 @@
 import pygame
 import os
 import random
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from deck import Deck
 from player import Player
-from ai_player import AIPlayer
-from utils import get_card
+from ai_player import AIPlayer, decide_in_background, init_background_decisions, close_background_decisions
+from sprites import get_sprites
 from button import Button
-
-MAX_HAND_SIZE = 5  # Define the maximum hand size
+from renderer import DirtyRenderer
+from history import ActionHistory
+from atlas import get_atlas
+from text_cache import get_font, render_text
+from profiler import get_profiler
+from preload import FONT_FILE, GAME_FONT_SIZES
+from engine import GameState, PLAYER
+from snapshot import save_game, restore, unpack_rng
+from actions import Action, HEAL, DEFENSE, COMBO, JESTER, hand_actions
+
+# Expert searches in parallel, leaving one core for drawing the game
+SEARCH_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+AI_MIN_THINK_MS = 1000  # The AI always appears to think for at least this long
+HISTORY_SCROLL_LINES = 3  # History lines scrolled per mouse wheel step
+PERF_OVERLAY_KEY = pygame.K_F3  # Toggles the performance overlay
+PERF_OVERLAY_REFRESH_MS = 250  # The overlay's figures are redrawn this often
+
+# Phases of a game. Choices the player has yet to make are phases rather than loops
+# of their own, so input, AI turns and drawing all run from the caller's one loop.
+CHOOSE_CARD = 'choose_card'  # The player picks a card to play, or a Jester
+CHOOSE_ACTION = 'choose_action'  # The player picks what to do with the selected card
+CHOOSE_COMBO_CARD = 'choose_combo_card'  # The player picks a card to combine with a Spades card
+AI_TURN = 'ai_turn'  # The AI decides in the background
+PLAYBACK = 'playback'  # A recorded action is played for whichever side is to move
+GAME_OVER = 'game_over'
 
 
 class Game:
-    # Initializes the game, loads assets, and sets up initial game state.
-    def __init__(self, screen, difficulty='Easy'):
+    # Initializes the game, loads assets, and sets up the first match.
+    def __init__(self, screen, difficulty='Easy', seed=None):
         self.screen = screen
-        self.difficulty = difficulty
         assets_path = self.get_assets_path()
-
-        self.deck = Deck(assets_path)
-        self.player = Player('Player', assets_path)
-        self.ai_player = AIPlayer('AI', assets_path, difficulty=self.difficulty)
-
-        self.current_turn = 'Player'
-        self.running = True
-        self.game_over = False
-
-        self.font = pygame.font.Font(os.path.join(assets_path, 'font.ttf'), 24)
-        self.small_font = pygame.font.Font(os.path.join(assets_path, 'font.ttf'), 18)
-        self.history_font = pygame.font.Font(os.path.join(assets_path, 'font.ttf'), 16)  # Smaller font for history
-        self.background = pygame.image.load(
-            os.path.join(assets_path, 'background.png')).convert()
-        self.clock = pygame.time.Clock()
-        self.message = ""
-        self.defense_active = False
-
-        self.hand_message_printed = False  # Flag to ensure hand is printed only once per turn
-
-        # Card dimensions and scaling factors
-        self.big_card_width = 48
-        self.big_card_height = 64
-        self.big_scale_factor = 3
-
-        self.mini_card_width = 15
-        self.mini_card_height = 22
-        self.mini_scale_factor = 4
-
-        # Load images for player's top cards (Hearts suit)
-        self.top_card_images = {
-            rank: get_card(
-                assets_path, 'bigcards.png',
-                self.big_card_width, self.big_card_height,
-                self.big_scale_factor, 'Hearts', rank
-            )
-            for rank in ['Jack', 'Queen', 'King']
-        }
-
-        # Load images for AI's top cards (Spades suit)
-        self.ai_top_card_images = {
-            rank: get_card(
-                assets_path, 'bigcards.png',
-                self.big_card_width, self.big_card_height,
-                self.big_scale_factor, 'Spades', rank
-            )
-            for rank in ['Jack', 'Queen', 'King']
-        }
-
-        # Extract card back images
-        self.card_back_image = get_card(
-            assets_path, 'bigcards.png',
-            self.big_card_width, self.big_card_height,
-            self.big_scale_factor, 'Back', 'Back'
-        )
-        self.mini_card_back_image = get_card(
-            assets_path, 'minicards.png',
-            self.mini_card_width, self.mini_card_height,
-            self.mini_scale_factor, 'Back', 'Back'
-        )
-
-        # Load images for Jesters
-        self.player_jester_image = get_card(
-            assets_path, 'minicards.png',
-            self.mini_card_width, self.mini_card_height,
-            self.mini_scale_factor, 'Jester', 'Black Jester'
-        )
-        self.ai_jester_image = get_card(
-            assets_path, 'minicards.png',
-            self.mini_card_width, self.mini_card_height,
-            self.mini_scale_factor, 'Jester', 'Red Jester'
-        )
-
-        # Initialize player's and AI's Jesters
-        self.player_jesters = 2
-        self.ai_jesters = 2
-
-        # Create Jester buttons for the player
+        self.state = None
+
+        # AI decisions run in a worker process, so the window keeps drawing at full speed
+        # however long the AI thinks; setting ai_cancel stops a decision in progress
+        self.ai_cancel = multiprocessing.Event()
+        self.ai_executor = ProcessPoolExecutor(
+            max_workers=1, initializer=init_background_decisions, initargs=(self.ai_cancel,))
+        self.ai_future = None
+        self.ai_turn_started = 0
+        self.ai_min_think_ms = AI_MIN_THINK_MS
+        self.match_number = 0  # Tells the AI's worker when a new match starts
+
+        # Set to a replay.ReplayWriter to record the match as it is played
+        self.replay = None
+        # Recorded actions still to be played back, and the time between them
+        self.playback = None
+        self.playback_delay_ms = 0
+        self.playback_started = 0
+
+        # Main, small and (smallest) history fonts; usually preloaded while the menu showed
+        font_size, small_font_size, history_font_size = GAME_FONT_SIZES
+        self.font = get_font(os.path.join(assets_path, FONT_FILE), font_size)
+        self.small_font = get_font(os.path.join(assets_path, FONT_FILE), small_font_size)
+        self.history_font = get_font(os.path.join(assets_path, FONT_FILE), history_font_size)
+        # The renderer keeps its own display-format copy, so the image is used as loaded
+        self.background = get_atlas().get_image(assets_path, 'background.png')
+
+        # Card sprites are shared by every card with the same suit and value
+        self.sprites = get_sprites(assets_path)
+
+        # Images for player's top cards (Hearts suit) and AI's top cards (Spades suit)
+        self.top_card_images = {rank: self.sprites.big('Hearts', rank) for rank in ['Jack', 'Queen', 'King']}
+        self.ai_top_card_images = {rank: self.sprites.big('Spades', rank) for rank in ['Jack', 'Queen', 'King']}
+
+        # Card back images
+        self.card_back_image = self.sprites.big('Back', 'Back')
+        self.mini_card_back_image = self.sprites.mini('Back', 'Back')
+
+        # Images for Jesters
+        self.player_jester_image = self.sprites.mini('Jester', 'Black Jester')
+        self.ai_jester_image = self.sprites.mini('Jester', 'Red Jester')
+
+        # Jester buttons for the player and the buttons for the selected card's actions
         self.player_jester_buttons = []
-        self.create_player_jester_buttons()
-
-        # Initialize action buttons list
         self.action_buttons = []
 
-        # Initialize action history
-        self.action_history = []
+        # Initialize action history; entries are rendered once, as they are added
+        self.history_rect = pygame.Rect(self.screen.get_width() - 290, 50, 280, self.screen.get_height() - 60)
+        self.history_line_height = 20
+        self.action_history = ActionHistory(self.history_font, self.history_rect.width,
+                                            self.history_rect.height // self.history_line_height)
 
         # Initialize the toggle for showing AI's cards
         self.show_ai_cards = True
@@ -130,9 +120,67 @@ class Game:
             callback=self.back_to_menu
         )
 
-        # Flags for Spades combo
-        self.waiting_for_second_card = False
-        self.selected_second_card_index = None
+        # Frame, phase and drawing timings, shown by the performance overlay
+        self.profiler = get_profiler()
+        self.show_perf_overlay = False
+
+        # Only the regions whose contents changed are redrawn each frame
+        self.renderer = DirtyRenderer(self.screen, self.background, self.profiler)
+        self.create_render_layers()
+
+        self.reset(difficulty, seed)
+
+    # Sets up a new match against difficulty. Loaded assets, the AI's worker process and
+    # the renderer are kept, so only the match itself is rebuilt; start_game deals it.
+    def reset(self, difficulty, seed=None):
+        self.cancel_ai()
+        if self.state is not None:
+            self.ai_player.close()
+        self.difficulty = difficulty
+        assets_path = self.get_assets_path()
+
+        # One seed determines the whole match. The deck shuffles with a generator of its
+        # own, so that a replay can rebuild every draw from the seed and the actions alone.
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.match_number += 1
+        ai_rng = random.Random(f"ai:{self.seed}")
+
+        # All rules state lives in the engine; the Game only draws it and collects input
+        self.state = GameState(
+            Deck(rng=random.Random(self.seed)),
+            Player('Player', assets_path),
+            AIPlayer('AI', assets_path, difficulty=self.difficulty, rng=ai_rng, search_workers=SEARCH_WORKERS),
+        )
+        self.deck = self.state.deck
+        self.player = self.state.player
+        self.ai_player = self.state.ai_player
+
+        self.running = True  # Cleared once the game should be closed
+        self.phase = None  # Set when the game starts
+        self.selected_card = None  # The card the pending choice is about
+        self.message = ""
+        self.action_buttons = []
+        self.playback = None
+        self.ai_search_stats = {}  # What the search behind the AI's last decision did
+        self.create_player_jester_buttons()
+        self.action_history.clear()
+        self.profiler.reset()
+        self.renderer.invalidate()
+
+    # The side whose turn it is, as tracked by the engine.
+    @property
+    def current_turn(self):
+        return self.state.current_turn
+
+    # Whether the game has ended and the game over screen is showing.
+    @property
+    def game_over(self):
+        return self.phase == GAME_OVER
+
+    # Whether the player is choosing the second card of a Spades combo.
+    @property
+    def waiting_for_second_card(self):
+        return self.phase == CHOOSE_COMBO_CARD
 
     # Retrieves the path to the game's assets directory.
     def get_assets_path(self):
@@ -144,7 +192,7 @@ class Game:
         self.player_jester_buttons.clear()
         jester_button_width = self.player_jester_image.get_width()
         jester_button_height = self.player_jester_image.get_height()
-        for i in range(self.player_jesters):
+        for i in range(self.player.jesters):
             x = self.screen.get_width() - (jester_button_width + 10) * (i + 1)
             y = self.screen.get_height() - jester_button_height - 10
             button = Button(
@@ -168,76 +216,121 @@ class Game:
     def back_to_menu(self):
         self.running = False
 
-    # Allows the player to use a Jester to refresh their hand.
+    # Allows the player to use a Jester to refresh their hand, dropping any choice in progress.
     def use_player_jester(self, index):
-        if self.player_jesters > 0:
-            # Discard all current hand cards
-            for card in self.player.hand:
-                self.deck.discard(card)
-            self.player.hand.clear()
-            # Draw 5 new cards
-            self.player.draw_cards(self.deck, 5)
-            self.display_message("You have refreshed your hand using a Jester!")
-            self.player_jesters -= 1
+        if self.phase in (CHOOSE_CARD, CHOOSE_ACTION, CHOOSE_COMBO_CARD) and self.player.jesters > 0:
+            self.perform_action(Action(JESTER))
             self.create_player_jester_buttons()
-            self.current_turn = 'AI'
 
-    # Starts the game and initializes both players' hands.
+    # Starts the game by dealing both players' hands and entering the first turn.
     def start_game(self):
-        self.player.draw_cards(self.deck, 5)
-        self.ai_player.draw_cards(self.deck, 5)
-        self.game_loop()
-
-    # Main game loop: processes events, updates game state, and renders frames.
-    def game_loop(self):
-        while self.running:
-            self.handle_events()
-            self.update_game_state()
+        self.state.deal()
+        if self.replay is not None:
+            self.replay.record_deal(self.state)
+        self.next_phase()
+
+    # Writes the match to a save file that load() can resume it from.
+    def save(self, path):
+        save_game(path, self.seed, self.difficulty, self.state, self.deck.rng, self.ai_player.rng)
+
+    # Resumes a match read with snapshot.load_game; play goes on from the saved turn.
+    def load(self, saved):
+        self.reset(saved.difficulty, saved.seed)
+        restore(self.state, saved.snapshot)
+        unpack_rng(self.deck.rng, saved.deck_rng_state)
+        unpack_rng(self.ai_player.rng, saved.ai_rng_state)
+        self.create_player_jester_buttons()
+        self.display_message("Game resumed.")
+        self.next_phase()
+
+    # Plays recorded actions for both sides, one every delay_ms, before the game goes on
+    # as usual from where they end. Call before start_game.
+    def play_back(self, actions, delay_ms):
+        self.playback = deque(actions)
+        self.playback_delay_ms = delay_ms
+
+    # Runs one frame: the frame's input, then game logic, then drawing, each timed.
+    def run_frame(self, events):
+        profiler = self.profiler
+        profiler.begin_frame()
+        with profiler.section('handle_events'):
+            for event in events:
+                self.handle_event(event)
+        with profiler.section('update'):
+            self.update()
+        with profiler.section('render'):
             self.render()
-            self.clock.tick(60)
-
-            if self.current_turn == 'Player' and not self.game_over:
-                if not self.waiting_for_second_card and not self.action_buttons:
-                    self.start_player_turn()
-            elif self.current_turn == 'AI' and not self.game_over:
-                pygame.time.delay(1000)  # Delay for 1 second before AI action
-                self.start_ai_turn()
+        profiler.end_frame()
+
+    # Runs one frame's worth of game logic: the AI's turn is the only phase that
+    # advances without input.
+    def update(self):
+        if self.phase == AI_TURN:
+            self.finish_ai_turn()
+        elif self.phase == PLAYBACK:
+            if pygame.time.get_ticks() - self.playback_started >= self.playback_delay_ms:
+                self.perform_action(self.playback.popleft())
+
+    # Moves to the phase of whoever acts next, or to the game over screen.
+    def next_phase(self):
+        self.selected_card = None
+        self.action_buttons = []
+        self.message = ""
+        if self.player.is_defeated():
+            self.phase = GAME_OVER
+            self.display_end_message("You have been defeated!")
+        elif self.ai_player.is_defeated():
+            self.phase = GAME_OVER
+            self.display_end_message("You have won the game!")
+        elif self.playback:
+            self.phase = PLAYBACK
+            self.playback_started = pygame.time.get_ticks()
+            self.hand_message(self.current_turn, self.state.current.hand)
+        elif self.current_turn == PLAYER:
+            self.start_player_turn()
+        else:
+            self.start_ai_turn()
 
-    # Begins the player's turn by refilling their hand and logging it.
+    # Begins the player's turn by logging their hand (the engine has already refilled it).
     def start_player_turn(self):
-        # Refill player's hand to MAX_HAND_SIZE
-        self.player.draw_cards(self.deck, MAX_HAND_SIZE - len(self.player.hand))
-        
-        # Log the player's hand to the command line once
-        if not self.hand_message_printed:
-            self.hand_message("Player", self.player.hand)
-            self.hand_message_printed = True
-
-        # Set the turn to Player
-        self.current_turn = 'Player'
-
-    # Begins the AI's turn by refilling its hand and executing its action.
+        self.phase = CHOOSE_CARD
+        self.hand_message("Player", self.player.hand)
+
+    # Begins the AI's turn by logging its hand and starting its decision in the background.
     def start_ai_turn(self):
-        # Refill AI's hand to MAX_HAND_SIZE
-        self.ai_player.draw_cards(self.deck, MAX_HAND_SIZE - len(self.ai_player.hand))
-        
-        # Log the AI's hand to the command line once
-        if self.hand_message_printed:
-            self.hand_message("AI", self.ai_player.hand)
-            self.hand_message_printed = False
-
-        # Execute the AI's turn
-        self.ai_turn()
-    
-    # Ends the current turn and transitions to the next turn.
-    def end_turn(self):
-        self.hand_message_printed = False  # Reset for the next turn
-        if self.current_turn == 'Player':
-            self.current_turn = 'AI'
-            self.start_ai_turn()
-        else:
-            self.current_turn = 'Player'
-            self.start_player_turn()
+        self.phase = AI_TURN
+        self.hand_message("AI", self.ai_player.hand)
+
+        # The worker decides on a copy of the state, seeded from the AI's own random stream
+        self.ai_turn_started = pygame.time.get_ticks()
+        self.ai_cancel.clear()
+        self.ai_future = self.ai_executor.submit(
+            decide_in_background, self.state, self.ai_player.rng.getrandbits(64), self.match_number)
+
+    # Plays the AI's action once it has been decided and the minimum thinking time is up.
+    def finish_ai_turn(self):
+        if not self.ai_future.done():
+            return
+        if pygame.time.get_ticks() - self.ai_turn_started < self.ai_min_think_ms:
+            return
+        future, self.ai_future = self.ai_future, None
+        action, elapsed, self.ai_search_stats = future.result()
+        self.profiler.record('ai_decision', elapsed)
+        self.perform_action(action)
+
+    # Stops any AI decision in progress; the worker process stays up for the next one.
+    def cancel_ai(self):
+        if self.ai_future is not None:
+            self.ai_cancel.set()
+            self.ai_future.cancel()
+            self.ai_future = None
+
+    # Stops any AI decision in progress and shuts down the AI's worker process, once it
+    # has released the searches it kept.
+    def stop_ai(self):
+        self.cancel_ai()
+        self.ai_executor.submit(close_background_decisions)
+        self.ai_executor.shutdown(wait=False)
 
     # Prints the player's or AI's current hand to the console.
     def hand_message(self, player_name, hand):
@@ -247,64 +340,146 @@ class Game:
     # Handles player input and UI interactions during the game.
     def handle_events(self):
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if self.game_over:
-                    self.back_to_menu_button.handle_event(event)
-                else:
-                    pos = pygame.mouse.get_pos()
-                    if self.current_turn == 'Player':
-                        selected_card_index = self.get_card_at_pos(pos)
-                        if selected_card_index is not None:
-                            if self.waiting_for_second_card:
-                                self.selected_second_card_index = selected_card_index
-                            else:
-                                self.player_turn(selected_card_index)
-                    if self.action_buttons:
-                        for button in self.action_buttons:
-                            button.handle_event(event)
-                    for button in self.player_jester_buttons:
-                        button.handle_event(event)
-                    self.show_ai_cards_button.handle_event(event)
-
-    # Checks for win/lose conditions and updates the game state.
-    def update_game_state(self):
-        # Only check for game over conditions if the game isn't already over
-        if not self.game_over:
-            if self.player.is_defeated():
-                self.display_end_message("You have been defeated!")
-                self.game_over = True
-            elif self.ai_player.is_defeated():
-                self.display_end_message("You have won the game!")
-                self.game_over = True
+            self.handle_event(event)
+
+    # Routes one input event to whatever the current phase is waiting for.
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.KEYDOWN and event.key == PERF_OVERLAY_KEY:
+            self.show_perf_overlay = not self.show_perf_overlay
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if self.phase == GAME_OVER:
+                self.back_to_menu_button.handle_event(event)
+                return
+            if self.phase in (CHOOSE_CARD, CHOOSE_COMBO_CARD):
+                selected_card_index = self.get_card_at_pos(event.pos)
+                if selected_card_index is not None:
+                    if self.phase == CHOOSE_COMBO_CARD:
+                        self.choose_combo_card(selected_card_index)
+                    else:
+                        self.player_turn(selected_card_index)
+            elif self.phase == CHOOSE_ACTION:
+                for button in self.action_buttons:
+                    button.handle_event(event)
+            # Buttons may be replaced by their own callbacks, so iterate over copies
+            for button in list(self.player_jester_buttons):
+                button.handle_event(event)
+            self.show_ai_cards_button.handle_event(event)
+        elif event.type == pygame.MOUSEWHEEL:
+            # Wheel up scrolls back to older entries
+            if self.history_rect.collidepoint(pygame.mouse.get_pos()):
+                self.action_history.scroll(event.y * HISTORY_SCROLL_LINES)
 
     # Renders the game elements (e.g., cards, buttons, background) on the screen.
     def render(self):
         if self.game_over:
             self.draw_game_over_screen()
             pygame.display.flip()
+            self.renderer.invalidate()
             return
 
-        self.screen.blit(self.background, (0, 0))
-        self.draw_ai_hand()
-        self.draw_player_hand()
-        self.draw_top_cards()
-        self.draw_message()
-        if self.action_buttons:
-            for button in self.action_buttons:
-                button.draw(self.screen)
-        for button in self.player_jester_buttons:
+        self.renderer.render()
+
+    # Splits the screen into fixed regions, each redrawn only when what it shows changes.
+    def create_render_layers(self):
+        width, height = self.screen.get_size()
+        card_width, card_height = self.card_back_image.get_size()
+        mini_width, mini_height = self.mini_card_back_image.get_size()
+        top_card_width, top_card_height = self.top_card_images['King'].get_size()
+        top_card_y = height // 2 - top_card_height // 2
+        line_height = self.font.get_linesize()
+        add = self.renderer.add_layer
+
+        add('ai_hand', (width // 2 - 200, 10, 400, mini_height),
+            self.draw_ai_hand,
+            lambda: (tuple(card.code for card in self.ai_player.hand), self.show_ai_cards))
+        add('player_hand', (0, height - (card_height // 2 + 20), width, card_height // 2 + 20),
+            self.draw_player_hand,
+            lambda: (tuple(card.code for card in self.player.hand), self.hovered_card_index()))
+        # Each top card region covers the card, its health bar and the health text
+        add('player_top_card', (width // 2 - top_card_width - 100, top_card_y - 25, top_card_width + 70, top_card_height + 25),
+            self.draw_player_top_card,
+            lambda: (self.player.current_top_card_index, self.player.top_card() and self.player.top_card()['health']))
+        add('ai_top_card', (width // 2 + 100, top_card_y - 25, top_card_width + 70, top_card_height + 25),
+            self.draw_ai_top_card,
+            lambda: (self.ai_player.current_top_card_index, self.ai_player.top_card() and self.ai_player.top_card()['health']))
+        # The message sits at the top, or above the hand while a combo card is chosen
+        add('message_top', (0, 20, width, line_height),
+            lambda: not self.waiting_for_second_card and self.draw_message(),
+            lambda: (self.message, self.waiting_for_second_card))
+        add('message_bottom', (0, height - 200, width, line_height),
+            lambda: self.waiting_for_second_card and self.draw_message(),
+            lambda: (self.message, self.waiting_for_second_card))
+        add('ai_thinking', (width // 2 - 150, 105, 300, self.small_font.get_linesize()),
+            self.draw_ai_thinking, self.ai_thinking_dots)
+        add('action_buttons', (0, height - 150, width, 50),
+            lambda: self.draw_buttons(self.action_buttons),
+            lambda: tuple((button.text, button.rect.topleft, button.hovered) for button in self.action_buttons))
+        add('player_jesters', (width - 2 * (mini_width + 10), height - mini_height - 10, 2 * (mini_width + 10), mini_height),
+            lambda: self.draw_buttons(self.player_jester_buttons),
+            lambda: tuple((button.rect.topleft, button.hovered) for button in self.player_jester_buttons))
+        add('ai_jesters', (10, 10, 2 * (mini_width + 10), mini_height),
+            self.draw_ai_jesters, lambda: self.ai_player.jesters)
+        add('history', self.history_rect, self.draw_action_history,
+            lambda: self.action_history.version)
+        add('show_ai_cards_button', self.show_ai_cards_button.rect,
+            lambda: self.show_ai_cards_button.draw(self.screen),
+            lambda: (self.show_ai_cards_button.text, self.show_ai_cards_button.hovered))
+        # Added last so it is drawn over everything it covers
+        add('perf_overlay', (10, 50, 330, 400), self.draw_perf_overlay,
+            lambda: self.show_perf_overlay and pygame.time.get_ticks() // PERF_OVERLAY_REFRESH_MS)
+
+    # Shows FPS, frame time percentiles and where frame time went, from the profiler.
+    def draw_perf_overlay(self):
+        if not self.show_perf_overlay:
+            return
+        stats = self.profiler.stats()
+        frame_ms = stats['frame_ms']
+        lines = [
+            f"FPS {stats['fps']:.1f}",
+            f"frame p50 {frame_ms['p50']:.1f}  p95 {frame_ms['p95']:.1f}  p99 {frame_ms['p99']:.1f} ms",
+            "section      mean / p95 / max ms",
+        ]
+        for name, section in sorted(stats['sections'].items()):
+            lines.append(f"{name}  {section['mean_ms']:.2f} / {section['p95_ms']:.2f} / {section['max_ms']:.2f}")
+        lines.extend(self.ai_search_lines())
+
+        # The figures change on every refresh, so they are rendered directly, not cached
+        line_height = self.history_font.get_linesize()
+        panel = pygame.Surface((330, min(400, len(lines) * line_height + 10)), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        for i, line in enumerate(lines):
+            panel.blit(self.history_font.render(line, True, (255, 255, 0)), (5, 5 + i * line_height))
+        self.screen.blit(panel, (10, 50))
+
+    # Describes the search behind the AI's last decision for the performance overlay.
+    def ai_search_lines(self):
+        stats = self.ai_search_stats
+        if 'hit_rate' in stats:
+            # Hard's expectimax search and its transposition table
+            return [
+                f"AI search {stats['nodes']} nodes, {1000 * stats['elapsed']:.0f} ms",
+                f"TT hits {stats['hit_rate']:.0%}, {stats['size']}/{stats['max_size']} used, "
+                f"{stats['replacements']} replaced",
+            ]
+        if 'iterations' in stats:
+            # Expert's tree search
+            return [
+                f"AI search {stats['iterations']} iterations, {1000 * stats['elapsed']:.0f} ms",
+                f"tree {stats['tree_size']} nodes, {stats['reused_visits']} visits reused",
+            ]
+        return []
+
+    # Draws a list of buttons.
+    def draw_buttons(self, buttons):
+        for button in buttons:
             button.draw(self.screen)
-        self.draw_ai_jesters()
-        self.draw_action_history()
-        self.show_ai_cards_button.draw(self.screen)
-        pygame.display.flip()
 
     # Displays the game over screen when the game ends.
     def draw_game_over_screen(self):
         self.screen.fill((0, 0, 0))
-        message_surface = self.font.render(self.message, True, (255, 255, 255))
+        message_surface = render_text(self.font, self.message, (255, 255, 255))
         message_rect = message_surface.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() // 2))
         self.screen.blit(message_surface, message_rect)
         self.back_to_menu_button.draw(self.screen)
@@ -313,53 +488,19 @@ class Game:
     def draw_ai_jesters(self):
         x = 10
         y = 10
-        for i in range(self.ai_jesters):
+        for i in range(self.ai_player.jesters):
             self.screen.blit(self.ai_jester_image,
                              (x + i * (self.ai_jester_image.get_width() + 10), y))
 
     # Displays the history of game actions on the screen.
     def draw_action_history(self):
-        history_width = 280  # Reduced width to prevent overlap
-        x = self.screen.get_width() - history_width - 10  # Positioned with some padding from the edge
-        y = 50  # Positioned below the AI's mini cards
-        line_height = 20  # Smaller line height
-        max_width = history_width
-        max_lines = (self.screen.get_height() - y - 10) // line_height
-
-        displayed_lines = 0
-        for entry in reversed(self.action_history[-15:]):
-            wrapped_lines = self.wrap_text(entry, self.history_font, max_width)
-            for line in wrapped_lines:
-                if displayed_lines >= max_lines:
-                    break
-                text_surface = self.history_font.render(line, True, (255, 255, 255))
-                self.screen.blit(text_surface, (x, y + displayed_lines * line_height))
-                displayed_lines += 1
-            if displayed_lines >= max_lines:
-                break
-
-    # Helper function to wrap long text for rendering.
-    def wrap_text(self, text, font, max_width):
-        """Helper function to wrap text for rendering."""
-        words = text.split(' ')
-        lines = []
-        current_line = ""
-        for word in words:
-            test_line = current_line + word + " "
-            if font.size(test_line)[0] <= max_width:
-                current_line = test_line
-            else:
-                lines.append(current_line.strip())
-                current_line = word + " "
-        if current_line:
-            lines.append(current_line.strip())
-        return lines
-
-    # Adds a message to the action history for display.
-    def add_action_to_history(self, message):
-        self.action_history.append(message)
-        if len(self.action_history) > 15:
-            self.action_history.pop(0)
+        x, y = self.history_rect.topleft
+        for i, line in enumerate(self.action_history.visible_lines()):
+            self.screen.blit(line, (x, y + i * self.history_line_height))
+
+    # Adds a message, and the engine event it describes if any, to the action history.
+    def add_action_to_history(self, message, event=None):
+        self.action_history.append(message, event)
 
     # Draws the player's hand of cards at the bottom of the screen.
     def draw_player_hand(self):
@@ -367,23 +508,39 @@ class Game:
         if not hand:
             return
         card_spacing = 10
-        card_width = hand[0].big_image.get_width()
-        card_height = hand[0].big_image.get_height()
+        card_width = self.card_back_image.get_width()
+        card_height = self.card_back_image.get_height()
         total_width = len(hand) * card_width + (len(hand) - 1) * card_spacing
         start_x = (self.screen.get_width() - total_width) // 2
         base_y = self.screen.get_height() - (card_height // 2)
 
-        mouse_pos = pygame.mouse.get_pos()
+        hovered = self.hovered_card_index()
         for i, card in enumerate(hand):
             x = start_x + i * (card_width + card_spacing)
-            card_rect = pygame.Rect(x, base_y, card_width, card_height)
-            if card_rect.collidepoint(mouse_pos):
+            if i == hovered:
                 y = base_y - 20
             else:
                 y = base_y
-            self.screen.blit(card.big_image, (x, y),
+            self.screen.blit(self.sprites.big_image(card), (x, y),
                              area=pygame.Rect(0, 0, card_width, card_height // 2 + 20))
 
+    # Index of the card in the player's hand under the mouse, which is drawn raised.
+    def hovered_card_index(self):
+        hand = self.player.hand
+        card_spacing = 10
+        card_width = self.card_back_image.get_width()
+        card_height = self.card_back_image.get_height()
+        total_width = len(hand) * card_width + (len(hand) - 1) * card_spacing
+        start_x = (self.screen.get_width() - total_width) // 2
+        base_y = self.screen.get_height() - (card_height // 2)
+
+        mouse_pos = pygame.mouse.get_pos()
+        for i in range(len(hand)):
+            x = start_x + i * (card_width + card_spacing)
+            if pygame.Rect(x, base_y, card_width, card_height).collidepoint(mouse_pos):
+                return i
+        return None
+
     # Draws the AI's hand of cards at the top of the screen.
     def draw_ai_hand(self):
         if not self.ai_player.hand:
@@ -391,8 +548,8 @@ class Game:
 
         # Card positioning
         card_spacing = 20
-        card_width = self.ai_player.hand[0].mini_image.get_width()
-        card_height = self.ai_player.hand[0].mini_image.get_height()
+        card_width = self.mini_card_back_image.get_width()
+        card_height = self.mini_card_back_image.get_height()
         total_width = len(self.ai_player.hand) * card_width + (len(self.ai_player.hand) - 1) * card_spacing
         start_x = (self.screen.get_width() - total_width) // 2  # Center horizontally
         base_y = 10  # Top margin
@@ -401,13 +558,13 @@ class Game:
             x = start_x + i * (card_width + card_spacing)
             if self.show_ai_cards:
                 # Show actual AI cards if toggled on
-                self.screen.blit(card.mini_image, (x, base_y))
+                self.screen.blit(self.sprites.mini_image(card), (x, base_y))
             else:
                 # Show card backs if AI cards are hidden
                 self.screen.blit(self.mini_card_back_image, (x, base_y))
 
-    # Displays the current top cards of both players and their health.
-    def draw_top_cards(self):
+    # Displays the player's current top card and its health.
+    def draw_player_top_card(self):
         player_top_card = self.player.top_cards[self.player.current_top_card_index]
         top_card_image = self.top_card_images[player_top_card['name']]
         x = self.screen.get_width() // 2 - top_card_image.get_width() - 100
@@ -415,9 +572,11 @@ class Game:
         self.screen.blit(top_card_image, (x, y))
         self.draw_health_bar(x, y - 20, player_top_card['health'], player_top_card['max_health'])
         health_text = f"{player_top_card['health']}/{player_top_card['max_health']}"
-        health_surface = self.small_font.render(health_text, True, (255, 255, 255))
+        health_surface = render_text(self.small_font, health_text, (255, 255, 255))
         self.screen.blit(health_surface, (x + 105, y - 25))
 
+    # Displays the AI's current top card and its health.
+    def draw_ai_top_card(self):
         ai_top_card = self.ai_player.top_cards[self.ai_player.current_top_card_index]
         top_card_image_ai = self.ai_top_card_images[ai_top_card['name']]
         x_ai = self.screen.get_width() // 2 + 100
@@ -425,7 +584,7 @@ class Game:
         self.screen.blit(top_card_image_ai, (x_ai, y_ai))
         self.draw_health_bar(x_ai, y_ai - 20, ai_top_card['health'], ai_top_card['max_health'])
         health_text_ai = f"{ai_top_card['health']}/{ai_top_card['max_health']}"
-        health_surface_ai = self.small_font.render(health_text_ai, True, (255, 255, 255))
+        health_surface_ai = render_text(self.small_font, health_text_ai, (255, 255, 255))
         self.screen.blit(health_surface_ai, (x_ai + 105, y_ai - 25))
 
     # Draws a health bar for a card based on its current health.
@@ -444,8 +603,8 @@ class Game:
         if not hand:
             return None
         card_spacing = 10
-        card_width = hand[0].big_image.get_width()
-        card_height = hand[0].big_image.get_height()
+        card_width = self.card_back_image.get_width()
+        card_height = self.card_back_image.get_height()
         total_width = len(hand) * card_width + (len(hand) - 1) * card_spacing
         start_x = (self.screen.get_width() - total_width) // 2
         base_y = self.screen.get_height() - (card_height // 2)
@@ -459,85 +618,29 @@ class Game:
 
     # Processes the player's action based on the selected card.
     def player_turn(self, selected_card_index):
-        selected_card = self.player.play_card(selected_card_index)
-
-        if selected_card.suit == 'Hearts':
-            actions = [
-                {'text': f"Attack ({selected_card.get_attack_value()})", 'value': 'Attack'},
-                {'text': f"Heal ({selected_card.get_attack_value()})", 'value': 'Heal'}
-            ]
-            self.selected_action = None
-            self.get_player_action(actions, selected_card)
-        elif selected_card.suit == 'Clubs':
-            base_damage = selected_card.get_attack_value()
-            damage = base_damage * 2  # Double damage for Clubs
-            self.ai_player.receive_damage(damage)
-            message = f"You attacked for {damage} damage with Clubs (double damage)!"
-            self.display_message(message)
-            self.deck.discard(selected_card)
-            self.current_turn = 'AI'
-        elif selected_card.suit == 'Diamonds':
-            actions = [
-                {'text': f"Attack ({selected_card.get_attack_value()})", 'value': 'Attack'},
-                {'text': "Defense", 'value': 'Defense'}
-            ]
-            self.selected_action = None
-            self.get_player_action(actions, selected_card)
-        elif selected_card.suit == 'Spades':
-            if len(self.player.hand) == 0:
-                self.display_message("No cards to combine with Spades.")
-                self.player.hand.append(selected_card)
-                return
-            else:
-                self.waiting_for_second_card = True
-                self.message = "Select a card to combine with Spades."
-                self.selected_second_card_index = None
-                self.wait_for_second_card(selected_card)
-                return
-        elif selected_card.value == 'Ace':
-            damage = 1
-            self.ai_player.receive_damage(damage)
-            message = f"You dealt {damage} damage with an Ace!"
-            self.display_message(message)
-            self.deck.discard(selected_card)
-            self.current_turn = 'AI'
+        selected_card = self.player.hand[selected_card_index]
+        moves = hand_actions(self.player.hand, self.player.jesters)
+
+        card_moves = moves.by_card[selected_card.code]
+        choices = [{'text': self.move_label(move), 'value': move.action.kind} for move in card_moves]
+        if selected_card.suit == 'Spades' and moves.combos:
+            # Spades attack alone or together with a second card, picked next
+            choices.append({'text': "Combo", 'value': COMBO})
+        if len(choices) == 1:
+            # Clubs always attack, dealing double damage
+            self.perform_action(card_moves[0].action)
         else:
-            damage = selected_card.get_attack_value()
-            self.ai_player.receive_damage(damage)
-            message = f"You attacked for {damage} damage!"
-            self.display_message(message)
-            self.deck.discard(selected_card)
-            self.current_turn = 'AI'
-
-    # Handles the player's decision-making for actions (attack, heal, etc)
-    def get_player_action(self, actions, selected_card):
-        self.create_action_buttons(actions)
-        self.selected_action = None
-        waiting_for_action = True
-        while waiting_for_action and self.running:
-            self.handle_events()
-            self.render()
-            if self.selected_action:
-                action_value = self.selected_action
-                if action_value == 'Attack':
-                    damage = selected_card.get_attack_value()
-                    self.ai_player.receive_damage(damage)
-                    message = f"You attacked for {damage} damage!"
-                    self.display_message(message)
-                elif action_value == 'Heal':
-                    top_card = self.player.top_cards[self.player.current_top_card_index]
-                    heal_amount = selected_card.get_attack_value()
-                    top_card['health'] = min(top_card['health'] + heal_amount, top_card['max_health'])
-                    message = f"You healed your {top_card['name']} for {heal_amount} health!"
-                    self.display_message(message)
-                elif action_value == 'Defense':
-                    self.player.defense_active = True
-                    self.display_message("You have activated defense!")
-                self.deck.discard(selected_card)
-                self.current_turn = 'AI'
-                self.action_buttons.clear()
-                waiting_for_action = False
-            self.clock.tick(60)
+            self.selected_card = selected_card
+            self.phase = CHOOSE_ACTION
+            self.create_action_buttons(choices)
+
+    # Button text for one of the moves offered for the selected card.
+    def move_label(self, move):
+        if move.action.kind == HEAL:
+            return f"Heal ({move.heal})"
+        elif move.action.kind == DEFENSE:
+            return "Defense"
+        return f"Attack ({move.action.card.get_attack_value()})"
 
     # Creates buttons for the player's action choices during their turn.
     def create_action_buttons(self, actions):
@@ -563,140 +666,91 @@ class Game:
             )
             self.action_buttons.append(button)
 
-    # Processes the player's selected action (e.g., attack, heal, defend).
+    # Processes the player's selected action (e.g., attack, heal, defend), or asks for the card of a combo.
     def handle_action_selection(self, action_value):
-        self.selected_action = action_value
-
-    # Waits for the player to select a second card for a Spades combo.
-    def wait_for_second_card(self, spades_card):
-        self.waiting_for_second_card = True
-        while self.waiting_for_second_card and self.running:
-            self.handle_events()
-            self.render()
-            if self.selected_second_card_index is not None:
-                second_card = self.player.play_card(self.selected_second_card_index)
-                total_damage = spades_card.get_attack_value() + second_card.get_attack_value()
-                self.ai_player.receive_damage(total_damage)
-                message = f"You attacked for {total_damage} damage with Spades combo!"
-                self.display_message(message)
-                self.deck.discard(spades_card)
-                self.deck.discard(second_card)
-                self.current_turn = 'AI'
-                self.waiting_for_second_card = False
-                self.selected_second_card_index = None
-                self.action_buttons.clear()
-            self.clock.tick(60)
+        if action_value == COMBO:
+            self.phase = CHOOSE_COMBO_CARD
+            self.action_buttons = []
+            self.message = "Select a card to combine with Spades."
+        else:
+            self.perform_action(Action(action_value, self.selected_card))
+
+    # Plays the pending Spades card together with the chosen second card.
+    def choose_combo_card(self, selected_card_index):
+        second_card = self.player.hand[selected_card_index]
+        if second_card is not self.selected_card:
+            self.perform_action(Action(COMBO, self.selected_card, second_card))
+
+    # Applies an action through the engine, reports what happened and moves on.
+    def perform_action(self, action):
+        actor = self.current_turn
+        waiting_hand_size = len(self.state.opponent.hand)
+        event = self.state.apply(action)
+        if self.replay is not None:
+            self.replay.record_turn(self.state, actor, action, waiting_hand_size)
+        self.display_message(self.describe_event(event), event)
+        self.next_phase()
+
+    # Turns an engine event into the message shown to the player.
+    def describe_event(self, event):
+        if event.actor == PLAYER:
+            if event.kind == JESTER:
+                return "You have refreshed your hand using a Jester!"
+            elif event.kind == HEAL:
+                return f"You healed your {event.target} for {event.amount} health!"
+            elif event.kind == DEFENSE:
+                return "You have activated defense!"
+            elif event.kind == COMBO:
+                return f"You attacked for {event.amount} damage with Spades combo!"
+            elif event.card.suit == 'Clubs':
+                return f"You attacked for {event.amount} damage with Clubs (double damage)!"
+            return f"You attacked for {event.amount} damage!"
+
+        if event.kind == JESTER:
+            return "AI used a Jester to refresh its hand!"
+        elif event.kind == HEAL:
+            return f"AI healed its {event.target} for {event.amount} health!"
+        elif event.kind == DEFENSE:
+            return "AI has activated defense!"
+        attack_message = f"AI attacked you for {event.amount} damage!"
+        if event.kind == COMBO:
+            attack_message += f" (using {event.card.suit} + {event.combo_card.suit})"
+        return attack_message
 
     # Displays a message on the screen and logs it in the history.
-    def display_message(self, message):
+    def display_message(self, message, event=None):
         #self.message = message
         print(message)
-        if not self.waiting_for_second_card:
-            self.add_action_to_history(message)
+        self.add_action_to_history(message, event)
 
     # Sets and displays the end-game message (win or lose)
     def display_end_message(self, message):
         self.message = message
         print(message)
 
+    # Number of dots in the animated "thinking" message, or None while the AI is not thinking.
+    def ai_thinking_dots(self):
+        if self.ai_future is None:
+            return None
+        return (pygame.time.get_ticks() - self.ai_turn_started) // 300 % 4
+
+    # Shows an animated "thinking" message while the AI decides.
+    def draw_ai_thinking(self):
+        dots = self.ai_thinking_dots()
+        if dots is None:
+            return
+        dots = '.' * dots
+        text_surface = render_text(self.small_font, f"AI is thinking{dots}", (255, 255, 255))
+        x = (self.screen.get_width() - text_surface.get_width()) // 2
+        self.screen.blit(text_surface, (x, 105))  # Just below the AI's hand
+
     # Renders a message at the top of the screen during the game
     def draw_message(self):
         if self.message:
-            text_surface = self.font.render(self.message, True, (255, 255, 255))
+            text_surface = render_text(self.font, self.message, (255, 255, 255))
             x = (self.screen.get_width() - text_surface.get_width()) // 2
             if self.waiting_for_second_card:
                 y = self.screen.get_height() - 200
             else:
                 y = 20
             self.screen.blit(text_surface, (x, y))
-
-    # Executes the AI's turn by deciding and performing one action.
-    def ai_turn(self):
-        # Get the player's current top card
-        player_top_card = None
-        if self.player.current_top_card_index < len(self.player.top_cards):
-            player_top_card = self.player.top_cards[self.player.current_top_card_index]
-
-        # AI decides which card to play
-        selected_card = self.ai_player.decide_action(player_top_card, self.player.defense_active)
-
-        # If AI uses a Jester to refresh its hand
-        if selected_card == "Use Jester":
-            if self.ai_player.jesters > 0:
-                for card in self.ai_player.hand:
-                    self.deck.discard(card)
-                self.ai_player.hand.clear()
-                self.ai_player.draw_cards(self.deck, 5)
-                self.display_message("AI used a Jester to refresh its hand!")
-                self.ai_player.jesters -= 1
-            self.end_turn()  # End AI's turn after using Jester
-            return
-
-        # Handle the selected card or action
-        if isinstance(selected_card, tuple):  # Spades combo
-            spade, combo_card = selected_card
-            self.execute_ai_attack(spade, combo_card)
-        elif selected_card.suit == 'Hearts':
-            # Heal the AI's top card
-            top_card = self.ai_player.top_cards[self.ai_player.current_top_card_index]
-            heal_amount = selected_card.get_attack_value()
-            top_card['health'] = min(top_card['health'] + heal_amount, top_card['max_health'])
-            self.display_message(f"AI healed its {top_card['name']} for {heal_amount} health!")
-        elif selected_card.suit == 'Diamonds':
-            # Activate defense
-            self.ai_player.defense_active = True
-            self.display_message("AI has activated defense!")
-        else:
-            # Default attack logic
-            self.execute_ai_attack(selected_card)
-
-        # Discard the selected card
-        self.deck.discard(selected_card)
-
-        # End AI's turn immediately after performing one action
-        self.end_turn()
-    
-    # Executes the AI's chosen action based on the selected card.
-    def execute_ai_action(self, card):
-        if card.suit == 'Hearts':
-            own_top_card = self.ai_player.top_cards[self.ai_player.current_top_card_index]
-            if own_top_card['health'] < own_top_card['max_health'] / 2:
-                heal_amount = card.get_attack_value()
-                own_top_card['health'] = min(own_top_card['health'] + heal_amount, own_top_card['max_health'])
-                self.display_message(f"AI healed its {own_top_card['name']} for {heal_amount} health!")
-            else:
-                self.execute_ai_attack(card)
-        elif card.suit == 'Diamonds':
-            self.ai_player.defense_active = True
-            self.display_message("AI has activated defense!")
-        else:
-            self.execute_ai_attack(card)
-
-    # Executes an AI attack, including combos, and applies damage.
-    def execute_ai_attack(self, card, combo_card=None):
-        damage = card.get_attack_value()
-        if combo_card:
-            damage += combo_card.get_attack_value()
-            self.deck.discard(combo_card)
-
-        if card.suit == 'Clubs':
-            damage *= 2  # Double damage for Clubs
-
-        # Apply player defense, if active
-        damage = self.apply_defense(damage)
-
-        self.player.receive_damage(damage)
-        attack_message = f"AI attacked you for {damage} damage!"
-        if combo_card:
-            attack_message += f" (using {card.suit} + {combo_card.suit})"
-        self.display_message(attack_message)
-
-    # Applies the effects of defense cards and reduces damage
-    def apply_defense(self, damage):
-        if self.player.defense_active:
-            damage = damage // 2
-            self.player.defense_active = False
-        elif self.ai_player.defense_active:
-            damage = damage // 2
-            self.ai_player.defense_active = False
-        return damage
\ No newline at end of file
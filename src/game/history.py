@@ -0,0 +1,102 @@
+# src/game/history.py
+
+from collections import deque
+
+HISTORY_CAPACITY = 200  # Entries kept for scrolling back; older ones are dropped
+
+
+def wrap_text(text, font, max_width):
+    """Split text into lines no wider than max_width in font, breaking between words."""
+    words = text.split(' ')
+    lines = []
+    current_line = ""
+    for word in words:
+        test_line = current_line + word + " "
+        if font.size(test_line)[0] <= max_width:
+            current_line = test_line
+        else:
+            lines.append(current_line.strip())
+            current_line = word + " "
+    if current_line:
+        lines.append(current_line.strip())
+    return lines
+
+
+class HistoryEntry:
+    """One logged message, the engine Event behind it if any, and its rendered lines."""
+
+    __slots__ = ('text', 'event', 'lines')
+
+    def __init__(self, text, event, lines):
+        self.text = text
+        self.event = event
+        self.lines = lines
+
+
+class ActionHistory:
+    """
+    The action log as a ring buffer of entries, newest shown first. Each entry is
+    wrapped and rendered once when it is added, so drawing the log only blits
+    surfaces. The view can be scrolled back by whole lines; while scrolled back it
+    stays on the same lines as new entries arrive.
+    """
+
+    def __init__(self, font, max_width, max_lines, color=(255, 255, 255), capacity=HISTORY_CAPACITY):
+        self.font = font
+        self.max_width = max_width
+        self.max_lines = max_lines  # Lines shown at once
+        self.color = color
+        self.entries = deque(maxlen=capacity)
+        self.total_lines = 0
+        self.scroll_offset = 0  # Lines scrolled back from the newest
+        self.version = 0  # Bumped whenever what the log shows may have changed
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return (entry.text for entry in self.entries)
+
+    def append(self, text, event=None):
+        """Add a message, with the engine Event it describes if there is one."""
+        lines = [self.font.render(line, True, self.color)
+                 for line in wrap_text(text, self.font, self.max_width)]
+        if len(self.entries) == self.entries.maxlen:
+            self.total_lines -= len(self.entries[0].lines)
+        self.entries.append(HistoryEntry(text, event, lines))
+        self.total_lines += len(lines)
+        if self.scroll_offset:
+            self.scroll_offset = min(self.scroll_offset + len(lines), self.max_offset())
+        self.version += 1
+
+    def max_offset(self):
+        return max(0, self.total_lines - self.max_lines)
+
+    def scroll(self, lines):
+        """Scroll back (positive) or forward (negative) by lines, keeping the view full."""
+        offset = min(max(self.scroll_offset + lines, 0), self.max_offset())
+        if offset != self.scroll_offset:
+            self.scroll_offset = offset
+            self.version += 1
+
+    def visible_lines(self):
+        """Return the rendered lines shown from the scroll position, newest entry first."""
+        max_lines = self.max_lines
+        skip = self.scroll_offset
+        visible = []
+        for entry in reversed(self.entries):
+            if skip >= len(entry.lines):
+                skip -= len(entry.lines)
+                continue
+            for surface in entry.lines[skip:]:
+                visible.append(surface)
+                if len(visible) >= max_lines:
+                    return visible
+            skip = 0
+        return visible
+
+    def clear(self):
+        self.entries.clear()
+        self.total_lines = 0
+        self.scroll_offset = 0
+        self.version += 1
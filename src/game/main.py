@@ -1,19 +1,36 @@
 # src/game/main.py
 
+import argparse
 import pygame
 import os
 from menu import Menu
+from profiler import get_profiler
+from replay import REPLAY_DIR
+from snapshot import SAVE_PATH
 
 def main():
+    parser = argparse.ArgumentParser(description="Play the Astolat card game.")
+    parser.add_argument('--profile-log', metavar='PATH',
+                        help="write per-frame timings to PATH, as CSV if it ends in .csv, else JSON lines")
+    parser.add_argument('--replay-dir', default=REPLAY_DIR, metavar='DIR',
+                        help="record every match as a replay file in DIR")
+    parser.add_argument('--no-replays', action='store_true', help="do not record replays")
+    parser.add_argument('--save-file', default=SAVE_PATH, metavar='PATH',
+                        help="where an unfinished match is saved on exit, to be continued next time")
+    args = parser.parse_args()
+    if args.profile_log:
+        get_profiler().open_log(args.profile_log)
+
     pygame.init()
     screen = pygame.display.set_mode((1200, 600))
     pygame.display.set_caption('Astolat Card Game')
     try:
-        menu = Menu(screen)
+        menu = Menu(screen, None if args.no_replays else args.replay_dir, args.save_file)
         menu.display_menu()
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
+        get_profiler().close_log()
         pygame.quit()
 
 if __name__ == '__main__':
@@ -0,0 +1,353 @@
+# src/game/mcts.py
+
+import math
+import multiprocessing
+import random
+import time
+from multiprocessing import Pool
+
+from actions import Action, ATTACK, HEAL, DEFENSE
+from engine import PLAYER, AI
+
+ROLLOUT_DEPTH = 80  # Turns played out before a rollout is scored by remaining health
+TIME_CHECK_INTERVAL = 16  # Iterations between clock reads
+CANCEL_POLL_INTERVAL = 0.01  # Seconds between checks for a cancellation while workers search
+
+# Set in search worker processes by init_search_worker
+_worker_cancel_event = None
+# The tree a search worker grew in its last search, as (tree, search number, root,
+# history), kept so that the next search of the same MCTS can build on it
+_worker_tree = None
+
+
+class Node:
+    """
+    One node of the search tree. `wins` and `visits` are kept from the point of view of
+    the side that played `action` to reach this node; `available` counts how often the
+    action was legal when its parent was visited. The searching side's moves are keyed
+    by their Action and its opponent's by opponent_key().
+    """
+
+    __slots__ = ('parent', 'action', 'actor', 'children', 'visits', 'wins', 'available')
+
+    def __init__(self, parent=None, action=None, actor=None):
+        self.parent = parent
+        self.action = action
+        self.actor = actor
+        self.children = {}
+        self.visits = 0
+        self.wins = 0.0
+        self.available = 0
+
+    def size(self):
+        """Number of nodes in this subtree."""
+        return 1 + sum(child.size() for child in self.children.values())
+
+
+def opponent_key(action):
+    """
+    The tree key of an opponent's move: its kind and the suit it was played with. The
+    opponent's hand is redrawn for every sampled world, so keying its moves by the exact
+    cards would spread them over dozens of nodes visited about once each, and nothing
+    under them would be left to reuse once the real reply is known.
+    """
+    card = action.card
+    return action.kind, card.suit if card is not None else None
+
+
+def rollout_action(state, rng):
+    """A cheap playout policy: a random card, used the way a simple AI would use it."""
+    side = state.current
+    if not side.hand:
+        return rng.choice(state.legal_actions())
+    card = rng.choice(side.hand)
+    if card.suit == 'Hearts':
+        top_card = side.top_card()
+        if top_card['health'] < top_card['max_health']:
+            return Action(HEAL, card)
+    elif card.suit == 'Diamonds' and not side.defense_active:
+        return Action(DEFENSE, card)
+    return Action(ATTACK, card)
+
+
+def determinize(state, observer, rng):
+    """
+    Sample a world consistent with what `observer` can see: its own hand, both sides'
+    top cards, jesters and the discard pile. The cards it cannot see, the other side's
+    hand and the draw pile, are shuffled together and dealt back out in the same sizes.
+    """
+    sim = state.clone(rng=rng)
+    hidden = sim.side(AI if observer == PLAYER else PLAYER)
+    unseen = hidden.hand + sim.deck.cards
+    rng.shuffle(unseen)
+    hand_size = len(hidden.hand)
+    hidden.hand = unseen[:hand_size]
+    sim.deck.cards = unseen[hand_size:]
+    return sim
+
+
+def init_search_worker(cancel_event):
+    """Pool initializer: share the event that stops the worker's searches early."""
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def search_worker(args):
+    """
+    Pool entry point: run one independent search and return its root statistics. The
+    worker keeps its tree, and the next search of the same tree builds on it.
+    """
+    global _worker_tree
+    (state, seed, iterations, time_limit, exploration, rollout_depth, information_set,
+     tree, number) = args
+    search = MCTS(iterations=iterations, time_limit=time_limit, exploration=exploration,
+                  rollout_depth=rollout_depth, rng=random.Random(seed), information_set=information_set,
+                  cancel_event=_worker_cancel_event)
+    if _worker_tree is not None:
+        kept_tree, kept_number, search.root, search.root_state_history = _worker_tree
+        _worker_tree = None
+        if kept_tree != tree or kept_number >= number:
+            # Another tree, or one this worker grew for an earlier job of the same search
+            search.clear()
+    root = search.reuse_root(state)
+    reused = root.visits
+    root, iterations, elapsed = search.search(root, state)
+    _worker_tree = (tree, number, root, list(state.history))
+    children = {action: (child.visits, child.wins) for action, child in root.children.items()}
+    return children, iterations, elapsed, root.size(), reused
+
+
+def health_share(state, side_name):
+    """Fraction of all remaining top-card health held by side_name, used to score cut-off rollouts."""
+    own = state.side(side_name)
+    other = state.ai_player if own is state.player else state.player
+    own_health = sum(top_card['health'] for top_card in own.top_cards)
+    total = own_health + sum(top_card['health'] for top_card in other.top_cards)
+    return own_health / total if total else 0.5
+
+
+class MCTS:
+    """
+    Monte Carlo Tree Search over engine.GameState with random rollouts.
+
+    The tree is open-loop: nodes are sequences of actions, and every iteration plays
+    them on a sampled world, so chance and hidden cards are sampled rather than stored.
+    With `information_set` (the default) each world is a determinization: the side to
+    move keeps its own hand, and the opponent's hand and the draw pile are redrawn from
+    the cards it cannot see, so the search never reads hidden state. Without it, only
+    the draw pile is reshuffled and the opponent's real hand is used.
+
+    Each search is bounded by `iterations`, `time_limit` (seconds), or whichever comes
+    first, or until `cancel_event` is set. With `workers` > 1 the search is root-parallel:
+    each worker process searches its own tree with the same time limit (and a share of
+    the iterations), and the root statistics are summed. Every search keeps its tree, or
+    each worker its own, and the next one searches further under the moves played since.
+    """
+
+    def __init__(self, iterations=None, time_limit=0.5, exploration=1.4,
+                 rollout_depth=ROLLOUT_DEPTH, rng=None, information_set=True, workers=1,
+                 cancel_event=None):
+        if iterations is None and time_limit is None:
+            raise ValueError("MCTS needs an iteration or time budget.")
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.rng = rng or random.Random()
+        self.information_set = information_set
+        self.workers = max(1, workers)
+
+        self.root = None
+        self.root_state_history = None  # The game's history as of the root
+        self.tree = 0  # Counts clear() calls, so workers can tell a tree was forgotten
+        self.searches = 0
+        self.pool = None  # Started on the first parallel search
+        self.pool_cancel_event = None  # Stops the workers' searches; set when cancel_event is
+        self.cancel_event = cancel_event  # Once set, searches stop at their next clock check
+        self.stats = {}
+
+    def choose(self, state):
+        """Search from state and return the action with the most visits."""
+        if self.workers > 1:
+            return self.choose_parallel(state)
+
+        root = self.reuse_root(state)
+        reused = root.visits
+        root, iterations, elapsed = self.search(root, state)
+
+        best = max(root.children.values(), key=lambda child: child.visits)
+        self.root = root
+        self.root_state_history = list(state.history)
+        self.stats = {
+            'iterations': iterations,
+            'elapsed': elapsed,
+            'nodes_per_second': iterations / elapsed if elapsed else 0.0,
+            'tree_size': root.size(),
+            'reused_visits': reused,
+            'best_visits': best.visits,
+            'best_win_rate': best.wins / best.visits if best.visits else 0.0,
+        }
+        return best.action
+
+    def choose_parallel(self, state):
+        """Search one tree per worker process and pick the action with the most visits in total."""
+        if self.pool is None:
+            self.pool_cancel_event = multiprocessing.Event()
+            self.pool = Pool(self.workers, initializer=init_search_worker, initargs=(self.pool_cancel_event,))
+        self.pool_cancel_event.clear()
+        self.searches += 1
+        share = -(-self.iterations // self.workers) if self.iterations is not None else None
+        payload = state.clone()
+        payload.history = list(state.history)  # The workers find their kept subtrees by it
+        jobs = [
+            (payload, self.rng.getrandbits(64), share, self.time_limit, self.exploration, self.rollout_depth,
+             self.information_set, self.tree, self.searches)
+            for _ in range(self.workers)
+        ]
+
+        start_time = time.perf_counter()
+        pending = self.pool.map_async(search_worker, jobs)
+        if self.cancel_event is not None:
+            # Pass a cancellation on to the workers, whatever kind of event the caller set
+            while not pending.ready():
+                if self.cancel_event.is_set():
+                    self.pool_cancel_event.set()
+                    break
+                pending.wait(CANCEL_POLL_INTERVAL)
+        totals = {}
+        iterations = tree_size = reused = 0
+        for children, worker_iterations, _, worker_tree_size, worker_reused in pending.get():
+            iterations += worker_iterations
+            tree_size += worker_tree_size
+            reused += worker_reused
+            for action, (visits, wins) in children.items():
+                total = totals.setdefault(action, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+        elapsed = time.perf_counter() - start_time
+
+        action, (visits, wins) = max(totals.items(), key=lambda item: item[1][0])
+        self.stats = {
+            'iterations': iterations,
+            'elapsed': elapsed,
+            'nodes_per_second': iterations / elapsed if elapsed else 0.0,
+            'tree_size': tree_size,
+            'reused_visits': reused,
+            'best_visits': visits,
+            'best_win_rate': wins / visits if visits else 0.0,
+            'workers': self.workers,
+        }
+        return action
+
+    def clear(self):
+        """Forget the kept search trees, e.g. once a new game starts."""
+        self.root = None
+        self.root_state_history = None
+        self.tree += 1
+
+    def close(self):
+        """Stop the worker processes of a parallel search."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+            self.pool_cancel_event = None
+
+    def search(self, root, state):
+        """Grow the tree under root within the budget; returns (root, iterations, elapsed)."""
+        observer = state.current_turn
+        cancel_event = self.cancel_event
+        start_time = time.perf_counter()
+        deadline = start_time + self.time_limit if self.time_limit is not None else None
+        iterations = 0
+        while self.iterations is None or iterations < self.iterations:
+            if iterations and iterations % TIME_CHECK_INTERVAL == 0 and (
+                    cancel_event is not None and cancel_event.is_set()
+                    or deadline is not None and time.perf_counter() >= deadline):
+                break
+            self.iterate(root, state, observer)
+            iterations += 1
+        return root, iterations, time.perf_counter() - start_time
+
+    def reuse_root(self, state):
+        """Return the subtree for the moves played since the last search, or a new root."""
+        history = state.history
+        previous = self.root_state_history
+        node = self.root
+        if (node is not None and previous is not None and history[:len(previous)] == previous
+                and (len(history) - len(previous)) % 2 == 0):
+            # Moves alternate, starting with the side that searched
+            for index, action in enumerate(history[len(previous):]):
+                node = node.children.get(action if index % 2 == 0 else opponent_key(action))
+                if node is None:
+                    break
+            if node is not None:
+                node.parent = None
+                return node
+        return Node()
+
+    def iterate(self, root, state, observer):
+        """Run one select-expand-rollout-backpropagate pass on a freshly sampled world."""
+        rng = self.rng
+        if self.information_set:
+            sim = determinize(state, observer, rng)
+        else:
+            sim = state.clone(rng=rng)
+            rng.shuffle(sim.deck.cards)
+
+        # Selection: follow UCB among the children whose action is legal in this sample.
+        # The opponent's moves are grouped by opponent_key(), and a sampled move stands
+        # for its group.
+        node = root
+        while not sim.is_over():
+            legal = sim.legal_actions()
+            if sim.current_turn == observer:
+                keys, groups = legal, None
+            else:
+                groups = {}
+                for action in legal:
+                    groups.setdefault(opponent_key(action), []).append(action)
+                keys = groups
+            untried = [key for key in keys if key not in node.children]
+            for key in keys:
+                child = node.children.get(key)
+                if child is not None:
+                    child.available += 1
+            if untried:
+                # Expansion
+                key = rng.choice(untried)
+                child = Node(node, key, sim.current_turn)
+                child.available = 1
+                node.children[key] = child
+                sim.apply(key if groups is None else rng.choice(groups[key]))
+                node = child
+                break
+            node = self.select_child(node, keys)
+            sim.apply(node.action if groups is None else rng.choice(groups[node.action]))
+
+        # Rollout
+        depth = 0
+        while not sim.is_over() and depth < self.rollout_depth:
+            sim.apply(rollout_action(sim, rng))
+            depth += 1
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.actor is not None:
+                if sim.is_over():
+                    node.wins += 1.0 if sim.winner == node.actor else 0.0
+                else:
+                    node.wins += health_share(sim, node.actor)
+            node = node.parent
+
+    def select_child(self, node, keys):
+        """Pick the legal child with the best UCB1 score, counting availability as visits of the parent."""
+        exploration = self.exploration
+        best, best_score = None, float('-inf')
+        for key in keys:
+            child = node.children[key]
+            score = (child.wins / child.visits
+                     + exploration * math.sqrt(math.log(child.available) / child.visits))
+            if score > best_score:
+                best, best_score = child, score
+        return best
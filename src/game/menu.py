@@ -2,130 +2,207 @@
 
 import pygame
 import os
-from game import Game
+from constants import FPS
+from preload import AssetPreloader
+from session import GameSession
+from snapshot import SaveError
+from text_cache import get_font, render_text
+
+# Screens the menu can show; display_menu's one loop drives whichever is current
+MAIN_MENU = 'main_menu'
+RULES = 'rules'
+DIFFICULTY = 'difficulty'
+PLAYING = 'playing'
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard', 'Expert', 'Learned']
+
+RULES_CONTENT = [
+    "1. The game is played against an AI opponent.",
+    "2. Each player starts with 5 cards.",
+    "3. Defeat the opponent's top cards in order: Jack, Queen, King.",
+    "5. Use cards to attack, heal, defend, or activate abilities.",
+    "6. Hearts: Attack or heal based on card value.",
+    "7. Diamonds: Attack or defend based on card value.",
+    "8. Clubs: Attack with double damage.",
+    "9. Spades: Attack, or combine with another card for a stronger attack.",
+    "10. Jesters: Refresh your hand to 5 new cards.",
+    "11. Win by defeating all of your opponent's top cards.",
+]
+
 
 class Menu:
-    def __init__(self, screen):
+    def __init__(self, screen, replay_dir=None, save_path=None):
         self.screen = screen
 
         # Get the absolute path to the assets directory
         base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.assets_path = os.path.join(base_path, 'assets')
 
-        self.font = pygame.font.Font(os.path.join(self.assets_path, 'font.ttf'), 36)
+        self.font = get_font(os.path.join(self.assets_path, 'font.ttf'), 36)
+        # Loaded directly: going through the atlas could build its baked sprite cache here,
+        # before the first frame, which is the wait the preloader below is there to hide
         self.background = pygame.image.load(os.path.join(self.assets_path, 'background.png')).convert()
         self.clock = pygame.time.Clock()
         self.running = True
+        self.state = MAIN_MENU
+        # One Game is kept for the whole session; each match only resets its state and,
+        # with a replay_dir, is recorded there
+        self.session = GameSession(self.screen, replay_dir)
+        self.game = None  # The game being played while in the PLAYING state
+        # A match left unfinished when the game was closed is saved here and offered
+        # as "Continue" on the next start
+        self.save_path = save_path
+        self.can_continue = save_path is not None and os.path.exists(save_path)
+
+        # The game's assets load in the background while the menu is shown
+        self.preloader = AssetPreloader(self.assets_path)
+        self.preloader.start()
+
+        # Clickable regions, laid out once so a click is handled the same on any frame
+        center_x = self.screen.get_width() // 2
+        self.continue_rect = self.text_rect("Continue", center=(center_x, 100))
+        self.start_rect = self.text_rect("Start", center=(center_x, 200))
+        self.rules_rect = self.text_rect("Rules", center=(center_x, 300))
+        self.exit_rect = self.text_rect("Exit", center=(center_x, 400))
+        self.back_rect = self.text_rect("Back", topleft=(50, self.screen.get_height() - 100))
+        self.difficulty_rects = [
+            (difficulty, self.text_rect(difficulty, center=(center_x, 150 + i * 70)))
+            for i, difficulty in enumerate(DIFFICULTIES)
+        ]
+
+    def text_rect(self, text, **position):
+        return render_text(self.font, text, (255, 255, 255)).get_rect(**position)
 
     def display_menu(self):
-        while self.running:
-            self.screen.blit(self.background, (0, 0))
-            self.handle_events()
-            self.render_menu()
-            pygame.display.flip()
-            self.clock.tick(60)
-
-    def handle_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if self.start_rect.collidepoint(pos):
-                    self.display_difficulty_selection()
+        # The application's main loop: menus and games alike are driven one frame at a time
+        try:
+            while self.running:
+                events = pygame.event.get()
+                if self.state == PLAYING:
+                    self.play_frame(events)
+                else:
+                    for event in events:
+                        self.handle_event(event)
+                    self.render()
+                self.clock.tick(FPS)
+        finally:
+            self.preloader.cancel()
+            if self.state == PLAYING:
+                self.suspend_game()
+            self.close_game()
+            self.session.close()
+
+    def play_frame(self, events):
+        # The game handles its own input and drawing; closing the window still quits
+        if any(event.type == pygame.QUIT for event in events):
+            self.running = False
+            return
+        self.game.run_frame(events)
+        if not self.game.running:
+            self.close_game()
+            self.state = MAIN_MENU
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            pos = event.pos
+            if self.state == MAIN_MENU:
+                if self.can_continue and self.continue_rect.collidepoint(pos):
+                    self.resume_game()
+                elif self.start_rect.collidepoint(pos):
+                    self.state = DIFFICULTY
                 elif self.rules_rect.collidepoint(pos):
-                    self.display_rules()
+                    self.state = RULES
                 elif self.exit_rect.collidepoint(pos):
                     self.running = False
+            elif self.state == RULES:
+                if self.back_rect.collidepoint(pos):
+                    self.state = MAIN_MENU
+            elif self.state == DIFFICULTY:
+                for difficulty, rect in self.difficulty_rects:
+                    if rect.collidepoint(pos):
+                        self.start_game(difficulty)
+                        break
+
+    def render(self):
+        self.screen.blit(self.background, (0, 0))
+        if self.state == RULES:
+            self.render_rules()
+        elif self.state == DIFFICULTY:
+            self.render_difficulty_selection()
+        else:
+            self.render_menu()
+        if not self.preloader.done():
+            self.render_loading_progress()
+        pygame.display.flip()
+
+    def start_game(self, difficulty):
+        # Usually loading finished long ago; if not, the rest is waited for here
+        self.preloader.wait()
+        self.discard_suspended_game()
+        self.game = self.session.new_match(difficulty)
+        self.state = PLAYING
+
+    def resume_game(self):
+        self.preloader.wait()
+        try:
+            self.game = self.session.resume(self.save_path)
+        except (OSError, SaveError) as e:
+            print(f"Could not resume the saved game: {e}")
+            self.discard_suspended_game()
+            return
+        # A match is resumed once; closing the game again saves it anew
+        self.discard_suspended_game()
+        self.state = PLAYING
+
+    def suspend_game(self):
+        if self.save_path is None:
+            return
+        try:
+            self.session.suspend(self.save_path)
+        except OSError as e:
+            print(f"Could not save the game: {e}")
+
+    def discard_suspended_game(self):
+        if self.can_continue:
+            self.can_continue = False
+            try:
+                os.remove(self.save_path)
+            except OSError:
+                pass
+
+    def close_game(self):
+        # Stop the AI's decision once the game is left; its worker is kept for the next match
+        if self.game is not None:
+            self.session.end_match()
+            self.game = None
 
     def render_menu(self):
         # Render menu options
-        start_text = self.font.render("Start", True, (255, 255, 255))
-        rules_text = self.font.render("Rules", True, (255, 255, 255))
-        exit_text = self.font.render("Exit", True, (255, 255, 255))
-
-        self.start_rect = start_text.get_rect(center=(self.screen.get_width()//2, 200))
-        self.rules_rect = rules_text.get_rect(center=(self.screen.get_width()//2, 300))
-        self.exit_rect = exit_text.get_rect(center=(self.screen.get_width()//2, 400))
-
-        self.screen.blit(start_text, self.start_rect)
-        self.screen.blit(rules_text, self.rules_rect)
-        self.screen.blit(exit_text, self.exit_rect)
-
-    def display_rules(self):
-        # Display the rules screen
-        showing_rules = True
-        while showing_rules:
-            self.screen.blit(self.background, (0, 0))
-            rules_title = self.font.render("Game Rules", True, (255, 255, 255))
-            back_text = self.font.render("Back", True, (255, 255, 255))
-
-            rules_content = [
-                "1. The game is played against an AI opponent.",
-                "2. Each player starts with 5 cards.",
-                "3. Defeat the opponent's top cards in order: Jack, Queen, King.",
-                "5. Use cards to attack, heal, defend, or activate abilities.",
-                "6. Hearts: Attack or heal based on card value.",
-                "7. Diamonds: Attack or defend based on card value.",
-                "8. Clubs: Attack with double damage.",
-                "9. Spades: Combine with another card for a stronger attack.",
-                "10. Jesters: Refresh your hand to 5 new cards.",
-                "11. Win by defeating all of your opponent's top cards.",
-            ]
-
-            self.screen.blit(rules_title, (50, 50))
-            for idx, line in enumerate(rules_content):
-                rule_text = self.font.render(line, True, (255, 255, 255))
-                self.screen.blit(rule_text, (50, 100 + idx * 40))
-
-            back_rect = back_text.get_rect(topleft=(50, self.screen.get_height() - 100))
-            self.screen.blit(back_text, back_rect)
-
-            pygame.display.flip()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    showing_rules = False
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    if back_rect.collidepoint(pos):
-                        showing_rules = False
-            self.clock.tick(60)
-
-    def display_difficulty_selection(self):
-        selecting_difficulty = True
-        while selecting_difficulty:
-            self.screen.blit(self.background, (0, 0))
-            # Render difficulty options
-            easy_text = self.font.render("Easy", True, (255, 255, 255))
-            medium_text = self.font.render("Medium", True, (255, 255, 255))
-            hard_text = self.font.render("Hard", True, (255, 255, 255))
-
-            easy_rect = easy_text.get_rect(center=(self.screen.get_width()//2, 200))
-            medium_rect = medium_text.get_rect(center=(self.screen.get_width()//2, 300))
-            hard_rect = hard_text.get_rect(center=(self.screen.get_width()//2, 400))
-
-            self.screen.blit(easy_text, easy_rect)
-            self.screen.blit(medium_text, medium_rect)
-            self.screen.blit(hard_text, hard_rect)
-
-            pygame.display.flip()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    selecting_difficulty = False
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    if easy_rect.collidepoint(pos):
-                        game = Game(self.screen, 'Easy')
-                        game.start_game()
-                        selecting_difficulty = False
-                    elif medium_rect.collidepoint(pos):
-                        game = Game(self.screen, 'Medium')
-                        game.start_game()
-                        selecting_difficulty = False
-                    elif hard_rect.collidepoint(pos):
-                        game = Game(self.screen, 'Hard')
-                        game.start_game()
-                        selecting_difficulty = False
-            self.clock.tick(60)
+        if self.can_continue:
+            self.screen.blit(render_text(self.font, "Continue", (255, 255, 255)), self.continue_rect)
+        self.screen.blit(render_text(self.font, "Start", (255, 255, 255)), self.start_rect)
+        self.screen.blit(render_text(self.font, "Rules", (255, 255, 255)), self.rules_rect)
+        self.screen.blit(render_text(self.font, "Exit", (255, 255, 255)), self.exit_rect)
+
+    def render_loading_progress(self):
+        # A thin bar along the bottom while the game's assets load
+        width = self.screen.get_width() // 3
+        x = (self.screen.get_width() - width) // 2
+        y = self.screen.get_height() - 30
+        pygame.draw.rect(self.screen, (80, 80, 80), (x, y, width, 6))
+        pygame.draw.rect(self.screen, (255, 255, 255), (x, y, int(width * self.preloader.progress), 6))
+
+    def render_rules(self):
+        rules_title = render_text(self.font, "Game Rules", (255, 255, 255))
+        self.screen.blit(rules_title, (50, 50))
+        for idx, line in enumerate(RULES_CONTENT):
+            rule_text = render_text(self.font, line, (255, 255, 255))
+            self.screen.blit(rule_text, (50, 100 + idx * 40))
+        self.screen.blit(render_text(self.font, "Back", (255, 255, 255)), self.back_rect)
+
+    def render_difficulty_selection(self):
+        # Render difficulty options
+        for difficulty, rect in self.difficulty_rects:
+            self.screen.blit(render_text(self.font, difficulty, (255, 255, 255)), rect)
@@ -22,6 +22,9 @@ class Player:
         # Defense status
         self.defense_active = False
 
+        # Jesters
+        self.jesters = 2
+
     def draw_cards(self, deck, num_cards):
         """Draw a specified number of cards from the deck without exceeding MAX_HAND_SIZE."""
         available_space = MAX_HAND_SIZE - len(self.hand)
@@ -46,6 +49,12 @@ class Player:
             current_top_card['health'] = 0
             self.current_top_card_index += 1
 
+    def top_card(self):
+        """Return the current top card, or None once all top cards are defeated."""
+        if self.is_defeated():
+            return None
+        return self.top_cards[self.current_top_card_index]
+
     def is_defeated(self):
         """Check if all top cards are defeated."""
         return self.current_top_card_index >= len(self.top_cards)
@@ -0,0 +1,241 @@
+# src/game/policy.py
+
+import argparse
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from multiprocessing import Pool
+
+from actions import Action, JESTER, hand_actions
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from player import Player
+
+POLICY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'assets', 'policy_table.bin')
+
+# File layout: a header, then the entries sorted by key: every key as a little-endian
+# uint32, followed by the abstract action of each key as one byte
+MAGIC = b'ASTPLCY1'
+HEADER = struct.Struct('<8sII')  # Magic, entries, self-play games the table was learned from
+
+# Abstract state: both sides' remaining health in buckets, the highest card value held
+# in each suit (in buckets), both defense flags and whether each side has a Jester
+HEALTH_BUCKETS = (15, 35, 60)  # Bucket boundaries of the total top card health left, out of 80
+VALUE_BUCKETS = (0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2)  # Indexed by attack value: none, low or high
+SUIT_SHIFT = {'Hearts': 0, 'Diamonds': 2, 'Spades': 4, 'Clubs': 6}
+
+# Abstract actions. Each names a kind of move and, for attacks, the suit attacked with;
+# abstract_moves() picks the card.
+ATTACK_HEARTS, ATTACK_DIAMONDS, ATTACK_SPADES, ATTACK_CLUBS, HEAL_MOVE, DEFENSE_MOVE, COMBO_MOVE, JESTER_MOVE = range(8)
+ABSTRACT_ACTIONS = 8
+ATTACK_SUITS = {'Hearts': ATTACK_HEARTS, 'Diamonds': ATTACK_DIAMONDS,
+                'Spades': ATTACK_SPADES, 'Clubs': ATTACK_CLUBS}
+
+# Training
+EXPLORATION = 0.2  # Chance of a random abstract action during self-play
+MIN_VISITS = 20  # Visits an action needs before the table may choose it
+MAX_TURNS = 1000
+
+
+def remaining_health(side):
+    return sum(top_card['health'] for top_card in side.top_cards)
+
+
+def state_key(state):
+    """The abstract state of the side to move, as an integer below 2**16."""
+    side, opponent = state.current, state.opponent
+    suits = 0
+    for card in side.hand:
+        shift = SUIT_SHIFT[card.suit]
+        bucket = VALUE_BUCKETS[card.attack_value]
+        if bucket > (suits >> shift) & 3:
+            suits = suits & ~(3 << shift) | bucket << shift
+    return (bisect_right(HEALTH_BUCKETS, remaining_health(side)) << 14
+            | bisect_right(HEALTH_BUCKETS, remaining_health(opponent)) << 12
+            | suits << 4
+            | side.defense_active << 3 | opponent.defense_active << 2
+            | (side.jesters > 0) << 1 | (opponent.jesters > 0))
+
+
+def abstract_moves(state):
+    """Map every abstract action available to the side to move to the Action it stands for."""
+    side = state.current
+    moves = hand_actions(side.hand, side.jesters)
+    chosen = {}
+    # Attack with the strongest card of each suit
+    for move in moves.attacks + moves.doubles:
+        abstract = ATTACK_SUITS[move.action.card.suit]
+        if abstract not in chosen or move.damage > chosen[abstract][1]:
+            chosen[abstract] = (move.action, move.damage)
+    # Heal with the strongest Heart, defend with the weakest Diamond and combine for the most damage
+    if moves.heals:
+        chosen[HEAL_MOVE] = (max(moves.heals, key=lambda move: move.heal).action, 0)
+    if moves.defenses:
+        chosen[DEFENSE_MOVE] = (min(moves.defenses, key=lambda move: move.action.card.attack_value).action, 0)
+    if moves.combos:
+        chosen[COMBO_MOVE] = (max(moves.combos, key=lambda move: move.damage).action, 0)
+    if moves.jester is not None:
+        chosen[JESTER_MOVE] = (Action(JESTER), 0)
+    return {abstract: action for abstract, (action, _) in chosen.items()}
+
+
+class PolicyTable:
+    """
+    The abstract action to play in each abstract state, learned from self-play. A
+    decision is one dictionary lookup; states that were never learned return None.
+    """
+
+    def __init__(self, table, games=0):
+        self.table = table  # State key -> abstract action
+        self.games = games
+
+    def __len__(self):
+        return len(self.table)
+
+    def choose(self, state):
+        """The Action the table picks for the side to move in state, or None."""
+        abstract = self.table.get(state_key(state))
+        if abstract is None:
+            return None
+        return abstract_moves(state).get(abstract)
+
+    @classmethod
+    def load(cls, path=POLICY_PATH):
+        """Read a policy file, or return None if it is missing or damaged."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, count, games = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or len(data) != HEADER.size + 5 * count:
+                raise ValueError("not a policy file")
+        except (OSError, struct.error, ValueError):
+            return None
+        keys = struct.unpack_from(f'<{count}I', data, HEADER.size)
+        actions = data[HEADER.size + 4 * count:]
+        return cls(dict(zip(keys, actions)), games)
+
+    def save(self, path=POLICY_PATH):
+        """Write the table to path. The file is written beside path and then moved into place."""
+        keys = sorted(self.table)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, len(keys), self.games))
+                f.write(struct.pack(f'<{len(keys)}I', *keys))
+                f.write(bytes(self.table[key] for key in keys))
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+_policy = None
+_policy_loaded = False
+_policy_lock = threading.Lock()
+
+
+def get_policy():
+    """Return the process-wide policy table, reading the file on first use, or None if there is none."""
+    global _policy, _policy_loaded
+    if not _policy_loaded:
+        with _policy_lock:
+            if not _policy_loaded:
+                _policy = PolicyTable.load()
+                _policy_loaded = True
+    return _policy
+
+
+def self_play_chunk(args):
+    """
+    Worker entry point: play self-play games [start, stop) with the given table plus
+    exploration, and return (visits, wins) Counters keyed by state key * 8 + abstract
+    action, counting for each decision whether the side that made it went on to win.
+    """
+    table, seed, start, stop, exploration = args
+    visits, wins = Counter(), Counter()
+    for index in range(start, stop):
+        rng = random.Random(f"{seed}:{index}")
+        state = GameState(Deck(rng=rng), Player(PLAYER, None), Player(AI, None))
+        state.deal()
+        decisions = {PLAYER: [], AI: []}
+        turns = 0
+        while not state.is_over() and turns < MAX_TURNS:
+            key = state_key(state)
+            moves = abstract_moves(state)
+            abstract = table.get(key)
+            if abstract not in moves or rng.random() < exploration:
+                abstract = rng.choice(list(moves))
+            decisions[state.current_turn].append(key * ABSTRACT_ACTIONS + abstract)
+            state.apply(moves[abstract])
+            turns += 1
+        for side, made in decisions.items():
+            visits.update(made)
+            if state.winner == side:
+                wins.update(made)
+    return visits, wins
+
+
+def best_actions(visits, wins, min_visits=MIN_VISITS):
+    """The abstract action with the highest win rate in each state, among those visited often enough."""
+    best = {}
+    for entry, count in visits.items():
+        if count < min_visits:
+            continue
+        key, abstract = divmod(entry, ABSTRACT_ACTIONS)
+        rate = wins[entry] / count
+        if key not in best or rate > best[key][1]:
+            best[key] = (abstract, rate)
+    return {key: abstract for key, (abstract, _) in best.items()}
+
+
+def train(rounds, games, workers=None, seed=0, exploration=EXPLORATION, min_visits=MIN_VISITS, log=print):
+    """
+    Learn a PolicyTable over rounds of self-play. Each round plays games with the
+    previous round's table (random play in the first) and keeps the best-scoring
+    action of every abstract state.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, min(2000, games // (workers * 8) or 1))
+    table = {}
+    with Pool(workers) as pool:
+        for round_number in range(rounds):
+            start_time = time.perf_counter()
+            chunks = [(table, f"{seed}:{round_number}", start, min(start + chunk_size, games), exploration)
+                      for start in range(0, games, chunk_size)]
+            visits, wins = Counter(), Counter()
+            for chunk_visits, chunk_wins in pool.imap_unordered(self_play_chunk, chunks):
+                visits.update(chunk_visits)
+                wins.update(chunk_wins)
+            table = best_actions(visits, wins, min_visits)
+            log(f"round {round_number + 1}: {games} games in {time.perf_counter() - start_time:.1f} s, "
+                f"{len(table)} states learned")
+    return PolicyTable(table, rounds * games)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn the Learned difficulty's policy table from self-play.")
+    parser.add_argument('-n', '--games', type=int, default=200000, help="self-play games per round")
+    parser.add_argument('-r', '--rounds', type=int, default=3, help="rounds of self-play")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--seed', default=0, help="base seed; the same seed learns the same table")
+    parser.add_argument('--exploration', type=float, default=EXPLORATION, help="chance of a random move")
+    parser.add_argument('--min-visits', type=int, default=MIN_VISITS,
+                        help="visits an action needs before it can be chosen")
+    parser.add_argument('-o', '--output', default=POLICY_PATH, metavar='PATH', help="where to write the table")
+    args = parser.parse_args()
+
+    policy = train(args.rounds, args.games, args.workers, args.seed, args.exploration, args.min_visits)
+    policy.save(args.output)
+    print(f"Wrote {len(policy)} states to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# src/game/preload.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from atlas import get_atlas, BAKED_CARDS
+from sprites import get_sprites
+from text_cache import get_font
+
+FONT_FILE = 'font.ttf'
+GAME_FONT_SIZES = (24, 18, 16)  # The game's main, small and history fonts
+
+
+class AssetPreloader:
+    """
+    Loads everything a game draws with, on a worker thread, while the menu is showing:
+    the game's fonts, the background and the big and mini sprite of every card. The
+    loaded assets land in the shared font, atlas and sprite caches, where the Game
+    finds them.
+
+    `future` completes when loading is done. `progress` is the fraction loaded so far.
+    wait() blocks until loading finishes; if it failed, the Game loads whatever is
+    missing itself, as it would without a preloader.
+    """
+
+    def __init__(self, assets_path):
+        self.assets_path = assets_path
+        self.tasks = self.loading_tasks()
+        self.completed = 0
+        self.cancelled = False
+        self.future = None
+
+    def loading_tasks(self):
+        """The loading steps, each a callable, in the order they run."""
+        font_path = os.path.join(self.assets_path, FONT_FILE)
+        tasks = [lambda size=size: get_font(font_path, size) for size in GAME_FONT_SIZES]
+        tasks.append(lambda: get_atlas().get_image(self.assets_path, 'background.png'))
+        tasks.append(self.prefetch_baked_sprites)
+        sprites = get_sprites(self.assets_path)
+        for suit, value in BAKED_CARDS:
+            tasks.append(lambda suit=suit, value=value: sprites.big(suit, value))
+            tasks.append(lambda suit=suit, value=value: sprites.mini(suit, value))
+        return tasks
+
+    def prefetch_baked_sprites(self):
+        baked = get_atlas().baked_sprites(self.assets_path)
+        if baked is not None:
+            baked.prefetch()
+
+    def start(self):
+        """Start loading on a worker thread and return the future that completes with it."""
+        if self.future is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preload')
+            self.future = executor.submit(self.run)
+            executor.shutdown(wait=False)
+        return self.future
+
+    def run(self):
+        for task in self.tasks:
+            if self.cancelled:
+                return
+            task()
+            self.completed += 1
+
+    @property
+    def progress(self):
+        return self.completed / len(self.tasks) if self.tasks else 1.0
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def wait(self):
+        """Block until loading has finished, loading on this thread if it never started."""
+        if self.future is None:
+            self.run()
+            return
+        try:
+            self.future.result()
+        except Exception as e:
+            print(f"Preloading assets failed, loading them on demand: {e}")
+
+    def cancel(self):
+        """Stop after the step in progress, e.g. when the application quits while loading."""
+        self.cancelled = True
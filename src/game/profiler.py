@@ -0,0 +1,149 @@
+# src/game/profiler.py
+
+import csv
+import json
+import time
+from collections import deque
+
+PROFILE_WINDOW = 240  # Frames kept for percentiles, about four seconds at 60 FPS
+
+
+def percentile(sorted_values, fraction):
+    """The value below which `fraction` of sorted_values lie (nearest rank)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Section:
+    """Context manager that adds the time spent inside it to a profiler section."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class FrameProfiler:
+    """
+    Frame timings: the interval between frames, and named sections timed within each
+    frame. A section timed several times in one frame counts once, as the sum. The last
+    `window` frames are kept for percentiles.
+
+    While a log is open, every frame is also written to it, as CSV rows of
+    (frame, section, ms) or as one JSON object per line, depending on the file's extension.
+    """
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.window = window
+        self.frame_times = deque(maxlen=window)
+        self.sections = {}  # Section name -> deque of per-frame seconds
+        self.current = {}  # Sections timed so far in this frame
+        self.frame_start = None
+        self.frame_time = None  # Interval that ended when this frame began
+        self.frames = 0
+        self.log_file = None
+        self.csv_writer = None
+
+    def reset(self):
+        """Forget every sample, e.g. when a new game starts; an open log stays open."""
+        self.frame_times.clear()
+        self.sections.clear()
+        self.current = {}
+        self.frame_start = None
+        self.frame_time = None
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_time = now - self.frame_start
+            self.frame_times.append(self.frame_time)
+        self.frame_start = now
+        self.current = {}
+
+    def end_frame(self):
+        for name, seconds in self.current.items():
+            samples = self.sections.get(name)
+            if samples is None:
+                samples = self.sections[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+        if self.log_file is not None:
+            self.write_frame()
+        self.frames += 1
+
+    def section(self, name):
+        """Return a context manager timing its body as part of section `name`."""
+        return Section(self, name)
+
+    def record(self, name, seconds):
+        """Add seconds to section `name` for the current frame."""
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def stats(self):
+        """Return FPS, frame time percentiles and per-section timings, all in milliseconds."""
+        frame_times = sorted(self.frame_times)
+        mean = sum(frame_times) / len(frame_times) if frame_times else 0.0
+        sections = {}
+        for name, samples in self.sections.items():
+            ordered = sorted(samples)
+            sections[name] = {
+                'mean_ms': 1000 * sum(ordered) / len(ordered),
+                'p95_ms': 1000 * percentile(ordered, 0.95),
+                'max_ms': 1000 * ordered[-1],
+            }
+        return {
+            'fps': 1 / mean if mean else 0.0,
+            'frame_ms': {
+                'p50': 1000 * percentile(frame_times, 0.50),
+                'p95': 1000 * percentile(frame_times, 0.95),
+                'p99': 1000 * percentile(frame_times, 0.99),
+                'max': 1000 * frame_times[-1] if frame_times else 0.0,
+            },
+            'sections': sections,
+        }
+
+    def open_log(self, path):
+        """Write every following frame to path, as CSV if it ends in .csv, else as JSON lines."""
+        self.close_log()
+        self.log_file = open(path, 'w', newline='')
+        if path.endswith('.csv'):
+            self.csv_writer = csv.writer(self.log_file)
+            self.csv_writer.writerow(['frame', 'section', 'ms'])
+
+    def close_log(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+            self.csv_writer = None
+
+    def write_frame(self):
+        frame_ms = None if self.frame_time is None else round(1000 * self.frame_time, 3)
+        sections = {name: round(1000 * seconds, 3) for name, seconds in self.current.items()}
+        if self.csv_writer is not None:
+            if frame_ms is not None:
+                self.csv_writer.writerow([self.frames, 'frame', frame_ms])
+            for name, ms in sections.items():
+                self.csv_writer.writerow([self.frames, name, ms])
+        else:
+            self.log_file.write(json.dumps({'frame': self.frames, 'frame_ms': frame_ms, 'sections': sections}) + '\n')
+
+
+_profiler = None
+
+
+def get_profiler():
+    """Return the process-wide frame profiler."""
+    global _profiler
+    if _profiler is None:
+        _profiler = FrameProfiler()
+    return _profiler
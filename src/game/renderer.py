@@ -0,0 +1,96 @@
+# src/game/renderer.py
+
+import time
+import pygame
+
+
+class Layer:
+    """
+    A fixed region of the screen, the function that draws it and the signature of the
+    state it was last drawn from. `signature` returns any value that compares equal
+    for as long as the layer would look the same.
+    """
+
+    __slots__ = ('name', 'rect', 'draw', 'signature', 'drawn')
+
+    def __init__(self, name, rect, draw, signature):
+        self.name = name
+        self.rect = pygame.Rect(rect)
+        self.draw = draw
+        self.signature = signature
+        self.drawn = None
+
+
+class DirtyRenderer:
+    """
+    Retained-mode drawing for a screen made of fixed layers over a static background.
+
+    Each frame, the layers whose signature changed are dirty. For every dirty rect the
+    background is restored from a cached copy, and every layer overlapping it is redrawn,
+    in the order the layers were added, with the screen clipped to the rect. Only the
+    dirty rects are sent to the display with pygame.display.update.
+
+    With a profiler, each layer's drawing is timed as the section 'draw_<name>'.
+    """
+
+    def __init__(self, screen, background, profiler=None):
+        self.screen = screen
+        self.profiler = profiler
+        # The static layer: the background cropped to the screen, in the display format
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.background.blit(background, (0, 0))
+        self.layers = []
+        self.full_redraw = True
+        self.last_dirty = []  # Rects sent to the display by the last render
+
+    def add_layer(self, name, rect, draw, signature):
+        """Add a layer on top of those already added."""
+        layer = Layer(name, rect, draw, signature)
+        self.layers.append(layer)
+        self.full_redraw = True
+        return layer
+
+    def invalidate(self):
+        """Redraw the whole screen on the next render, e.g. after something else drew over it."""
+        self.full_redraw = True
+
+    def render(self):
+        """Redraw what changed since the last render and return the rects updated."""
+        screen = self.screen
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+            for layer in self.layers:
+                layer.drawn = layer.signature()
+                self.draw_layer(layer)
+            pygame.display.flip()
+            self.full_redraw = False
+            self.last_dirty = [screen.get_rect()]
+            return self.last_dirty
+
+        dirty = []
+        for layer in self.layers:
+            signature = layer.signature()
+            if signature != layer.drawn:
+                layer.drawn = signature
+                dirty.append(layer.rect)
+
+        for rect in dirty:
+            screen.set_clip(rect)
+            screen.blit(self.background, rect, rect)
+            for layer in self.layers:
+                if layer.rect.colliderect(rect):
+                    self.draw_layer(layer)
+        screen.set_clip(None)
+
+        if dirty:
+            pygame.display.update(dirty)
+        self.last_dirty = dirty
+        return dirty
+
+    def draw_layer(self, layer):
+        if self.profiler is None:
+            layer.draw()
+            return
+        start = time.perf_counter()
+        layer.draw()
+        self.profiler.record('draw_' + layer.name, time.perf_counter() - start)
@@ -0,0 +1,274 @@
+# src/game/replay.py
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+
+from actions import Action, ATTACK, HEAL, DEFENSE, COMBO, JESTER
+from card import DECK_CARDS
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from player import Player
+
+# File layout: a header, then one record per event, appended as the game is played.
+# A record is a tag byte, (event << 1) | side, followed by its card codes. Draw records
+# hold a count byte before their codes. A record cut off by a crash is ignored.
+MAGIC = b'ASTRPLY1'
+HEADER = struct.Struct('<8sQIBBB')  # Magic, seed, start time, first side, player and AI controllers
+EVENT_CODES = {ATTACK: 0, HEAL: 1, DEFENSE: 2, COMBO: 3, JESTER: 4}
+EVENT_KINDS = {code: kind for kind, code in EVENT_CODES.items()}
+DRAW = 5
+SIDES = (PLAYER, AI)
+CONTROLLERS = ('Human', 'Easy', 'Medium', 'Hard', 'Expert', 'Learned')  # Who chose a side's actions
+
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'replays')
+
+
+class ReplayError(Exception):
+    """A replay file that cannot be read, or whose game does not replay as recorded."""
+
+
+class ReplayWriter:
+    """
+    Records a game as it is played. Events are encoded into a buffer that is written
+    out every `flush_every` turns (after every turn by default), so a crash loses at
+    most the turns since the last write. Games are rebuilt from the seed: the deck must
+    shuffle with random.Random(seed) and nothing else.
+    """
+
+    def __init__(self, path, seed, player='Human', ai='Easy', first_turn=PLAYER, flush_every=1):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.buffer = bytearray(HEADER.pack(MAGIC, seed, int(time.time()), SIDES.index(first_turn),
+                                            CONTROLLERS.index(player), CONTROLLERS.index(ai)))
+        self.flush_every = flush_every
+        self.pending_turns = 0
+        self.flush()
+
+    def record_deal(self, state):
+        """Record the starting hands, in the order GameState.deal draws them."""
+        self.draw(PLAYER, state.player.hand)
+        self.draw(AI, state.ai_player.hand)
+
+    def record_turn(self, state, actor, action, waiting_hand_size):
+        """
+        Record an action just applied to state, and the cards drawn because of it:
+        a Jester's new hand, then the next side's refill. waiting_hand_size is the
+        size of the waiting side's hand before the action.
+        """
+        side = SIDES.index(actor)
+        self.buffer.append(EVENT_CODES[action.kind] << 1 | side)
+        if action.card is not None:
+            self.buffer.append(action.card.code)
+        if action.combo_card is not None:
+            self.buffer.append(action.combo_card.code)
+        if action.kind == JESTER:
+            self.draw(actor, state.side(actor).hand)
+        if not state.is_over():
+            self.draw(state.current_turn, state.current.hand[waiting_hand_size:])
+        self.pending_turns += 1
+        if self.pending_turns >= self.flush_every:
+            self.flush()
+
+    def draw(self, side, cards):
+        if cards:
+            self.buffer.append(DRAW << 1 | SIDES.index(side))
+            self.buffer.append(len(cards))
+            self.buffer.extend(card.code for card in cards)
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer.clear()
+        self.pending_turns = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class Replay:
+    """
+    A recorded game: its seed, who played each side and its events, each a tuple of
+    (kind, side, cards). `complete` is false if the file ended inside a record.
+    """
+
+    __slots__ = ('seed', 'started', 'first_turn', 'player', 'ai', 'events', 'complete')
+
+    def __init__(self, seed, started, first_turn, player, ai, events, complete):
+        self.seed = seed
+        self.started = started
+        self.first_turn = first_turn
+        self.player = player
+        self.ai = ai
+        self.events = events
+        self.complete = complete
+
+    def actions(self):
+        """The recorded actions, in the order they were played."""
+        return [to_action(kind, cards) for kind, _, cards in self.events if kind != DRAW]
+
+
+def to_action(kind, cards):
+    if kind == COMBO:
+        return Action(COMBO, cards[0], cards[1])
+    return Action(kind, cards[0] if cards else None)
+
+
+def parse_replay(data):
+    """Decode the bytes of a replay file into a Replay."""
+    if len(data) < HEADER.size:
+        raise ReplayError("too short to be a replay")
+    magic, seed, started, first_turn, player, ai = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ReplayError("not a replay file")
+    try:
+        first_turn, player, ai = SIDES[first_turn], CONTROLLERS[player], CONTROLLERS[ai]
+    except IndexError:
+        raise ReplayError("damaged replay header") from None
+
+    events = []
+    position = HEADER.size
+    end = len(data)
+    while position < end:
+        tag = data[position]
+        code, side = tag >> 1, SIDES[tag & 1]
+        if code == DRAW:
+            if position + 1 >= end:
+                break
+            count = data[position + 1]
+            start = position + 2
+        elif code in EVENT_KINDS:
+            kind = EVENT_KINDS[code]
+            count = 2 if kind == COMBO else 0 if kind == JESTER else 1
+            start = position + 1
+        else:
+            raise ReplayError(f"unknown event {code} at byte {position}")
+        if start + count > end:
+            break
+        codes = data[start:start + count]
+        if any(card_code >= len(DECK_CARDS) for card_code in codes):
+            raise ReplayError(f"unknown card at byte {start}")
+        events.append((DRAW if code == DRAW else kind, side, tuple(DECK_CARDS[c] for c in codes)))
+        position = start + count
+    return Replay(seed, started, first_turn, player, ai, events, position == end)
+
+
+def read_replay(path):
+    with open(path, 'rb') as f:
+        return parse_replay(f.read())
+
+
+def replay_game(replay):
+    """
+    Re-simulate a replay headless and return the final GameState. Raises ReplayError
+    if an action is illegal or a draw differs from the recording, e.g. after a rules change.
+    """
+    state = GameState(Deck(rng=random.Random(replay.seed)), Player(PLAYER, None), Player(AI, None),
+                      current_turn=replay.first_turn)
+    state.deal()
+    hands = {PLAYER: list(state.player.hand), AI: list(state.ai_player.hand)}
+    expected = {PLAYER: [], AI: []}
+    for index, (kind, side, cards) in enumerate(replay.events):
+        if kind == DRAW:
+            expected[side].extend(cards)
+            continue
+        if expected != hands:
+            raise ReplayError(f"draws differ from the recording before event {index}")
+        if side != state.current_turn:
+            raise ReplayError(f"event {index} is for {side}, but it is {state.current_turn}'s turn")
+        waiting = state.opponent
+        waiting_hand_size = len(waiting.hand)
+        try:
+            state.apply(to_action(kind, cards))
+        except ValueError as e:
+            raise ReplayError(f"event {index}: {e}") from None
+        hands = {PLAYER: [], AI: []}
+        if kind == JESTER:
+            hands[side] = list(state.side(side).hand)
+        if not state.is_over():
+            hands[state.current_turn] = state.current.hand[waiting_hand_size:]
+        expected = {PLAYER: [], AI: []}
+    if expected != hands and any(expected.values()):
+        raise ReplayError("draws differ from the recording at the end of the replay")
+    return state
+
+
+def replay_path(directory, seed):
+    """A new file name in directory for a game with the given seed."""
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{seed:016x}.replay")
+
+
+def play_in_window(replay, delay_ms):
+    """Show a replay in the game window, one action every delay_ms; the game can be continued from where it ends."""
+    import pygame
+    from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+    from game import Game
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption('Astolat Card Game - Replay')
+    difficulty = replay.ai if replay.ai != 'Human' else 'Easy'
+    game = Game(screen, difficulty, replay.seed)
+    game.play_back(replay.actions(), delay_ms)
+    game.start_game()
+    clock = pygame.time.Clock()
+    try:
+        while game.running:
+            events = pygame.event.get()
+            if any(event.type == pygame.QUIT for event in events):
+                break
+            game.run_frame(events)
+            clock.tick(FPS)
+    finally:
+        game.stop_ai()
+        pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-simulate recorded games, or watch one in the game window.")
+    parser.add_argument('paths', nargs='+', metavar='PATH', help="replay files, or directories of them")
+    parser.add_argument('--play', action='store_true', help="show the (first) replay in the game window")
+    parser.add_argument('--delay', type=int, default=600, metavar='MS', help="time between actions when playing")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print the totals")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.replay')))
+        else:
+            paths.append(path)
+
+    if args.play:
+        play_in_window(read_replay(paths[0]), args.delay)
+        return 0
+
+    failures = turns = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            replay = read_replay(path)
+            state = replay_game(replay)
+        except (OSError, ReplayError) as e:
+            failures += 1
+            print(f"{path}: {e}")
+            continue
+        turns += len(state.history)
+        if not args.quiet:
+            result = f"{state.winner} won" if state.winner else "unfinished"
+            truncated = "" if replay.complete else ", truncated"
+            print(f"{path}: {replay.player} vs {replay.ai}, {len(state.history)} turns, {result}{truncated}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} replays, {turns} turns in {elapsed:.2f} s "
+          f"({turns / elapsed if elapsed else 0:,.0f} turns/s), {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# src/game/session.py
+
+import os
+from game import Game
+from replay import ReplayWriter, replay_path
+from snapshot import load_game
+
+
+class GameSession:
+    """
+    Owns the one Game of an application session and reuses it from match to match.
+
+    The Game's fonts, images, buttons, renderer and AI worker process are set up by the
+    first match; each later match only resets the game state. close() releases the AI
+    worker when the session ends.
+
+    With a replay_dir, every match is recorded there as it is played (see replay.py).
+    Resumed matches are not recorded, as their replays would lack the start of the match.
+    """
+
+    def __init__(self, screen, replay_dir=None):
+        self.screen = screen
+        self.replay_dir = replay_dir
+        self.game = None
+        self.matches = 0  # Matches started in this session
+
+    def new_match(self, difficulty, seed=None):
+        """Start a match against difficulty and return the Game playing it."""
+        if self.game is None:
+            self.game = Game(self.screen, difficulty, seed)
+        else:
+            self.close_replay()
+            self.game.reset(difficulty, seed)
+        if self.replay_dir is not None:
+            self.open_replay(difficulty)
+        self.game.start_game()
+        self.matches += 1
+        return self.game
+
+    def resume(self, path):
+        """Resume the match saved at path and return the Game playing it. Raises OSError or SaveError."""
+        saved = load_game(path)
+        if self.game is None:
+            self.game = Game(self.screen, saved.difficulty, saved.seed)
+        else:
+            self.close_replay()
+        self.game.load(saved)
+        self.matches += 1
+        return self.game
+
+    def suspend(self, path):
+        """Save the current match to path if it is still being played; returns whether it was saved."""
+        if self.game is None or self.game.game_over:
+            return False
+        self.game.save(path)
+        return True
+
+    def open_replay(self, difficulty):
+        try:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            path = replay_path(self.replay_dir, self.game.seed)
+            self.game.replay = ReplayWriter(path, self.game.seed, player='Human', ai=difficulty)
+        except OSError as e:
+            # A read-only or full disk should not stop anyone playing
+            print(f"Could not record a replay: {e}")
+            self.replay_dir = None
+
+    def close_replay(self):
+        if self.game is not None and self.game.replay is not None:
+            self.game.replay.close()
+            self.game.replay = None
+
+    def end_match(self):
+        """Stop the current match's AI decision, if any; the Game is kept for the next match."""
+        if self.game is not None:
+            self.game.cancel_ai()
+            self.close_replay()
+
+    def close(self):
+        if self.game is not None:
+            self.close_replay()
+            self.game.stop_ai()
+            self.game = None
@@ -0,0 +1,215 @@
+# src/game/simulate.py
+
+import argparse
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+
+from actions import ATTACK, COMBO
+from ai_player import AIPlayer
+from card import SUITS
+from deck import Deck
+from engine import GameState, PLAYER
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard', 'Expert', 'Learned']
+MAX_TURNS = 1000  # Games still running after this many turns are counted as draws
+EXPERT_ITERATIONS = 200  # Expert searches by iteration count here so runs are reproducible
+HARD_DEPTH = 2  # Hard looks one turn less far ahead than in the game, to keep bulk runs fast
+Z_95 = 1.96
+
+
+def new_ai_game(difficulty_a, difficulty_b, seed, a_moves_first=True, expert_iterations=EXPERT_ITERATIONS,
+                hard_depth=HARD_DEPTH):
+    """Set up a dealt headless game between two AIs, with A as the first side if a_moves_first."""
+    rng = random.Random(seed)
+    player_a = AIPlayer('A', difficulty=difficulty_a, rng=rng, search_time=None,
+                        search_iterations=expert_iterations, lookahead_depth=hard_depth)
+    player_b = AIPlayer('B', difficulty=difficulty_b, rng=rng, search_time=None,
+                        search_iterations=expert_iterations, lookahead_depth=hard_depth)
+    if a_moves_first:
+        state = GameState(Deck(rng=rng), player_a, player_b)
+    else:
+        state = GameState(Deck(rng=rng), player_b, player_a)
+    state.deal()
+    return state
+
+
+def play_game(difficulty_a, difficulty_b, seed, a_moves_first=True, max_turns=MAX_TURNS,
+              expert_iterations=EXPERT_ITERATIONS, hard_depth=HARD_DEPTH):
+    """
+    Play one AI-vs-AI game to the end.
+    Returns (winner, turns, damage): winner is 'A', 'B' or None for a draw, and damage maps
+    each of 'A' and 'B' to the damage it dealt per suit of the attacking card.
+    """
+    state = new_ai_game(difficulty_a, difficulty_b, seed, a_moves_first, expert_iterations, hard_depth)
+    names = {PLAYER: 'A', 'AI': 'B'} if a_moves_first else {PLAYER: 'B', 'AI': 'A'}
+    damage = {'A': dict.fromkeys(SUITS, 0), 'B': dict.fromkeys(SUITS, 0)}
+
+    turns = 0
+    while not state.is_over() and turns < max_turns:
+        event = state.apply(state.decide_current())
+        if event.kind == ATTACK or event.kind == COMBO:
+            damage[names[event.actor]][event.card.suit] += event.amount
+        turns += 1
+
+    winner = names[state.winner] if state.winner else None
+    return winner, turns, damage
+
+
+class RunningStat:
+    """Count, sum and sum of squares, enough for a mean and its confidence interval."""
+
+    __slots__ = ('n', 'total', 'total_sq')
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, x):
+        self.n += 1
+        self.total += x
+        self.total_sq += x * x
+
+    def merge(self, other):
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    def interval(self, z=Z_95):
+        """Half-width of the normal-approximation confidence interval for the mean."""
+        if self.n < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.n) / (self.n - 1)
+        return z * math.sqrt(max(variance, 0.0) / self.n)
+
+
+class SimulationStats:
+    """Aggregated results of many games between difficulty A and difficulty B."""
+
+    def __init__(self, difficulty_a, difficulty_b):
+        self.difficulty_a = difficulty_a
+        self.difficulty_b = difficulty_b
+        self.games = 0
+        self.wins = {'A': 0, 'B': 0}
+        self.draws = 0
+        self.turns = RunningStat()
+        self.damage = {name: {suit: RunningStat() for suit in SUITS} for name in ('A', 'B')}
+        self.elapsed = 0.0
+
+    def add_game(self, winner, turns, damage):
+        self.games += 1
+        if winner is None:
+            self.draws += 1
+        else:
+            self.wins[winner] += 1
+        self.turns.add(turns)
+        for name, by_suit in damage.items():
+            for suit, amount in by_suit.items():
+                self.damage[name][suit].add(amount)
+
+    def merge(self, other):
+        self.games += other.games
+        self.draws += other.draws
+        for name in self.wins:
+            self.wins[name] += other.wins[name]
+            for suit in SUITS:
+                self.damage[name][suit].merge(other.damage[name][suit])
+        self.turns.merge(other.turns)
+
+    def win_rate(self, name, z=Z_95):
+        """Win rate of side 'A' or 'B' with its Wilson score interval as (rate, low, high)."""
+        n = self.games
+        if not n:
+            return 0.0, 0.0, 0.0
+        p = self.wins[name] / n
+        denominator = 1 + z * z / n
+        centre = (p + z * z / (2 * n)) / denominator
+        half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        return p, centre - half_width, centre + half_width
+
+    def games_per_second(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        """Format the results as a multi-line, human-readable report."""
+        labels = {'A': f"A ({self.difficulty_a})", 'B': f"B ({self.difficulty_b})"}
+        lines = [f"{self.games} games, {self.draws} draws, "
+                 f"{self.elapsed:.1f}s ({self.games_per_second():.0f} games/sec)"]
+        for name in ('A', 'B'):
+            rate, low, high = self.win_rate(name)
+            lines.append(f"{labels[name]} win rate: {rate:.2%} (95% CI {low:.2%} - {high:.2%})")
+        lines.append(f"Average turns: {self.turns.mean():.1f} ± {self.turns.interval():.2f}")
+        for name in ('A', 'B'):
+            lines.append(f"{labels[name]} damage per game by suit:")
+            for suit in SUITS:
+                stat = self.damage[name][suit]
+                lines.append(f"  {suit:<9}{stat.mean():7.2f} ± {stat.interval():.2f}")
+        return '\n'.join(lines)
+
+
+def play_chunk(args):
+    """Worker entry point: play games [start, stop) and return their aggregated stats."""
+    difficulty_a, difficulty_b, seed, start, stop, max_turns, expert_iterations, hard_depth = args
+    stats = SimulationStats(difficulty_a, difficulty_b)
+    for index in range(start, stop):
+        # Alternate who moves first so neither difficulty gets the first-move advantage
+        result = play_game(difficulty_a, difficulty_b, f"{seed}:{index}", index % 2 == 0, max_turns,
+                           expert_iterations, hard_depth)
+        stats.add_game(*result)
+    return stats
+
+
+def run_simulation(difficulty_a, difficulty_b, games, workers=None, seed=0,
+                   chunk_size=None, max_turns=MAX_TURNS, expert_iterations=EXPERT_ITERATIONS,
+                   hard_depth=HARD_DEPTH):
+    """Play games across a process pool and return the merged SimulationStats."""
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Enough chunks to keep every worker busy without paying per-game IPC
+        chunk_size = max(1, min(5000, games // (workers * 8) or 1))
+    chunks = [
+        (difficulty_a, difficulty_b, seed, start, min(start + chunk_size, games), max_turns,
+         expert_iterations, hard_depth)
+        for start in range(0, games, chunk_size)
+    ]
+
+    stats = SimulationStats(difficulty_a, difficulty_b)
+    start_time = time.perf_counter()
+    if workers == 1:
+        for chunk in chunks:
+            stats.merge(play_chunk(chunk))
+    else:
+        with Pool(workers) as pool:
+            for chunk_stats in pool.imap_unordered(play_chunk, chunks):
+                stats.merge(chunk_stats)
+    stats.elapsed = time.perf_counter() - start_time
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless AI-vs-AI games and report statistics.")
+    parser.add_argument('difficulty_a', choices=DIFFICULTIES)
+    parser.add_argument('difficulty_b', choices=DIFFICULTIES)
+    parser.add_argument('-n', '--games', type=int, default=10000, help="number of games to play")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--seed', default=0, help="base seed; the same seed replays the same games")
+    parser.add_argument('--max-turns', type=int, default=MAX_TURNS, help="turn limit before a game is a draw")
+    parser.add_argument('--expert-iterations', type=int, default=EXPERT_ITERATIONS,
+                        help="MCTS iterations per Expert move")
+    parser.add_argument('--hard-depth', type=int, default=HARD_DEPTH, help="turns Hard searches ahead")
+    args = parser.parse_args()
+
+    stats = run_simulation(args.difficulty_a, args.difficulty_b, args.games,
+                           workers=args.workers, seed=args.seed, max_turns=args.max_turns,
+                           expert_iterations=args.expert_iterations, hard_depth=args.hard_depth)
+    print(stats.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# src/game/snapshot.py
+
+import os
+import random
+import struct
+
+from cache import LRUCache
+from card import DECK_CARDS
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from player import Player
+
+# A position packed into SNAPSHOT.size bytes: the turn, the winner and the pile sizes;
+# each side's jesters, defense flag, top card index, hand size, hand (padded with EMPTY)
+# and top card health and maximum health; then the draw pile followed by the discard
+# pile, in order, padded with EMPTY to all 40 cards.
+SNAPSHOT = struct.Struct('<4B' + '4B5s3B3B' * 2 + '40s')
+EMPTY = b'\xff'
+TURNS = (None, PLAYER, AI)  # Codes for the turn and winner fields
+TURN_CODES = {turn: code for code, turn in enumerate(TURNS)}
+TOP_CARD_NAMES = ('Jack', 'Queen', 'King')
+HAND_SLOTS = 5
+PILE_SLOTS = len(DECK_CARDS)
+card_of = DECK_CARDS.__getitem__
+DECODED_CACHE_SIZE = 1024  # Snapshots kept decoded by restore
+
+_decoded = LRUCache(max_size=DECODED_CACHE_SIZE)
+
+# Where the menu suspends a match left unfinished when the game is closed
+SAVE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'suspended.save')
+
+# Save files: a header, a snapshot, then the state of the deck's and the AI's random
+# generators, so that a resumed match draws and decides exactly as it would have
+SAVE_MAGIC = b'ASTSAVE\0'
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct('<8sHQ16s')  # Magic, version, match seed, difficulty
+RNG_STATE = struct.Struct('<625I?d')  # random.Random's Mersenne Twister state and cached gauss value
+
+
+class SaveError(Exception):
+    """A save file that is damaged or was written by an incompatible version."""
+
+
+def pack_side(side):
+    hand = bytes([card.code for card in side.hand]).ljust(HAND_SLOTS, EMPTY)
+    jack, queen, king = side.top_cards
+    return (side.jesters, side.defense_active, side.current_top_card_index, len(side.hand), hand,
+            jack['health'], queen['health'], king['health'],
+            jack['max_health'], queen['max_health'], king['max_health'])
+
+
+def snapshot(state):
+    """Encode a GameState's position as SNAPSHOT.size bytes. The action history is not kept."""
+    deck = state.deck
+    piles = bytes([card.code for card in deck.cards] + [card.code for card in deck.discard_pile])
+    return SNAPSHOT.pack(TURN_CODES[state.current_turn], TURN_CODES[state.winner],
+                         len(deck.cards), len(deck.discard_pile),
+                         *pack_side(state.player), *pack_side(state.ai_player),
+                         piles.ljust(PILE_SLOTS, EMPTY))
+
+
+def decode_side(fields):
+    jesters, defense, top_index, hand_size, hand, *health = fields
+    return jesters, bool(defense), top_index, tuple(map(card_of, hand[:hand_size])), health
+
+
+def decode(data):
+    """Decode a snapshot into plain tuples; restore() keeps recently decoded snapshots."""
+    fields = SNAPSHOT.unpack(data)
+    turn, winner, deck_size, discard_size = fields[:4]
+    piles = tuple(map(card_of, fields[26][:deck_size + discard_size]))
+    return (TURNS[turn], TURNS[winner], decode_side(fields[4:15]), decode_side(fields[15:26]),
+            piles[:deck_size], piles[deck_size:])
+
+
+def restore_side(side, decoded):
+    side.jesters, side.defense_active, side.current_top_card_index, hand, health = decoded
+    side.hand = list(hand)
+    # A state's top card dicts are its own (GameState.clone copies them), so they are reused
+    top_cards = side.top_cards
+    if len(top_cards) != len(TOP_CARD_NAMES):
+        top_cards = side.top_cards = [{'name': name} for name in TOP_CARD_NAMES]
+    for i, top_card in enumerate(top_cards):
+        top_card['health'] = health[i]
+        top_card['max_health'] = health[i + 3]
+
+
+def restore(state, data):
+    """
+    Overwrite a GameState's position with a snapshot, keeping its sides' other
+    attributes, and return state. Restoring a snapshot that was recently restored
+    skips decoding it, as when a search returns to the same position many times.
+    """
+    decoded = _decoded.get(data)
+    if decoded is None:
+        decoded = decode(data)
+        _decoded.put(data, decoded)
+    state.current_turn, state.winner, player, ai_player, cards, discard_pile = decoded
+    restore_side(state.player, player)
+    restore_side(state.ai_player, ai_player)
+    state.deck.cards = list(cards)
+    state.deck.discard_pile = list(discard_pile)
+    state.history = []
+    return state
+
+
+def from_snapshot(data, deck_rng=None):
+    """
+    A new headless GameState at a snapshot's position, e.g. for analysis. The deck
+    reshuffles with deck_rng, or with a new random generator if none is given.
+    """
+    deck = object.__new__(Deck)
+    deck.rng = deck_rng if deck_rng is not None else random.Random()
+    state = GameState(deck, Player(PLAYER, None), Player(AI, None))
+    return restore(state, data)
+
+
+def pack_rng(rng):
+    _, internal, gauss_next = rng.getstate()
+    return RNG_STATE.pack(*internal, gauss_next is not None, gauss_next or 0.0)
+
+
+def unpack_rng(rng, data):
+    *internal, has_gauss, gauss_next = RNG_STATE.unpack(data)
+    rng.setstate((3, tuple(internal), gauss_next if has_gauss else None))
+
+
+def save_game(path, seed, difficulty, state, deck_rng, ai_rng):
+    """Write a match to path. The file is written beside path and then moved into place."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, seed, difficulty.encode('ascii')))
+            f.write(snapshot(state))
+            f.write(pack_rng(deck_rng))
+            f.write(pack_rng(ai_rng))
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SavedGame:
+    """A match read from a save file."""
+
+    __slots__ = ('seed', 'difficulty', 'snapshot', 'deck_rng_state', 'ai_rng_state')
+
+    def __init__(self, seed, difficulty, snapshot, deck_rng_state, ai_rng_state):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.snapshot = snapshot
+        self.deck_rng_state = deck_rng_state
+        self.ai_rng_state = ai_rng_state
+
+
+def load_game(path):
+    """Read a save file written by save_game. Raises SaveError if it cannot be used."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    expected_size = SAVE_HEADER.size + SNAPSHOT.size + 2 * RNG_STATE.size
+    if len(data) < SAVE_HEADER.size:
+        raise SaveError("too short to be a save file")
+    magic, version, seed, difficulty = SAVE_HEADER.unpack_from(data, 0)
+    if magic != SAVE_MAGIC:
+        raise SaveError("not a save file")
+    if version != SAVE_VERSION:
+        raise SaveError(f"saved by an incompatible version ({version})")
+    if len(data) != expected_size:
+        raise SaveError("damaged save file")
+    position = SAVE_HEADER.size
+    snapshot_data = data[position:position + SNAPSHOT.size]
+    position += SNAPSHOT.size
+    deck_rng_state = data[position:position + RNG_STATE.size]
+    ai_rng_state = data[position + RNG_STATE.size:]
+    return SavedGame(seed, difficulty.rstrip(b'\0').decode('ascii'), snapshot_data, deck_rng_state, ai_rng_state)
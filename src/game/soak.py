@@ -0,0 +1,133 @@
+# src/game/soak.py
+
+import argparse
+import contextlib
+import gc
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# Matches are played without a window; this must be set before pygame starts
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from actions import JESTER
+from engine import PLAYER
+from session import GameSession
+from simulate import MAX_TURNS
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard', 'Expert', 'Learned']
+DEFAULT_MATCHES = 500
+# Allowed growth over the second half of a run. Bounded caches, such as hand_actions',
+# fill during the first matches; after that a session's memory should stay flat.
+DEFAULT_MAX_GROWTH_MB = 2.0
+
+
+def process_rss(pid='self'):
+    """Resident memory of a process in bytes, or None if it cannot be read."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if pid != 'self':
+            return None
+    # Without /proc, the peak is the best available measure of this process
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def session_rss():
+    """Resident memory of this process and of its workers, such as the AI's, in bytes."""
+    children = (process_rss(child.pid) for child in multiprocessing.active_children())
+    return process_rss() + sum(rss for rss in children if rss is not None)
+
+
+def play_match(session, difficulty, seed):
+    """
+    Play one match through the session's Game, drawing every step. The player's side
+    plays random legal moves; the AI decides in its worker process as in a real game.
+    Returns the number of turns played.
+    """
+    game = session.new_match(difficulty, seed)
+    game.ai_min_think_ms = 0
+    rng = random.Random(seed)
+    turns = 0
+    while game.running and not game.game_over and turns < MAX_TURNS:
+        pygame.event.pump()
+        if game.current_turn == PLAYER:
+            action = rng.choice(game.state.legal_actions())
+            if action.kind == JESTER:
+                game.use_player_jester(0)
+            else:
+                game.perform_action(action)
+        else:
+            game.ai_future.result()
+        game.run_frame([])
+        turns += 1
+    session.end_match()
+    return turns
+
+
+def slope(samples):
+    """Least-squares growth of (match, bytes) samples, in bytes per match."""
+    if len(samples) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in samples) / len(samples)
+    mean_y = sum(y for _, y in samples) / len(samples)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in samples)
+    variance = sum((x - mean_x) ** 2 for x, _ in samples)
+    return covariance / variance if variance else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many back-to-back matches in one session and report memory growth.")
+    parser.add_argument('-n', '--matches', type=int, default=DEFAULT_MATCHES, help="number of matches to play")
+    parser.add_argument('-d', '--difficulties', nargs='+', choices=DIFFICULTIES, default=['Easy', 'Medium'],
+                        help="difficulties to cycle through")
+    parser.add_argument('--seed', default=0, help="base seed; the same seed replays the same matches")
+    parser.add_argument('--report-every', type=int, default=25, metavar='N', help="sample memory every N matches")
+    parser.add_argument('--max-growth-mb', type=float, default=DEFAULT_MAX_GROWTH_MB,
+                        help="fail if memory grows more than this over the second half of the run")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    session = GameSession(screen)
+    samples = []
+    start = time.perf_counter()
+    try:
+        for match in range(1, args.matches + 1):
+            difficulty = args.difficulties[(match - 1) % len(args.difficulties)]
+            # The game narrates every move on stdout; a soak run only reports memory
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                play_match(session, difficulty, random.Random(f"{args.seed}:{match}").getrandbits(64))
+            if match % args.report_every == 0 or match == args.matches:
+                gc.collect()
+                rss = session_rss()
+                samples.append((match, rss))
+                print(f"match {match:>5}  rss {rss / 2**20:8.1f} MB  "
+                      f"({time.perf_counter() - start:.0f} s)", flush=True)
+    finally:
+        session.close()
+        pygame.quit()
+
+    first, last = samples[0][1], samples[-1][1]
+    print(f"\n{session.matches} matches, rss {first / 2**20:.1f} -> {last / 2**20:.1f} MB "
+          f"({(last - first) / 2**20:+.2f} MB)")
+    steady = [sample for sample in samples if sample[0] >= args.matches // 2]
+    growth_mb = (steady[-1][1] - steady[0][1]) / 2**20
+    print(f"second half: {growth_mb:+.2f} MB, {slope(steady) * 100 / 2**10:+.1f} KB per 100 matches")
+    if growth_mb > args.max_growth_mb:
+        print(f"Memory grew more than {args.max_growth_mb} MB over the second half.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# src/game/sprite_cache.py
+
+import mmap
+import os
+import struct
+import pygame
+
+# File layout: a header, an index of (offset, width, height, name) entries, then the
+# pixel data of each sprite, every block starting on an ALIGNMENT boundary
+MAGIC = b'ASTSPRC1'
+HEADER = struct.Struct('<8s20s4sI')  # Magic, source digest, pixel format, entry count
+ENTRY = struct.Struct('<QHHH')  # Data offset, width, height, name length; the name follows
+ALIGNMENT = 16
+
+
+def pixel_format(surface):
+    """The frombuffer/tobytes format matching a 32-bit surface's byte order, so blits need no conversion."""
+    return 'BGRA' if surface.get_masks()[0] == 0xff0000 else 'RGBA'
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SpriteCache:
+    """
+    A memory-mapped file of pre-scaled sprites. Sprites are Surfaces wrapping the mapped
+    bytes with pygame.image.frombuffer, so opening the cache decodes and copies nothing;
+    pages are read from disk as sprites are first drawn. The Surfaces share the mapping
+    and must not be drawn on.
+    """
+
+    def __init__(self, path, mapping, pixel_format, index):
+        self.path = path
+        self.mapping = mapping
+        self.pixel_format = pixel_format
+        self.index = index  # Name -> (offset, width, height)
+        self.surfaces = {}
+
+    @classmethod
+    def open(cls, path, digest, pixel_format):
+        """
+        Map the cache at path, or return None if it is missing, damaged, or was built from
+        other sources (digest) or for another pixel format.
+        """
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, file_digest, file_format, count = HEADER.unpack_from(mapping, 0)
+            if (magic != MAGIC or file_digest != digest
+                    or file_format.decode('ascii') != pixel_format):
+                raise ValueError("stale sprite cache")
+            index = {}
+            position = HEADER.size
+            for _ in range(count):
+                offset, width, height, name_length = ENTRY.unpack_from(mapping, position)
+                position += ENTRY.size
+                name = mapping[position:position + name_length].decode('utf-8')
+                position += name_length
+                if offset + width * height * 4 > len(mapping):
+                    raise ValueError("truncated sprite cache")
+                index[name] = (offset, width, height)
+        except (struct.error, ValueError, UnicodeDecodeError):
+            mapping.close()
+            return None
+        return cls(path, mapping, pixel_format, index)
+
+    def prefetch(self):
+        """Ask the OS to read the whole file in ahead of use, where it supports that."""
+        if hasattr(self.mapping, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+            self.mapping.madvise(mmap.MADV_WILLNEED)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def get(self, name):
+        """Return the sprite stored under name, or None."""
+        surface = self.surfaces.get(name)
+        if surface is None:
+            entry = self.index.get(name)
+            if entry is None:
+                return None
+            offset, width, height = entry
+            pixels = memoryview(self.mapping)[offset:offset + width * height * 4]
+            surface = pygame.image.frombuffer(pixels, (width, height), self.pixel_format)
+            self.surfaces[name] = surface
+        return surface
+
+
+def write_cache(path, digest, pixel_format, sprites):
+    """
+    Write (name, Surface) pairs to a cache file at path. The file is written beside path
+    and then moved into place, so a reader never sees it half-written.
+    """
+    sprites = [(name.encode('utf-8'), surface) for name, surface in sprites]
+    position = HEADER.size + sum(ENTRY.size + len(name) for name, _ in sprites)
+    entries = []
+    for name, surface in sprites:
+        position = align(position)
+        width, height = surface.get_size()
+        entries.append((name, position, width, height))
+        position += width * height * 4
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, digest, pixel_format.encode('ascii'), len(entries)))
+            for name, offset, width, height in entries:
+                f.write(ENTRY.pack(offset, width, height, len(name)))
+                f.write(name)
+            for (name, offset, width, height), (_, surface) in zip(entries, sprites):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(pygame.image.tobytes(surface, pixel_format))
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,71 @@
+# src/game/sprites.py
+
+from atlas import get_atlas
+from utils import get_card
+from constants import (
+    BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR,
+    MINI_CARD_WIDTH, MINI_CARD_HEIGHT, MINI_SCALE_FACTOR,
+)
+
+
+class CardSprites:
+    """
+    Flyweight table of card sprites. Every card with the same suit and value shares one
+    big and one mini image, looked up only when a card is drawn.
+
+    The asset preloader fills the table from its worker thread while the game may
+    already draw from it, so lookups and inserts take the atlas's lock, as its own
+    sprite lookups do; loading a missing sprite happens outside it.
+    """
+
+    def __init__(self, assets_path):
+        self.assets_path = assets_path
+        self.big_images = {}
+        self.mini_images = {}
+        self.lock = get_atlas().lock
+
+    def big(self, suit, value):
+        """Return the big image for a suit and value."""
+        with self.lock:
+            image = self.big_images.get((suit, value))
+        if image is None:
+            image = get_card(
+                self.assets_path, 'bigcards.png',
+                BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR, suit, value
+            )
+            with self.lock:
+                image = self.big_images.setdefault((suit, value), image)
+        return image
+
+    def mini(self, suit, value):
+        """Return the mini image for a suit and value."""
+        with self.lock:
+            image = self.mini_images.get((suit, value))
+        if image is None:
+            image = get_card(
+                self.assets_path, 'minicards.png',
+                MINI_CARD_WIDTH, MINI_CARD_HEIGHT, MINI_SCALE_FACTOR, suit, value
+            )
+            with self.lock:
+                image = self.mini_images.setdefault((suit, value), image)
+        return image
+
+    def big_image(self, card):
+        """Return the big image for a card."""
+        return self.big(card.suit, card.value)
+
+    def mini_image(self, card):
+        """Return the mini image for a card."""
+        return self.mini(card.suit, card.value)
+
+
+_sprites = {}
+
+
+def get_sprites(assets_path):
+    """Return the shared sprite table for an assets directory."""
+    with get_atlas().lock:
+        sprites = _sprites.get(assets_path)
+        if sprites is None:
+            sprites = _sprites[assets_path] = CardSprites(assets_path)
+    return sprites
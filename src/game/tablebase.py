@@ -0,0 +1,244 @@
+# src/game/tablebase.py
+
+import argparse
+import itertools
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+
+from actions import ATTACK, HEAL, DEFENSE, COMBO, ATTACK_DAMAGE, COMBO_DAMAGE, HEAL_AMOUNT, hand_actions
+from card import DECK_CARDS
+from engine import MAX_HAND_SIZE
+
+TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'assets', 'endgame_tablebase.bin')
+KING_HEALTH = 40  # The last top card's maximum health, as in Player.top_cards
+
+# File layout: a header, then one little-endian float32 per position: the probability
+# that the side to move wins. Positions are indexed by the mover's health, the other
+# side's health (both 1 to max health) and the two defense flags.
+MAGIC = b'ASTTBLB1'
+HEADER = struct.Struct('<8sBBHI')  # Magic, max health, hand size, iterations, positions
+VALUE = struct.Struct('<f')
+
+CONVERGENCE = 1e-9  # Value iteration stops once no position changes by more than this
+MAX_ITERATIONS = 100000
+
+
+def position_index(own_health, opponent_health, own_defense, opponent_defense, max_health=KING_HEALTH):
+    return (((own_health - 1) * max_health + opponent_health - 1) << 2) | (own_defense << 1) | opponent_defense
+
+
+class Tablebase:
+    """
+    Solved King-versus-King endgames: both sides are on their last top card.
+
+    The tablebase is exact under one simplification: the hand a side holds on each of
+    its future turns is modelled as a fresh random hand, rather than the cards kept from
+    its last turn. A hand then only matters through its best attack, its best heal and
+    whether it holds a Diamond, which keeps the positions to the two healths and two
+    defense flags. Jesters only pass the turn in this model, so their counts drop out.
+
+    choose() scores the legal moves of the actual hand by the position each leads to,
+    so the side to move plays its real cards against the solved future.
+    """
+
+    def __init__(self, path, mapping, max_health):
+        self.path = path
+        self.mapping = mapping
+        self.max_health = max_health
+
+    @classmethod
+    def open(cls, path=TABLEBASE_PATH):
+        """Map the tablebase at path, or return None if it is missing or damaged."""
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, max_health, hand_size, _, positions = HEADER.unpack_from(mapping, 0)
+            if (magic != MAGIC or hand_size != MAX_HAND_SIZE or positions != max_health * max_health * 4
+                    or len(mapping) != HEADER.size + positions * VALUE.size):
+                raise ValueError("not a tablebase for this game")
+        except (struct.error, ValueError):
+            mapping.close()
+            return None
+        return cls(path, mapping, max_health)
+
+    def covers(self, state):
+        """Whether state is one of the solved endgames."""
+        return covers(state, self.max_health)
+
+    def win_probability(self, own_health, opponent_health, own_defense, opponent_defense):
+        """The chance that the side to move wins, with the side to move's hand yet to be drawn."""
+        offset = HEADER.size + VALUE.size * position_index(
+            own_health, opponent_health, own_defense, opponent_defense, self.max_health)
+        return VALUE.unpack_from(self.mapping, offset)[0]
+
+    def move_value(self, own_health, opponent_health, own_defense, opponent_defense, move):
+        """The chance of winning after playing move: one minus the opponent's chance from there."""
+        kind = move.action.kind
+        if kind in (ATTACK, COMBO):
+            damage = move.damage
+            if opponent_defense:
+                damage //= 2
+                opponent_defense = False
+            opponent_health -= damage
+            if opponent_health <= 0:
+                return 1.0
+        elif kind == HEAL:
+            own_health = min(own_health + move.heal, self.max_health)
+        elif kind == DEFENSE:
+            own_defense = True
+        return 1.0 - self.win_probability(opponent_health, own_health, opponent_defense, own_defense)
+
+    def choose(self, state):
+        """The best action for the side to move in state, which covers() must accept."""
+        side, opponent = state.current, state.opponent
+        own_health, opponent_health = side.top_card()['health'], opponent.top_card()['health']
+        best_action, best_value = None, -1.0
+        for move in hand_actions(side.hand, side.jesters).all:
+            value = self.move_value(own_health, opponent_health, side.defense_active,
+                                    opponent.defense_active, move)
+            if value > best_value:
+                best_action, best_value = move.action, value
+        return best_action
+
+
+def covers(state, max_health=KING_HEALTH):
+    """Whether both sides are on their last top card, at the health the tablebase was solved for."""
+    for side in (state.player, state.ai_player):
+        if side.current_top_card_index != len(side.top_cards) - 1:
+            return False
+        if side.top_cards[-1]['max_health'] != max_health:
+            return False
+    return not state.is_over()
+
+
+_tablebase = None
+_tablebase_loaded = False
+_tablebase_lock = threading.Lock()
+
+
+def get_tablebase():
+    """
+    Return the process-wide tablebase, mapping the file on first use, or None if there
+    is none. Nothing is read until a game first reaches an endgame.
+    """
+    global _tablebase, _tablebase_loaded
+    if not _tablebase_loaded:
+        with _tablebase_lock:
+            if not _tablebase_loaded:
+                _tablebase = Tablebase.open()
+                _tablebase_loaded = True
+    return _tablebase
+
+
+def hand_classes(hand_size=MAX_HAND_SIZE):
+    """
+    Count every hand of hand_size cards by what it can do: (best attack damage, best
+    heal, holds a Diamond). Returns a Counter of those classes.
+    """
+    classes = Counter()
+    spades = {card.code for card in DECK_CARDS if card.suit == 'Spades'}
+    diamonds = {card.code for card in DECK_CARDS if card.suit == 'Diamonds'}
+    for codes in itertools.combinations(range(len(DECK_CARDS)), hand_size):
+        attack = max(ATTACK_DAMAGE[code] for code in codes)
+        for code in codes:
+            if code in spades:
+                attack = max(attack, max(COMBO_DAMAGE[code][other] for other in codes if other != code))
+        heal = max(HEAL_AMOUNT[code] for code in codes)
+        classes[attack, heal, any(code in diamonds for code in codes)] += 1
+    return classes
+
+
+def solve(max_health=KING_HEALTH, hand_size=MAX_HAND_SIZE, log=print):
+    """
+    Solve the endgames by value iteration and return (values, iterations): the win
+    probability of the side to move for every position, in position_index order.
+    Needs NumPy.
+    """
+    import numpy as np
+
+    classes = hand_classes(hand_size)
+    total = sum(classes.values())
+    attacks = sorted({attack for attack, _, _ in classes})
+    heals = sorted({heal for _, heal, _ in classes if heal})
+    log(f"{total} hands in {len(classes)} classes")
+
+    # Every position as arrays of its fields
+    own, opponent, own_defense, opponent_defense = (
+        grid.ravel() for grid in np.meshgrid(np.arange(1, max_health + 1), np.arange(1, max_health + 1),
+                                             [0, 1], [0, 1], indexing='ij'))
+
+    def index(own_health, opponent_health, own_def, opponent_def):
+        return (((own_health - 1) * max_health + opponent_health - 1) << 2) | (own_def << 1) | opponent_def
+
+    # Where each move leads, from the next mover's point of view: the opponent becomes
+    # the side to move. Attacks that defeat the opponent are wins.
+    attack_next, attack_wins = {}, {}
+    for attack in attacks:
+        damage = np.where(opponent_defense == 1, attack // 2, attack)
+        left = opponent - damage
+        attack_wins[attack] = left <= 0
+        attack_next[attack] = index(np.maximum(left, 1), own, 0, own_defense)
+    heal_next = {heal: index(opponent, np.minimum(own + heal, max_health), opponent_defense, own_defense)
+                 for heal in heals}
+    defense_next = index(opponent, own, opponent_defense, 1)
+
+    weights = [(attack, heal, diamond, count / total) for (attack, heal, diamond), count in classes.items()]
+    values = np.full(own.size, 0.5)
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        attack_values = {attack: np.where(attack_wins[attack], 1.0, 1.0 - values[attack_next[attack]])
+                         for attack in attacks}
+        heal_values = {heal: 1.0 - values[heal_next[heal]] for heal in heals}
+        defense_value = 1.0 - values[defense_next]
+        updated = np.zeros_like(values)
+        for attack, heal, diamond, weight in weights:
+            best = attack_values[attack]
+            if heal:
+                best = np.maximum(best, heal_values[heal])
+            if diamond:
+                best = np.maximum(best, defense_value)
+            updated += weight * best
+        change = np.abs(updated - values).max()
+        values = updated
+        if change < CONVERGENCE:
+            break
+    log(f"converged after {iteration} iterations (last change {change:.2e})")
+    return values, iteration
+
+
+def write_tablebase(path, values, max_health=KING_HEALTH, hand_size=MAX_HAND_SIZE, iterations=0):
+    """Write solved values to path. The file is written beside path and then moved into place."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, max_health, hand_size, min(iterations, 0xffff), len(values)))
+            f.write(struct.pack(f'<{len(values)}f', *values))
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve the King-versus-King endgames and write the tablebase.")
+    parser.add_argument('-o', '--output', default=TABLEBASE_PATH, metavar='PATH', help="where to write the tablebase")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    values, iterations = solve()
+    write_tablebase(args.output, values.tolist(), iterations=iterations)
+    print(f"Wrote {len(values)} positions to {args.output} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# src/game/text_cache.py
+
+import threading
+import pygame
+from cache import LRUCache
+
+
+class TextCache:
+    """
+    Rendered text surfaces keyed on (font, text, color, antialias), so each distinct
+    string is rasterized once rather than every frame. Fonts are shared by path and
+    size through get_font, which keeps the keys stable across screens and games.
+    The returned surfaces are shared between callers and must not be drawn on.
+    Fonts may be loaded from another thread, e.g. by the asset preloader.
+    """
+
+    def __init__(self, max_surfaces=512):
+        self.surfaces = LRUCache(max_surfaces)
+        self.fonts = {}
+        # FreeType is not safe to use from two threads at once, so loading and rendering
+        # take turns
+        self.lock = threading.Lock()
+
+    def get_font(self, path, size):
+        """Return the shared Font for a font file and point size, loading it on first use."""
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            with self.lock:
+                font = self.fonts.get(key)
+                if font is None:
+                    font = pygame.font.Font(path, size)
+                    self.fonts[key] = font
+        return font
+
+    def render(self, font, text, color, antialias=True):
+        """Return the surface for text in font and color, rendering it only on a cache miss."""
+        # pygame.Color is unhashable, so colors are keyed as plain tuples
+        key = (font, text, tuple(color), antialias)
+        with self.lock:
+            surface = self.surfaces.get(key)
+            if surface is None:
+                surface = font.render(text, antialias, color)
+                self.surfaces.put(key, surface)
+        return surface
+
+    def clear(self):
+        """Forget every rendered surface and font."""
+        self.surfaces.clear()
+        self.fonts.clear()
+
+    def stats(self):
+        """Return cache statistics for the text surfaces plus the number of fonts loaded."""
+        stats = self.surfaces.stats()
+        stats['fonts'] = len(self.fonts)
+        return stats
+
+
+_text_cache = None
+
+
+def get_text_cache():
+    """Return the process-wide text cache."""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = TextCache()
+    return _text_cache
+
+
+def get_font(path, size):
+    """Return the shared Font for a font file and point size."""
+    return get_text_cache().get_font(path, size)
+
+
+def render_text(font, text, color, antialias=True):
+    """Render text through the process-wide cache."""
+    return get_text_cache().render(font, text, color, antialias)
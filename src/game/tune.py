@@ -0,0 +1,301 @@
+# src/game/tune.py
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+from statistics import NormalDist
+
+from ai_player import AIPlayer, Weights, WEIGHTS_PATH, load_weights, save_weights
+from deck import Deck
+from engine import GameState
+from expectimax import EVAL_WEIGHTS
+from simulate import DIFFICULTIES, EXPERT_ITERATIONS, HARD_DEPTH, MAX_TURNS
+
+# The weights each target's AI reads, and so the only ones worth searching. Hard's are
+# the leaf evaluation weights of its expectimax search ('health' stays at 1.0 and sets
+# the scale of the others); the scripted targets use their fields of ai_player.Weights.
+SearchWeights = namedtuple('SearchWeights', ['own_defense', 'opponent_defense', 'jester'])
+HardScriptedWeights = namedtuple('HardScriptedWeights', ['heal', 'double_attack', 'combo_attack',
+                                                         'defense_threshold', 'defense_penalty', 'jester_cutoff'])
+MediumWeights = namedtuple('MediumWeights', ['low_health', 'finishing_health'])
+
+# The range each weight is searched in
+SEARCH_BOUNDS = SearchWeights(own_defense=(0.0, 12.0), opponent_defense=(-12.0, 0.0), jester=(0.0, 10.0))
+SCRIPTED_BOUNDS = Weights(heal=(0.0, 6.0), double_attack=(0.0, 8.0), combo_attack=(0.0, 8.0),
+                          defense_threshold=(0.0, 1.0), defense_penalty=(0.0, 1.0), jester_cutoff=(1.0, 7.0),
+                          low_health=(0.0, 1.0), finishing_health=(0.0, 1.0))
+
+POPULATION = 16
+ELITES = 4  # Candidates kept as parents, and carried over unchanged, each generation
+MUTATION = 0.15  # Standard deviation of a mutation, as a fraction of the weight's range
+STAGES = 4  # A generation's games are played in this many stages, dropping the clear losers between them
+ALPHA = 0.05  # Significance level for dropping candidates and for stopping early
+PATIENCE = 3  # Generations without a significant improvement before the search stops
+
+
+def pick(weights_type, values):
+    """The fields of weights_type, taken from a namedtuple or dict holding at least those."""
+    if not isinstance(values, dict):
+        values = values._asdict()
+    return weights_type._make(values[name] for name in weights_type._fields)
+
+
+# What can be tuned, as (bounds, default opponent). Hard is the search the game plays,
+# after its endgame tablebase. Hard-scripted is hard_behavior, which the game only falls
+# back on when it has no game state to search, so tuning it changes nothing in a normal
+# match. Medium is medium_behavior.
+TARGETS = {
+    'Hard': (SEARCH_BOUNDS, 'Hard'),
+    'Hard-scripted': (pick(HardScriptedWeights, SCRIPTED_BOUNDS), 'Medium'),
+    'Medium': (pick(MediumWeights, SCRIPTED_BOUNDS), 'Medium'),
+}
+
+
+def current_weights(target, path=WEIGHTS_PATH):
+    """The target's weights as the AI plays them now: from the weights file, or the defaults."""
+    bounds, _ = TARGETS[target]
+    weights, eval_weights = load_weights(path)
+    return pick(type(bounds), dict(EVAL_WEIGHTS, **eval_weights) if target == 'Hard' else weights)
+
+
+def play_tuning_game(weights, target, opponent, seed, candidate_first=True):
+    """
+    Play one game between the target AI driven by weights and an AI of the opponent
+    difficulty. Returns the candidate's score: 1 for a win, 0.5 for a draw.
+    """
+    rng = random.Random(seed)
+    scripted = target == 'Hard-scripted'
+    if target == 'Hard':
+        candidate = AIPlayer('A', difficulty='Hard', rng=rng, lookahead_depth=HARD_DEPTH,
+                             eval_weights=weights._asdict())
+    else:
+        candidate = AIPlayer('A', difficulty='Hard' if scripted else target, rng=rng)
+        candidate.weights = candidate.weights._replace(**weights._asdict())
+    other = AIPlayer('B', difficulty=opponent, rng=rng, search_time=None,
+                     search_iterations=EXPERT_ITERATIONS, lookahead_depth=HARD_DEPTH)
+    if candidate_first:
+        state = GameState(Deck(rng=rng), candidate, other)
+    else:
+        state = GameState(Deck(rng=rng), other, candidate)
+    state.deal()
+
+    turns = 0
+    while not state.is_over() and turns < MAX_TURNS:
+        if scripted and state.current is candidate:
+            # Without the game state Hard plays its scripted behavior rather than searching
+            waiting = state.opponent
+            action = candidate.decide_action(waiting.top_card(), waiting.defense_active)
+        else:
+            action = state.decide_current()
+        state.apply(action)
+        turns += 1
+    candidate.close()
+    other.close()
+    if state.winner is None:
+        return 0.5
+    return 1.0 if state.side(state.winner) is candidate else 0.0
+
+
+def play_chunk(args):
+    """Worker entry point: play games [start, stop) for one candidate; returns (candidate, score, games)."""
+    index, weights, target, opponent, seed, start, stop = args
+    score = 0.0
+    for game in range(start, stop):
+        # Alternate who moves first; every candidate plays the same deals
+        score += play_tuning_game(weights, target, opponent, f"{seed}:{game}", game % 2 == 0)
+    return index, score, stop - start
+
+
+class Candidate:
+    """A weight vector and its results in the current generation."""
+
+    __slots__ = ('weights', 'score', 'games', 'dropped')
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.score = 0.0
+        self.games = 0
+        self.dropped = False
+
+    def mean(self):
+        return self.score / self.games if self.games else 0.0
+
+    def interval(self, z):
+        """Half-width of the normal-approximation confidence interval of the mean score."""
+        if not self.games:
+            return 1.0
+        mean = self.mean()
+        return z * math.sqrt(max(mean * (1.0 - mean), 0.25 / self.games) / self.games)
+
+
+def significantly_better(a, b, alpha=ALPHA):
+    """Whether candidate a's mean score beats b's by a one-sided two-proportion z-test."""
+    if not a.games or not b.games:
+        return False
+    pooled = (a.score + b.score) / (a.games + b.games)
+    error = math.sqrt(max(pooled * (1.0 - pooled), 1e-12) * (1.0 / a.games + 1.0 / b.games))
+    return (a.mean() - b.mean()) / error > NormalDist().inv_cdf(1.0 - alpha)
+
+
+def clip(weights, bounds):
+    return type(bounds)._make(min(max(value, low), high) for value, (low, high) in zip(weights, bounds))
+
+
+def offspring(parents, bounds, rng, mutation=MUTATION):
+    """A child of two parents: uniform crossover, then Gaussian mutation within bounds."""
+    first, second = rng.sample(parents, 2) if len(parents) > 1 else parents * 2
+    genes = [rng.choice(pair) for pair in zip(first.weights, second.weights)]
+    return clip((value + rng.gauss(0.0, mutation * (high - low)) for value, (low, high) in zip(genes, bounds)),
+                bounds)
+
+
+def evaluate(pool, candidates, target, opponent, games, seed, stages=STAGES, alpha=ALPHA, workers=1):
+    """
+    Play games per candidate, all on the same deals, in stages. After each stage,
+    candidates whose confidence interval lies wholly below the leader's are dropped
+    and play no more games. Returns the number of games played.
+    """
+    z = NormalDist().inv_cdf(1.0 - alpha / 2)
+    bounds = [games * stage // stages for stage in range(stages + 1)]
+    played = 0
+    for start, stop in zip(bounds, bounds[1:]):
+        racing = [i for i, candidate in enumerate(candidates) if not candidate.dropped]
+        chunk_size = max(1, (stop - start) * len(racing) // (workers * 4) or 1)
+        chunks = [(i, candidates[i].weights, target, opponent, seed, first, min(first + chunk_size, stop))
+                  for i in racing for first in range(start, stop, chunk_size)]
+        for index, score, count in pool.imap_unordered(play_chunk, chunks):
+            candidates[index].score += score
+            candidates[index].games += count
+            played += count
+        leader = max((candidates[i] for i in racing), key=Candidate.mean)
+        floor = leader.mean() - leader.interval(z)
+        for i in racing:
+            candidate = candidates[i]
+            if candidate is not leader and candidate.mean() + candidate.interval(z) < floor:
+                candidate.dropped = True
+    return played
+
+
+def ranked(candidates):
+    """Candidates that played every stage first, then by mean score."""
+    return sorted(candidates, key=lambda candidate: (not candidate.dropped, candidate.mean()), reverse=True)
+
+
+def tune(target='Hard', opponent=None, generations=20, population=POPULATION, games=2000,
+         workers=None, seed=0, elites=ELITES, mutation=MUTATION, alpha=ALPHA, patience=PATIENCE,
+         start=None, log=print):
+    """
+    Search the weights of one of the TARGETS with a genetic algorithm, scoring each
+    candidate by its results against opponent over games per generation. The search
+    starts from the current weights unless given start, and stops after generations,
+    or once the best candidate has not been significantly beaten for patience
+    generations. Returns (best weights, games played).
+    """
+    bounds, default_opponent = TARGETS[target]
+    opponent = opponent or default_opponent
+    start = start or current_weights(target)
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(f"tune:{seed}")
+    parents = [Candidate(start)]
+    best = None
+    stale = 0
+    total_games = 0
+    with Pool(workers) as pool:
+        for generation in range(generations):
+            start_time = time.perf_counter()
+            # Elites are carried over and replayed on new deals, so a lucky run cannot stick
+            candidates = [Candidate(parent.weights) for parent in parents[:elites]]
+            while len(candidates) < population:
+                candidates.append(Candidate(offspring(parents, bounds, rng, mutation)))
+            total_games += evaluate(pool, candidates, target, opponent, games, f"{seed}:{generation}",
+                                    alpha=alpha, workers=workers)
+            order = ranked(candidates)
+            leader = order[0]
+            dropped = sum(candidate.dropped for candidate in candidates)
+            if best is None or significantly_better(leader, best, alpha):
+                best, stale = leader, 0
+                improved = " (new best)"
+            else:
+                stale += 1
+                improved = ""
+            log(f"generation {generation + 1}: best {leader.mean():.2%} over {leader.games} games, "
+                f"{dropped}/{len(candidates)} dropped early, {time.perf_counter() - start_time:.1f} s{improved}")
+            parents = order[:max(elites, 2)]
+            if stale >= patience:
+                log(f"no significant improvement for {patience} generations; stopping")
+                break
+    return best.weights, total_games
+
+
+def format_weights(weights):
+    fields = ', '.join(f"{name}={value:.3g}" for name, value in weights._asdict().items())
+    return f"{type(weights).__name__}({fields})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the weights of Hard's search or of the scripted AI behaviors.")
+    parser.add_argument('--target', choices=TARGETS, default='Hard',
+                        help="Hard: the evaluation weights of Hard's search, as played in the game; "
+                             "Hard-scripted: Hard's fallback without a game state; Medium: Medium's thresholds")
+    parser.add_argument('--opponent', choices=DIFFICULTIES, default=None,
+                        help="difficulty to play against (default: Hard for Hard, otherwise Medium)")
+    parser.add_argument('-g', '--generations', type=int, default=20, help="maximum number of generations")
+    parser.add_argument('-p', '--population', type=int, default=POPULATION, help="candidates per generation")
+    parser.add_argument('-n', '--games', type=int, default=2000, help="games per candidate per generation")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--seed', default=0, help="base seed; the same seed searches the same way")
+    parser.add_argument('--mutation', type=float, default=MUTATION, help="mutation size, as a fraction of each range")
+    parser.add_argument('--alpha', type=float, default=ALPHA, help="significance level for early stopping")
+    parser.add_argument('--patience', type=int, default=PATIENCE,
+                        help="generations without a significant improvement before stopping")
+    parser.add_argument('-o', '--output', metavar='PATH', help="save the best weights as JSON to PATH")
+    parser.add_argument('--save', action='store_true',
+                        help=f"write the best weights into the AI's weights file ({WEIGHTS_PATH}), "
+                             "where every game picks them up, if they are significantly better")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    _, default_opponent = TARGETS[args.target]
+    current = current_weights(args.target)
+    opponent = args.opponent or default_opponent
+
+    weights, games = tune(args.target, opponent, args.generations, args.population, args.games,
+                          workers, args.seed, mutation=args.mutation, alpha=args.alpha,
+                          patience=args.patience)
+
+    # Check the result against the current weights on deals neither has played
+    baseline, tuned = Candidate(current), Candidate(weights)
+    with Pool(workers) as pool:
+        evaluate(pool, [baseline, tuned], args.target, opponent, args.games * 2,
+                 f"{args.seed}:check", stages=1, workers=workers)
+    z = NormalDist().inv_cdf(1.0 - args.alpha / 2)
+    print(f"{games} games played")
+    print(f"current {baseline.mean():.2%} ± {baseline.interval(z):.2%}: {format_weights(current)}")
+    print(f"tuned   {tuned.mean():.2%} ± {tuned.interval(z):.2%}: {format_weights(weights)}")
+    better = significantly_better(tuned, baseline, args.alpha)
+    if better:
+        print("The tuned weights are significantly better.")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(weights._asdict(), f, indent=2)
+    if args.save and not better:
+        print("Not saved to the weights file, as the tuned weights are not significantly better.")
+    elif args.save:
+        # Only this target's weights change; the file keeps everything else it sets
+        scripted_weights, eval_weights = load_weights()
+        if args.target == 'Hard':
+            eval_weights.update(weights._asdict())
+        else:
+            scripted_weights = scripted_weights._replace(**weights._asdict())
+        save_weights(scripted_weights, eval_weights)
+        print(f"Saved to {WEIGHTS_PATH}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# The game's modules import each other by their flat names, as when run from src/game
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'game'))
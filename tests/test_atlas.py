@@ -0,0 +1,49 @@
+# tests/test_atlas.py
+
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+pygame = pytest.importorskip('pygame')
+
+from atlas import SpriteAtlas
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'assets')
+
+
+@pytest.fixture
+def display():
+    pygame.init()
+    yield pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.quit()
+
+
+def test_lookups_do_not_wait_for_a_bake_in_progress(display):
+    atlas = SpriteAtlas()
+    baking, finish = threading.Event(), threading.Event()
+
+    def slow_open_baked(assets_path):
+        baking.set()
+        finish.wait(10)
+        return None
+
+    atlas.open_baked = slow_open_baked
+    baker = threading.Thread(target=atlas.baked_sprites, args=(ASSETS_PATH,))
+    baker.start()
+    try:
+        assert baking.wait(10)
+        start_time = time.perf_counter()
+        background = atlas.get_image(ASSETS_PATH, 'background.png')
+        card = atlas.get_card(ASSETS_PATH, 'bigcards.png', BIG_CARD_WIDTH, BIG_CARD_HEIGHT, BIG_SCALE_FACTOR,
+                              'Hearts', 'Ace')
+        assert time.perf_counter() - start_time < 5
+        assert background.get_size() and card.get_size()
+        assert baker.is_alive()
+    finally:
+        finish.set()
+        baker.join()
+    assert ASSETS_PATH in atlas.baked and not atlas.baking
@@ -0,0 +1,166 @@
+# tests/test_engine.py
+
+import random
+
+import pytest
+
+from actions import Action, ATTACK, HEAL, DEFENSE, COMBO, JESTER
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from player import Player
+from snapshot import snapshot
+
+
+def new_state(seed):
+    state = GameState(Deck(rng=random.Random(seed)), Player(PLAYER, None), Player(AI, None))
+    state.deal()
+    return state
+
+
+def play_randomly(state, rng, max_turns=1000):
+    """Play random legal actions until the game ends; returns the actions played."""
+    played = []
+    while not state.is_over() and len(played) < max_turns:
+        action = rng.choice(state.legal_actions())
+        state.apply(action)
+        played.append(action)
+    return played
+
+
+def card_in_hand(state, suit=None, other_than=None):
+    return next(card for card in state.current.hand
+                if (suit is None or card.suit == suit) and card != other_than)
+
+
+def hand_with(state, suits):
+    """Deal the side to move a hand holding a card of each of suits, from the draw pile."""
+    side, deck = state.current, state.deck
+    for card in side.hand:
+        deck.discard(card)
+    side.hand = []
+    for suit in suits:
+        card = next(card for card in deck.cards if card.suit == suit)
+        deck.cards.remove(card)
+        side.hand.append(card)
+
+
+def test_random_games_finish_with_a_winner():
+    for seed in range(20):
+        state = new_state(seed)
+        played = play_randomly(state, random.Random(seed))
+        assert state.is_over()
+        assert state.history == played
+        assert state.opponent.is_defeated()
+
+
+@pytest.mark.parametrize('suit, kind', [('Clubs', HEAL), ('Spades', HEAL), ('Hearts', DEFENSE), ('Clubs', DEFENSE)])
+def test_heal_and_defense_need_their_suit(suit, kind):
+    state = new_state(1)
+    hand_with(state, [suit, 'Hearts', 'Diamonds'])
+    with pytest.raises(ValueError):
+        state.apply(Action(kind, card_in_hand(state, suit)))
+
+
+def test_combo_needs_spades_and_a_second_card():
+    state = new_state(2)
+    hand_with(state, ['Spades', 'Clubs', 'Hearts'])
+    spades, clubs = card_in_hand(state, 'Spades'), card_in_hand(state, 'Clubs')
+    for action in (Action(COMBO, clubs, spades), Action(COMBO, spades), Action(COMBO, spades, spades),
+                   Action(ATTACK, spades, clubs)):
+        with pytest.raises(ValueError):
+            state.apply(action)
+
+
+def test_spades_attack_alone_or_with_any_other_card():
+    state = new_state(2)
+    hand_with(state, ['Spades', 'Clubs', 'Hearts'])
+    spades = card_in_hand(state, 'Spades')
+    legal = state.legal_actions()
+    assert Action(ATTACK, spades) in legal
+    for other in state.current.hand:
+        if other != spades:
+            assert Action(COMBO, spades, other) in legal
+    health = state.opponent.top_card()['health']
+    state.apply(Action(ATTACK, spades))
+    assert state.current.top_card()['health'] == health - spades.attack_value
+
+
+def test_cards_must_be_in_hand():
+    state = new_state(3)
+    outside = state.deck.cards[0]
+    with pytest.raises(ValueError):
+        state.apply(Action(ATTACK, outside))
+    with pytest.raises(ValueError):
+        state.apply(Action('Discard', state.current.hand[0]))
+
+
+def test_rejected_actions_change_nothing():
+    state = new_state(4)
+    hand_with(state, ['Spades', 'Clubs', 'Hearts'])
+    before = (list(state.player.hand), list(state.ai_player.hand), list(state.deck.cards),
+              list(state.deck.discard_pile), state.current_turn)
+    spades = card_in_hand(state, 'Spades')
+    with pytest.raises(ValueError):
+        state.apply(Action(COMBO, spades, state.deck.cards[0]))
+    assert before == (state.player.hand, state.ai_player.hand, state.deck.cards,
+                      state.deck.discard_pile, state.current_turn)
+    assert state.history == []
+
+
+def test_every_legal_action_applies():
+    state = new_state(5)
+    for action in state.legal_actions():
+        state.clone().apply(action)
+
+
+def test_jesters_run_out():
+    state = new_state(6)
+    state.current.jesters = 0
+    assert all(action.kind != JESTER for action in state.legal_actions())
+    with pytest.raises(ValueError):
+        state.apply(Action(JESTER))
+
+
+def test_do_and_undo_restore_every_position():
+    """Every legal action undone leaves the state as it was, reshuffles included."""
+    reshuffles = 0
+    for seed in range(10):
+        state = new_state(seed)
+        rng = random.Random(seed)
+        while not state.is_over():
+            before = snapshot(state)
+            rng_state = state.deck.rng.getstate()
+            history = list(state.history)
+            for action in state.legal_actions():
+                discards = len(state.deck.discard_pile)
+                token = state.do(action)
+                reshuffles += len(state.deck.discard_pile) < discards
+                state.undo(token)
+                assert snapshot(state) == before
+                assert state.deck.rng.getstate() == rng_state
+                assert state.history == history
+            state.apply(rng.choice(state.legal_actions()))
+    assert reshuffles
+
+
+def test_undo_in_reverse_order_unwinds_a_game():
+    state = new_state(11)
+    rng = random.Random(11)
+    positions, tokens = [], []
+    while not state.is_over():
+        positions.append(snapshot(state))
+        tokens.append(state.do(rng.choice(state.legal_actions())))
+    while tokens:
+        state.undo(tokens.pop())
+        assert snapshot(state) == positions.pop()
+
+
+def test_do_matches_apply():
+    state, twin = new_state(12), new_state(12)
+    rng = random.Random(12)
+    while not state.is_over():
+        action = rng.choice(state.legal_actions())
+        state.do(action)
+        twin.apply(action)
+        assert (state.current_turn, state.winner, state.player.hand, state.ai_player.hand) == (
+            twin.current_turn, twin.winner, twin.player.hand, twin.ai_player.hand)
@@ -0,0 +1,53 @@
+# tests/test_expectimax.py
+
+import random
+
+from ai_player import AIPlayer, decide_in_background, close_background_decisions
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from expectimax import TranspositionTable
+from player import Player
+
+
+def test_deeper_entries_answer_shallower_probes():
+    table = TranspositionTable(bits=4)
+    table.new_search()
+    table.store(0x35, 3, 1.5)
+    assert table.probe(0x35, 2) == 1.5
+    assert table.probe(0x35, 4) is None
+
+
+def test_shallower_entries_do_not_replace_deeper_ones():
+    table = TranspositionTable(bits=4)
+    table.new_search()
+    table.store(0x35, 3, 1.5)
+    table.store(0x35, 1, -2.0)  # The same position
+    table.store(0x45, 2, 0.5)  # Another position in the same slot
+    assert table.probe(0x35, 3) == 1.5
+    table.store(0x45, 4, 0.5)
+    assert table.probe(0x45, 4) == 0.5
+    assert table.probe(0x35, 1) is None
+
+
+def test_entries_expire_with_the_search():
+    table = TranspositionTable(bits=4)
+    table.new_search()
+    table.store(0x35, 3, 1.5)
+    table.new_search()
+    assert table.probe(0x35, 1) is None
+    table.store(0x35, 1, -2.0)
+    assert table.probe(0x35, 1) == -2.0
+
+
+def test_background_decisions_report_the_search_stats():
+    rng = random.Random(4)
+    ai_player = AIPlayer(AI, difficulty='Hard', rng=rng, lookahead_depth=2)
+    state = GameState(Deck(rng=rng), Player(PLAYER, None), ai_player, current_turn=AI)
+    state.deal()
+    try:
+        action, elapsed, stats = decide_in_background(state, 1, match=1)
+        assert action in state.legal_actions()
+        assert stats['nodes'] > 0 and stats['hits'] + stats['misses'] > 0
+        assert 0.0 <= stats['hit_rate'] <= 1.0
+    finally:
+        close_background_decisions()
@@ -0,0 +1,51 @@
+# tests/test_game.py
+
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+pygame = pytest.importorskip('pygame')
+
+from actions import JESTER
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from game import Game, CHOOSE_CARD, CHOOSE_ACTION, CHOOSE_COMBO_CARD
+
+
+@pytest.fixture(scope='module')
+def game():
+    pygame.init()
+    game = Game(pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT)), 'Easy', 0)
+    yield game
+    game.stop_ai()
+    pygame.quit()
+
+
+def offered_actions(game, index):
+    """Every action the player can make by clicking the card at index, then a button or a second card."""
+    offered = []
+    game.perform_action = offered.append
+    game.phase = CHOOSE_CARD
+    game.player_turn(index)
+    if game.phase == CHOOSE_ACTION:
+        for button in game.action_buttons:
+            game.phase = CHOOSE_ACTION
+            button.callback(*button.args)
+            if game.phase == CHOOSE_COMBO_CARD:
+                for other in range(len(game.player.hand)):
+                    game.choose_combo_card(other)
+    return offered
+
+
+def test_the_player_can_make_exactly_the_engines_moves(game):
+    suits_seen = set()
+    for seed in range(20):
+        game.reset('Easy', seed)
+        game.start_game()
+        hand = game.player.hand
+        suits_seen.update(card.suit for card in hand)
+        offered = [action for index in range(len(hand)) for action in offered_actions(game, index)]
+        legal = [action for action in game.state.legal_actions() if action.kind != JESTER]
+        assert len(offered) == len(set(offered))
+        assert set(offered) == set(legal)
+    assert suits_seen == {'Hearts', 'Diamonds', 'Spades', 'Clubs'}
@@ -0,0 +1,66 @@
+# tests/test_mcts.py
+
+import random
+import threading
+import time
+
+import pytest
+
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from mcts import MCTS
+from player import Player
+
+
+def new_state(seed):
+    state = GameState(Deck(rng=random.Random(seed)), Player(PLAYER, None), Player(AI, None))
+    state.deal()
+    return state
+
+
+def test_cancel_stops_a_parallel_search():
+    state = new_state(0)
+    cancel = threading.Event()
+    search = MCTS(time_limit=10.0, workers=2, rng=random.Random(0), cancel_event=cancel)
+    try:
+        timer = threading.Timer(0.5, cancel.set)
+        timer.start()
+        start_time = time.perf_counter()
+        action = search.choose(state)
+        assert time.perf_counter() - start_time < search.time_limit / 2
+        assert action in state.legal_actions()
+        timer.join()
+
+        # The next search is not cut short by the last one's cancellation
+        cancel.clear()
+        search.time_limit = 0.3
+        start_time = time.perf_counter()
+        search.choose(state)
+        assert time.perf_counter() - start_time >= search.time_limit
+    finally:
+        search.close()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_tree_is_reused_after_a_move_and_the_reply(workers):
+    state = new_state(1)
+    rng = random.Random(1)
+    search = MCTS(iterations=800, time_limit=None, workers=workers, rng=random.Random(1))
+    try:
+        action = search.choose(state)
+        assert search.stats['reused_visits'] == 0
+        for _ in range(3):
+            state.apply(action)
+            state.apply(rng.choice(state.legal_actions()))
+            action = search.choose(state)
+            assert search.stats['reused_visits'] > 0
+            assert search.stats['iterations'] == 800
+
+        # A cleared tree is not reused
+        state.apply(action)
+        state.apply(rng.choice(state.legal_actions()))
+        search.clear()
+        search.choose(state)
+        assert search.stats['reused_visits'] == 0
+    finally:
+        search.close()
@@ -0,0 +1,66 @@
+# tests/test_replay.py
+
+import random
+
+import pytest
+
+from actions import ATTACK, HEAL, DEFENSE
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from player import Player
+from replay import ReplayError, ReplayWriter, read_replay, parse_replay, replay_game
+
+
+def record_game(path, seed, flush_every=1):
+    """Play a random game dealt from seed, recording it to path; returns the final state."""
+    state = GameState(Deck(rng=random.Random(seed)), Player(PLAYER, None), Player(AI, None))
+    state.deal()
+    writer = ReplayWriter(str(path), seed, player='Easy', ai='Medium', flush_every=flush_every)
+    writer.record_deal(state)
+    rng = random.Random(f"moves:{seed}")
+    while not state.is_over():
+        actor = state.current_turn
+        waiting_hand_size = len(state.opponent.hand)
+        action = rng.choice(state.legal_actions())
+        state.apply(action)
+        writer.record_turn(state, actor, action, waiting_hand_size)
+    writer.close()
+    return state
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_recorded_games_replay_exactly(tmp_path, seed):
+    played = record_game(tmp_path / 'game.replay', seed)
+    replay = read_replay(tmp_path / 'game.replay')
+    assert replay.complete
+    assert (replay.seed, replay.player, replay.ai) == (seed, 'Easy', 'Medium')
+    assert replay.actions() == played.history
+    replayed = replay_game(replay)
+    assert replayed.history == played.history
+    assert replayed.winner == played.winner
+
+
+def test_a_truncated_replay_keeps_its_whole_records(tmp_path):
+    played = record_game(tmp_path / 'game.replay', 7)
+    data = (tmp_path / 'game.replay').read_bytes()
+    replay = parse_replay(data[:-1])
+    assert not replay.complete
+    assert replay.actions() == played.history[:len(replay.actions())]
+    replay_game(replay)
+
+
+def test_illegal_actions_are_reported(tmp_path):
+    record_game(tmp_path / 'game.replay', 8)
+    replay = read_replay(tmp_path / 'game.replay')
+    # Turn the first non-Hearts card played into a heal, which only Hearts can do
+    for index, (kind, side, cards) in enumerate(replay.events):
+        if cards and kind in (ATTACK, DEFENSE) and cards[0].suit != 'Hearts':
+            replay.events[index] = (HEAL, side, cards)
+            break
+    with pytest.raises(ReplayError):
+        replay_game(replay)
+
+
+def test_other_files_are_rejected():
+    with pytest.raises(ReplayError):
+        parse_replay(b'not a replay at all')
@@ -0,0 +1,108 @@
+# tests/test_snapshot.py
+
+import random
+
+import pytest
+
+from deck import Deck
+from engine import GameState, PLAYER, AI
+from player import Player
+from snapshot import (SNAPSHOT, SaveError, from_snapshot, load_game, pack_rng, restore, save_game,
+                      snapshot, unpack_rng)
+
+
+def new_state(seed):
+    state = GameState(Deck(rng=random.Random(seed)), Player(PLAYER, None), Player(AI, None))
+    state.deal()
+    return state
+
+
+def position(state):
+    """Everything a snapshot keeps, as plain values."""
+    sides = [(side.hand, side.jesters, side.defense_active, side.current_top_card_index,
+              [dict(top_card) for top_card in side.top_cards])
+             for side in (state.player, state.ai_player)]
+    return (state.current_turn, state.winner, list(state.deck.cards), list(state.deck.discard_pile), sides)
+
+
+def play(state, rng, turns):
+    for _ in range(turns):
+        if state.is_over():
+            break
+        state.apply(rng.choice(state.legal_actions()))
+
+
+def test_snapshots_round_trip_through_a_game():
+    rng = random.Random(1)
+    state = new_state(1)
+    while not state.is_over():
+        data = snapshot(state)
+        assert len(data) == SNAPSHOT.size
+        assert position(from_snapshot(data)) == position(state)
+        state.apply(rng.choice(state.legal_actions()))
+    assert position(from_snapshot(snapshot(state))) == position(state)
+
+
+def test_restore_overwrites_another_position():
+    state, other = new_state(2), new_state(3)
+    play(other, random.Random(3), 25)
+    restore(other, snapshot(state))
+    assert position(other) == position(state)
+
+
+@pytest.mark.parametrize('deck_rng', [None, random.Random(4)])
+def test_restored_states_play_through_a_reshuffle(deck_rng):
+    state = new_state(4)
+    play(state, random.Random(4), 3)
+    probe = from_snapshot(snapshot(state), deck_rng)
+    rng = random.Random(5)
+    reshuffled = False
+    while not probe.is_over():
+        before = len(probe.deck.discard_pile)
+        probe.apply(rng.choice(probe.legal_actions()))
+        reshuffled = reshuffled or len(probe.deck.discard_pile) < before
+        if reshuffled:
+            break
+    assert reshuffled
+
+
+def test_rng_state_round_trips():
+    rng = random.Random(6)
+    rng.gauss(0, 1)  # Leaves a cached gauss value in the state
+    copy = random.Random()
+    unpack_rng(copy, pack_rng(rng))
+    assert copy.getstate() == rng.getstate()
+
+
+def test_saved_games_resume_exactly(tmp_path):
+    path = str(tmp_path / 'match.save')
+    deck_rng, ai_rng = random.Random(7), random.Random('ai:7')
+    state = GameState(Deck(rng=deck_rng), Player(PLAYER, None), Player(AI, None))
+    state.deal()
+    play(state, random.Random(7), 12)
+    save_game(path, 7, 'Hard', state, deck_rng, ai_rng)
+
+    saved = load_game(path)
+    assert (saved.seed, saved.difficulty) == (7, 'Hard')
+    resumed_rng = random.Random()
+    unpack_rng(resumed_rng, saved.deck_rng_state)
+    resumed = from_snapshot(saved.snapshot, resumed_rng)
+    assert position(resumed) == position(state)
+    # Both copies draw the same cards from here on, through any reshuffle
+    moves = random.Random(8)
+    while not state.is_over():
+        action = moves.choice(state.legal_actions())
+        state.apply(action)
+        resumed.apply(action)
+        assert position(resumed) == position(state)
+
+
+def test_damaged_save_files_are_rejected(tmp_path):
+    path = tmp_path / 'match.save'
+    state = new_state(9)
+    save_game(str(path), 9, 'Easy', state, random.Random(), random.Random())
+    data = path.read_bytes()
+    for damaged in (data[:-1], b'NOTASAVE' + data[8:], data[:10]):
+        path.write_bytes(damaged)
+        with pytest.raises(SaveError):
+            load_game(str(path))
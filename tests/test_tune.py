@@ -0,0 +1,39 @@
+# tests/test_tune.py
+
+import ai_player
+from ai_player import AIPlayer, Weights, DEFAULT_WEIGHTS, load_weights, save_weights
+from expectimax import EVAL_WEIGHTS
+from tune import TARGETS, SearchWeights, MediumWeights, current_weights
+
+
+def test_scripted_targets_split_the_weights_between_them():
+    hard_fields = type(TARGETS['Hard-scripted'][0])._fields
+    medium_fields = type(TARGETS['Medium'][0])._fields
+    assert not set(hard_fields) & set(medium_fields)
+    assert set(hard_fields) | set(medium_fields) == set(Weights._fields)
+    assert set(SearchWeights._fields) < set(EVAL_WEIGHTS)
+
+
+def test_missing_or_damaged_weights_files_give_the_defaults(tmp_path):
+    assert load_weights(str(tmp_path / 'missing.json')) == (DEFAULT_WEIGHTS, {})
+    damaged = tmp_path / 'damaged.json'
+    damaged.write_text('{"weights": ')
+    assert load_weights(str(damaged)) == (DEFAULT_WEIGHTS, {})
+
+
+def test_saved_weights_are_what_the_tuner_and_the_ai_start_from(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ai_weights.json')
+    weights = DEFAULT_WEIGHTS._replace(low_health=0.4, heal=2.5)
+    save_weights(weights, {'jester': 1.5}, path)
+    assert load_weights(path) == (weights, {'jester': 1.5})
+    assert current_weights('Medium', path) == MediumWeights(low_health=0.4,
+                                                            finishing_health=DEFAULT_WEIGHTS.finishing_health)
+    assert current_weights('Hard', path) == SearchWeights(own_defense=EVAL_WEIGHTS['own_defense'],
+                                                          opponent_defense=EVAL_WEIGHTS['opponent_defense'],
+                                                          jester=1.5)
+
+    # As if the game had read this file on startup
+    monkeypatch.setattr(ai_player, '_weights', load_weights(path))
+    player = AIPlayer('AI', difficulty='Hard')
+    assert player.weights == weights and player.eval_weights == {'jester': 1.5}
+    assert AIPlayer('AI', weights=DEFAULT_WEIGHTS).weights == DEFAULT_WEIGHTS